@@ -0,0 +1,401 @@
+import time
+
+import numpy as np
+
+from events import RepCounted, SetCompleted
+from exercises import LANDMARK_INDEX, MIN_VISIBILITY, TORSO_SIDES, ExerciseType
+from rep_counter import RepCounter, torso_length
+
+# Offline rep counting over a whole recorded session at once. RepCounter is
+# a per-frame state machine, which is right for a live camera but slow for
+# re-scoring archives. count_series() computes the same result with array
+# operations:
+#
+#   calibration  windows of CALIBRATION_SECONDS found with searchsorted,
+#                their range with one min/max per window and the torso
+#                length with one median (a window that moved too little for
+#                the torso starts the next one, like a retry)
+#   debouncing   runs of frames past a threshold (edges of the mask); a run
+#                fires at its first frame SMOOTHING_SECONDS after it started
+#   hysteresis   "down" and "up" fires merged in time order, keeping each
+#                fire whose kind differs from the previous one kept
+#   sets         every reps_per_set-th rep
+#
+# The result matches a RepCounter fed the same frames exactly (same floats,
+# same comparisons); test_batch_equivalence() checks this on synthetic
+# traces. Per-rep analytics are not computed.
+#
+# Speed: about 25-30x RepCounter, not orders of magnitude. test_batch_speed()
+# counts 77k frames in ~3 ms against ~80 ms streaming. What is left is a
+# dozen passes over the frame arrays (~50 ns per frame); the calibration loop
+# runs once per rejected window, usually once or twice per session.
+#
+#   python batch_counter.py
+
+LEFT_SHOULDER = LANDMARK_INDEX['left_shoulder']
+RIGHT_SHOULDER = LANDMARK_INDEX['right_shoulder']
+TORSO_INDICES = np.array([(LANDMARK_INDEX[shoulder], LANDMARK_INDEX[hip]) for shoulder, hip in TORSO_SIDES],
+                         dtype=np.intp)
+
+
+def shoulder_series(frames):
+    """
+    Pack landmark dictionaries into the array count_series() takes.
+
+    Parameters:
+    - frames: Landmark dictionaries in detect_pose() format (None = no person)
+
+    Returns:
+    - (N, 5) float64 array of [left y, left visibility, right y, right
+      visibility, torso length], NaN rows for frames without a person (the
+      torso length alone is NaN when no side of the torso is visible)
+    """
+    series = np.full((len(frames), 5), np.nan)
+    for i, landmarks in enumerate(frames):
+        if landmarks is not None:
+            left = landmarks['left_shoulder']
+            right = landmarks['right_shoulder']
+            torso = torso_length(landmarks)
+            series[i] = (left['y'], left['visibility'], right['y'], right['visibility'],
+                         np.nan if torso is None else torso)
+    return series
+
+
+def shoulder_series_from_points(points, width, height, offset_x=0, offset_y=0, frame_height=None,
+                                min_visibility=MIN_VISIBILITY):
+    """
+    Pack pose backend output into the array count_series() takes, applying
+    the same shoulder visibility gate, scaling and torso length as
+    extract_landmarks() and RepCounter.
+
+    Parameters:
+    - points: (N, 33, 3) array of normalized [x, y, visibility] per frame (NaN = no person)
+    - width, height: Size of the processed image in pixels
+    - offset_x, offset_y: Position of the processed image in the full frame
+    - frame_height: Height of the full frame in pixels (default: height)
+    - min_visibility: At least one shoulder must be more visible than this
+
+    Returns:
+    - (N, 5) float64 array as from shoulder_series()
+    """
+    points = np.asarray(points)
+    scale = frame_height or height
+    shoulders = points[:, (LEFT_SHOULDER, RIGHT_SHOULDER)]
+    # Same float32 arithmetic as extract_landmarks(), so the coordinates match exactly
+    ys = (shoulders[:, :, 1] * height + offset_y) / scale
+    series = np.empty((len(shoulders), 5))
+    series[:, 0] = ys[:, 0]
+    series[:, 1] = shoulders[:, 0, 2]
+    series[:, 2] = ys[:, 1]
+    series[:, 3] = shoulders[:, 1, 2]
+
+    # Torso length as torso_length() computes it from those coordinates
+    torso = points[:, TORSO_INDICES]  # (N, sides, shoulder / hip, 3)
+    xs = ((torso[..., 0] * width + offset_x) / scale).astype(np.float64)
+    ys = ((torso[..., 1] * height + offset_y) / scale).astype(np.float64)
+    dx = xs[:, :, 0] - xs[:, :, 1]
+    dy = ys[:, :, 0] - ys[:, :, 1]
+    visible = (torso[..., 2] > min_visibility).all(axis=2)
+    lengths = np.where(visible, np.sqrt(dx * dx + dy * dy), 0.0)
+    sides = visible.sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        series[:, 4] = np.where(sides > 0, lengths.sum(axis=1) / sides, np.nan)
+
+    series[~(shoulders[:, :, 2] > min_visibility).any(axis=1)] = np.nan
+    return series
+
+
+def _first_elapsed(times, starts, seconds):
+    """
+    For each start position, the first position at least `seconds` later
+    (times.size if there is none).
+
+    searchsorted on start + seconds is nudged so the test is exactly
+    RepCounter's `timestamp - start >= seconds` (the two can disagree in
+    the last bit of a float).
+    """
+    base = times[starts]
+    index = np.maximum(np.searchsorted(times, base + seconds, side='left'), starts)
+    while True:
+        back = (index > starts) & (times[index - 1] - base >= seconds)
+        if not back.any():
+            break
+        index[back] -= 1
+    while True:
+        inside = np.flatnonzero(index < times.size)
+        ahead = inside[times[index[inside]] - base[inside] < seconds]
+        if not ahead.size:
+            break
+        index[ahead] += 1
+    return index
+
+
+def _fires(mask, times, smoothing_seconds):
+    """
+    Debounce: for each run of True frames, the position at which it has
+    lasted smoothing_seconds (runs that end sooner never fire).
+    """
+    edges = np.flatnonzero(mask[1:] != mask[:-1]) + 1
+    if mask.size and mask[0]:
+        edges = np.concatenate(([0], edges))
+    if mask.size and mask[-1]:
+        edges = np.concatenate((edges, [mask.size]))
+    starts, ends = edges[::2], edges[1::2]  # Run = [start, end)
+    fires = _first_elapsed(times, starts, smoothing_seconds)
+    return fires[fires < ends]
+
+
+def _count_streaming(ys, times, up_threshold, down_threshold, smoothing_seconds):
+    """
+    Fallback for overlapping up/down zones (THRESHOLD_BUFFER >= 0.5), where
+    a frame can be past both thresholds and the merge in count_series()
+    does not hold: run RepCounter's own state machine.
+
+    Returns:
+    - (positions of down transitions, positions of reps)
+    """
+    counter = RepCounter(reps_per_set=len(ys) + 1, total_sets=1)
+    counter.SMOOTHING_SECONDS = smoothing_seconds
+    counter.is_calibrated = True
+    counter.up_threshold = up_threshold
+    counter.down_threshold = down_threshold
+    # The shoulder has already been chosen - give both the same y
+    joint = {'y': 0.0, 'visibility': 1.0}
+    landmarks = {'left_shoulder': joint, 'right_shoulder': joint}
+    downs, reps = [], []
+    for i, (y, timestamp) in enumerate(zip(ys.tolist(), times.tolist())):
+        joint['y'] = y
+        state, rep = counter.position_state, counter.current_rep
+        counter.count_rep(landmarks, timestamp, analytics=False)
+        if counter.current_rep != rep:
+            reps.append(i)
+        elif counter.position_state != state:
+            downs.append(i)
+    return np.array(downs, dtype=np.intp), np.array(reps, dtype=np.intp)
+
+
+def count_series(series, timestamps, reps_per_set=12, total_sets=3,
+                 threshold_buffer=RepCounter.THRESHOLD_BUFFER,
+                 smoothing_seconds=RepCounter.SMOOTHING_SECONDS,
+                 calibration_seconds=RepCounter.CALIBRATION_SECONDS,
+                 min_range=RepCounter.MIN_RANGE, min_range_frame=RepCounter.MIN_RANGE_FRAME):
+    """
+    Count reps and sets over a whole session, matching a RepCounter that is
+    fed the same frames with calibrate() until calibrated, then count_rep().
+
+    Parameters:
+    - series: (N, 5) array from shoulder_series() (NaN rows = no person; an
+      (N, 4) array without torso lengths calibrates with min_range_frame)
+    - timestamps: Capture time of every frame in seconds (never decreasing)
+    - reps_per_set, total_sets: Workout targets
+    - threshold_buffer, smoothing_seconds, calibration_seconds, min_range, min_range_frame:
+      RepCounter's THRESHOLD_BUFFER, SMOOTHING_SECONDS, CALIBRATION_SECONDS, MIN_RANGE, MIN_RANGE_FRAME
+
+    Returns:
+    - Dictionary with calibrated, calibration_frame, up_threshold,
+      down_threshold, movement_range, torso_length, reps and sets (RepCounter's
+      current_rep / current_set), total_reps, state, completed,
+      completed_frame, and frame indexes / timestamps of every down
+      transition (down_frames), rep (rep_frames, rep_times) and completed
+      set (set_frames)
+    """
+    series = np.asarray(series, dtype=np.float64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    result = {
+        'calibrated': False, 'calibration_frame': None, 'up_threshold': None, 'down_threshold': None,
+        'movement_range': None, 'torso_length': None, 'reps': 0, 'sets': 1, 'total_reps': 0, 'state': "up",
+        'completed': False, 'completed_frame': None, 'down_frames': np.empty(0, dtype=np.intp),
+        'rep_frames': np.empty(0, dtype=np.intp), 'rep_times': np.empty(0), 'set_frames': np.empty(0, dtype=np.intp),
+    }
+
+    # Frames with a person; the more visible shoulder is followed
+    visible = ~np.isnan(series[:, 0])
+    frames = np.flatnonzero(visible)
+    times = timestamps[visible]
+    ys = np.where(series[:, 1] > series[:, 3], series[:, 0], series[:, 2])[visible]
+    torsos = series[visible, 4] if series.shape[1] > 4 else np.full(times.size, np.nan)
+
+    # CALIBRATION: a window runs from its first frame to the first frame
+    # calibration_seconds later; too little movement starts a new window
+    start = 0
+    end = None
+    while start < times.size:
+        end = int(_first_elapsed(times, np.array([start]), calibration_seconds)[0])
+        if end >= times.size:
+            return result  # Still calibrating when the recording ends
+        window = ys[start:end + 1]
+        max_y = float(window.max())
+        min_y = float(window.min())
+        range_y = max_y - min_y
+        window_torsos = torsos[start:end + 1]
+        window_torsos = window_torsos[~np.isnan(window_torsos)]
+        torso = float(np.median(window_torsos)) if window_torsos.size else None
+        if range_y >= (min_range * torso if torso is not None else min_range_frame):
+            break
+        start = end + 1
+    else:
+        return result
+
+    up_threshold = min_y + (range_y * threshold_buffer)
+    down_threshold = max_y - (range_y * threshold_buffer)
+    result.update(calibrated=True, calibration_frame=int(frames[end]), up_threshold=up_threshold,
+                  down_threshold=down_threshold, movement_range=range_y, torso_length=torso)
+
+    # COUNTING starts with the frame after the one that completed calibration
+    frames, times, ys = frames[end + 1:], times[end + 1:], ys[end + 1:]
+    if down_threshold >= up_threshold:
+        down_fires = _fires(ys > down_threshold, times, smoothing_seconds)
+        up_fires = _fires(ys < up_threshold, times, smoothing_seconds)
+        positions = np.concatenate((down_fires, up_fires))
+        kinds = np.concatenate((np.zeros(down_fires.size, np.int8), np.ones(up_fires.size, np.int8)))
+        order = np.argsort(positions, kind='stable')
+        positions, kinds = positions[order], kinds[order]
+        # The state starts "up", so the first transition kept is a "down"
+        kept = kinds != np.concatenate(([1], kinds[:-1]))
+        downs = positions[kept & (kinds == 0)]
+        reps = positions[kept & (kinds == 1)]
+    else:
+        downs, reps = _count_streaming(ys, times, up_threshold, down_threshold, smoothing_seconds)
+
+    total = int(reps.size)
+    workout_reps = reps_per_set * total_sets
+    result.update(
+        reps=total % reps_per_set,
+        sets=total // reps_per_set + 1,
+        total_reps=total,
+        state="down" if downs.size and (not reps.size or downs[-1] > reps[-1]) else "up",
+        completed=total >= workout_reps,
+        completed_frame=int(frames[reps[workout_reps - 1]]) if total >= workout_reps else None,
+        down_frames=frames[downs],
+        rep_frames=frames[reps],
+        rep_times=times[reps],
+        set_frames=frames[reps[reps_per_set - 1::reps_per_set]],
+    )
+    return result
+
+
+class _EventLog:
+    """Minimal EventBus stand-in that keeps every event (for the tests)."""
+
+    def __init__(self):
+        self.events = []
+
+    def publish(self, event):
+        self.events.append(event)
+
+
+def _run_streaming(trace, reps_per_set, total_sets, threshold_buffer, smoothing_seconds, calibration_seconds):
+    """Replay a trace through RepCounter exactly as rep_stress.py does."""
+    log = _EventLog()
+    counter = RepCounter(reps_per_set=reps_per_set, total_sets=total_sets, events=log)
+    counter.THRESHOLD_BUFFER = threshold_buffer
+    counter.SMOOTHING_SECONDS = smoothing_seconds
+    counter.CALIBRATION_SECONDS = calibration_seconds
+    for landmarks, timestamp in zip(trace.frames, trace.timestamps):
+        if not counter.is_calibrated:
+            counter.calibrate(landmarks, timestamp)
+        else:
+            counter.count_rep(landmarks, timestamp, analytics=False)
+    return counter, log.events
+
+
+def test_batch_equivalence(traces=60, seed=0):
+    """
+    Check count_series() against RepCounter on synthetic traces over a grid
+    of counter parameters, including failed calibrations and overlapping
+    zones.
+    """
+    from synthetic_traces import generate_traces
+
+    generated = generate_traces(traces, seed=seed, reps_range=(0, 25))
+    # Hold still at the start of some traces so their first calibration fails
+    for trace in generated[::4]:
+        still = int(7 * trace.params['fps'])
+        trace.frames = [trace.frames[0]] * still + trace.frames
+        trace.timestamps = [i / trace.params['fps'] for i in range(still)] + \
+                           [t + still / trace.params['fps'] for t in trace.timestamps]
+
+    grid = [
+        (reps_per_set, total_sets, buffer, smoothing, calibration)
+        for reps_per_set, total_sets in ((12, 3), (5, 2), (3, 1))
+        for buffer in (0.25, RepCounter.THRESHOLD_BUFFER, 0.45, 0.55)
+        for smoothing in (0.0, RepCounter.SMOOTHING_SECONDS, 0.4)
+        for calibration in (3.0, RepCounter.CALIBRATION_SECONDS)
+    ]
+
+    checks = 0
+    for trace in generated:
+        series = shoulder_series(trace.frames)
+        for reps_per_set, total_sets, buffer, smoothing, calibration in grid:
+            counter, events = _run_streaming(trace, reps_per_set, total_sets, buffer, smoothing, calibration)
+            batch = count_series(series, trace.timestamps, reps_per_set, total_sets, buffer, smoothing, calibration)
+
+            label = f"{trace.exercise_type.value} {reps_per_set}x{total_sets} buffer={buffer} " \
+                    f"smoothing={smoothing} calibration={calibration}"
+            assert batch['calibrated'] == counter.is_calibrated, label
+            assert batch['up_threshold'] == counter.up_threshold, label
+            assert batch['down_threshold'] == counter.down_threshold, label
+            assert batch['torso_length'] == counter.torso_length, label
+            assert (batch['reps'], batch['sets']) == (counter.current_rep, counter.current_set), label
+            assert batch['state'] == counter.position_state, label
+            rep_times = [e.timestamp for e in events if isinstance(e, RepCounted)]
+            set_times = [e.timestamp for e in events if isinstance(e, SetCompleted)]
+            assert batch['rep_times'].tolist() == rep_times, label
+            assert [trace.timestamps[i] for i in batch['set_frames']] == set_times, label
+            checks += 1
+
+    print(f"✅ {checks} trace/parameter combinations identical ({len(generated)} traces, {len(grid)} settings)")
+
+
+def test_batch_speed(reps=3000, seed=3):
+    """Time RepCounter and count_series() on one long recorded session."""
+    from synthetic_traces import generate_trace
+
+    trace = generate_trace(ExerciseType.PUSHUPS, n_reps=reps, seed=seed)
+    series = shoulder_series(trace.frames)
+    timestamps = np.asarray(trace.timestamps)
+    settings = (10_000, 1, RepCounter.THRESHOLD_BUFFER, RepCounter.SMOOTHING_SECONDS, RepCounter.CALIBRATION_SECONDS)
+
+    start = time.perf_counter()
+    counter, _ = _run_streaming(trace, *settings)
+    streaming_s = time.perf_counter() - start
+
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        batch = count_series(series, timestamps, *settings)
+    batch_s = (time.perf_counter() - start) / runs
+
+    assert batch['total_reps'] == counter.current_rep
+    print(f"✅ {len(trace):,} frames, {batch['total_reps']} reps")
+    print(f"   streaming: {streaming_s * 1000:8.1f} ms ({len(trace) / streaming_s:12,.0f} frames/s)")
+    print(f"   batch:     {batch_s * 1000:8.1f} ms ({len(trace) / batch_s:12,.0f} frames/s, "
+          f"{streaming_s / batch_s:.0f}x faster)")
+
+
+def test_batch_from_points():
+    """count_series() on pose backend arrays agrees with extract_landmarks() dictionaries."""
+    from exercises import EXERCISES
+    from pose_detection import extract_landmarks
+
+    rng = np.random.default_rng(1)
+    n = 2000
+    points = rng.random((n, 33, 3), dtype=np.float32)
+    points[:, :, 1] = (0.45 + 0.2 * np.sin(np.arange(n) / 15.0))[:, None].astype(np.float32)
+    points[rng.random(n) < 0.05] = np.nan
+    timestamps = np.arange(n) / 30.0
+
+    exercise = EXERCISES[ExerciseType.PUSHUPS]
+    frames = [None if np.isnan(p[0, 0]) else extract_landmarks(p, 640, 480, exercise=exercise) for p in points]
+    expected = shoulder_series(frames)
+    actual = shoulder_series_from_points(points, 640, 480)
+    assert np.array_equal(np.isnan(expected), np.isnan(actual))
+    assert np.array_equal(expected[~np.isnan(expected)], actual[~np.isnan(actual)])
+    result = count_series(actual, timestamps)
+    print(f"✅ Pose arrays match extract_landmarks(): {result['total_reps']} reps over {n} frames")
+
+
+if __name__ == "__main__":
+    test_batch_equivalence()
+    test_batch_from_points()
+    test_batch_speed()
@@ -0,0 +1,142 @@
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from frame_buffers import BufferPool, FrameRing
+from pose_backends import landmarks_to_array, mp_pose
+from pose_detection import create_pose_detector, detect_pose, extract_landmarks, draw_skeleton
+
+# Measures how much memory the per-frame hot path allocates, before and
+# after the preallocated-buffer rework. Both paths do the same work per
+# frame: capture, BGR->RGB for the pose model, pose + landmark extraction,
+# skeleton drawing, a copy for the recorder and the 320x240 preview image.
+#
+# tracemalloc sees every NumPy/OpenCV array allocation (the pose model's
+# own C++ allocations are not included in either path). For every frame we
+# record how far the traced memory peaked above where it started - the
+# bytes that had to be allocated to get that frame through.
+#
+#   python bench_allocations.py --width 1920 --height 1080
+
+PREVIEW_SIZE = (320, 240)
+
+
+def make_clip(path, width, height, frames, fps=30.0):
+    """Write a short synthetic clip (moving gradient) to read frames from."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    for i in range(frames):
+        frame = np.empty((height, width, 3), np.uint8)
+        frame[:] = ((x + i * 4) % 256).astype(np.uint8)[None, :, None]
+        writer.write(frame)
+    writer.release()
+
+
+def legacy_frame(cap, pose):
+    """The frame path as it was: every step returns a freshly allocated array."""
+    ret, frame = cap.read()
+    if not ret:
+        return False
+    results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    annotated = frame.copy()
+    if results.pose_landmarks:
+        height, width = frame.shape[:2]
+        points = landmarks_to_array(results.pose_landmarks.landmark)
+        extract_landmarks(points, width, height)
+        draw_skeleton(annotated, points)
+    recorded = annotated.copy()  # What the recorder queue holds on to
+    preview = cv2.cvtColor(cv2.resize(annotated, PREVIEW_SIZE), cv2.COLOR_BGR2RGB)
+    del recorded, preview
+    return True
+
+
+class PooledPath:
+    """The frame path with preallocated, reused buffers (as WorkoutSession/HudWidget do it)."""
+
+    def __init__(self):
+        self.detector = create_pose_detector()
+        self.frames = FrameRing(3)
+        self.landmarks = {}
+        self.recorder_pool = BufferPool()
+        self.preview = np.empty((PREVIEW_SIZE[1], PREVIEW_SIZE[0], 3), np.uint8)
+
+    def frame(self, cap):
+        ret, frame = cap.read(self.frames.next())
+        if not ret:
+            return False
+        self.frames.store(frame)
+        _, annotated = detect_pose(frame, detector=self.detector, in_place=True, landmarks_out=self.landmarks)
+        # Recorder: copy into a pooled buffer, returned once it has been encoded
+        recorded = self.recorder_pool.acquire(annotated.shape)
+        np.copyto(recorded, annotated)
+        self.recorder_pool.release(recorded)
+        # Preview: resize and convert into the HUD's preallocated image
+        cv2.resize(annotated, PREVIEW_SIZE, dst=self.preview)
+        cv2.cvtColor(self.preview, cv2.COLOR_BGR2RGB, dst=self.preview)
+        return True
+
+    def close(self):
+        self.detector.close()
+
+
+def measure(step, path, warmup=10):
+    """
+    Run a frame step over a clip and record the per-frame allocation peak.
+
+    Returns:
+    - List of bytes allocated per frame (after warmup)
+    """
+    cap = cv2.VideoCapture(path)
+    for _ in range(warmup):
+        step(cap)
+
+    per_frame = []
+    tracemalloc.start()
+    while True:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        if not step(cap):
+            break
+        _, peak = tracemalloc.get_traced_memory()
+        per_frame.append(peak - start)
+    tracemalloc.stop()
+    cap.release()
+    return per_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame allocations: legacy vs preallocated frame path")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--fps", type=float, default=30.0, help="Frame rate used for the MB/s estimate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = os.path.join(tmp, "clip.avi")
+        make_clip(clip, args.width, args.height, args.frames + 10)
+
+        pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        legacy = measure(lambda cap: legacy_frame(cap, pose), clip)
+        pose.close()
+
+        pooled_path = PooledPath()
+        pooled = measure(pooled_path.frame, clip)
+        pooled_path.close()
+
+    print("=" * 60)
+    print(f"{args.width}x{args.height}, {len(legacy)} frames")
+    print(f"{'PATH':10s} {'MEAN KB/FRAME':>15s} {'MAX KB/FRAME':>14s} {'MB/s @ ' + str(int(args.fps)):>12s}")
+    print("=" * 60)
+    for name, samples in (("legacy", legacy), ("pooled", pooled)):
+        mean = sum(samples) / len(samples)
+        print(f"{name:10s} {mean / 1024:15.1f} {max(samples) / 1024:14.1f} {mean * args.fps / 1024 ** 2:12.1f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import statistics
+import time
+
+import cv2
+
+from exercises import EXERCISES, ExerciseType
+from pose_detection import create_pose_detector, extract_landmarks
+from rep_counter import RepCounter
+
+# Compares pose backends on recorded sessions: inference latency, CPU use
+# and whether the reps still come out right. Each session is a video file
+# plus the number of reps actually performed in it, e.g.
+#   python bench_backends.py pushups_20.mp4:20 squats_15.mp4:15 \
+#       --backend mediapipe --backend mediapipe:0 --backend movenet:models/movenet_lightning.onnx
+
+
+def parse_session(text):
+    """Split "path:reps" into (path, reps)."""
+    path, _, reps = text.rpartition(":")
+    if not path or not reps.isdigit():
+        raise argparse.ArgumentTypeError(f"Expected <video>:<reps>, got '{text}'")
+    return path, int(reps)
+
+
+def run_session(backend_spec, path, exercise_type=None):
+    """
+    Run one recorded session through a fresh backend and RepCounter.
+
+    Frames are timestamped from the video's frame rate, so the result does
+    not depend on how fast the backend is.
+
+    Parameters:
+    - backend_spec: Pose backend spec (see pose_backends.py)
+    - path: Video file
+    - exercise_type: ExerciseType performed in the video (default: push-ups)
+
+    Returns:
+    - Dictionary with frames, latencies_ms (per frame), cpu_s, wall_s and reps counted
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    detector = create_pose_detector(backend_spec)
+    exercise = EXERCISES[exercise_type or ExerciseType.PUSHUPS]
+    # One long set so the total is simply the rep number
+    counter = RepCounter(reps_per_set=10_000, total_sets=1, exercise=exercise)
+
+    latencies = []
+    cpu = 0.0
+    frames = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        timestamp = frames / fps
+        frames += 1
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        points = detector.detect(frame, exercise.landmark_indices)
+        latencies.append((time.perf_counter() - start) * 1000)
+        cpu += time.process_time() - cpu_start
+
+        height, width = frame.shape[:2]
+        landmarks = extract_landmarks(points, width, height, exercise=exercise) if points is not None else None
+        if not counter.is_calibrated:
+            counter.calibrate(landmarks, timestamp)
+        else:
+            counter.count_rep(landmarks, timestamp)
+
+    cap.release()
+    detector.close()
+
+    return {
+        'frames': frames,
+        'latencies_ms': latencies,
+        'cpu_s': cpu,
+        'wall_s': sum(latencies) / 1000,
+        'reps': counter.current_rep,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pose backends on recorded sessions")
+    parser.add_argument("sessions", nargs="+", type=parse_session, help="Recorded session as <video>:<reps>")
+    parser.add_argument("--backend", action="append", dest="backends",
+                        help="Backend spec to compare (repeatable, default: mediapipe:0..2)")
+    parser.add_argument("--exercise", choices=[e.name.lower() for e in ExerciseType], default="pushups")
+    args = parser.parse_args()
+
+    backends = args.backends or ["mediapipe:0", "mediapipe:1", "mediapipe:2"]
+    exercise_type = ExerciseType[args.exercise.upper()]
+
+    print("=" * 78)
+    print(f"{'BACKEND':28s} {'MEAN ms':>8s} {'P95 ms':>8s} {'CPU':>6s} {'REPS OK':>8s} {'ABS ERR':>8s}")
+    print("=" * 78)
+    summary = []
+    for spec in backends:
+        latencies = []
+        cpu = wall = 0.0
+        correct = errors = 0
+        for path, expected in args.sessions:
+            result = run_session(spec, path, exercise_type)
+            latencies.extend(result['latencies_ms'])
+            cpu += result['cpu_s']
+            wall += result['wall_s']
+            correct += result['reps'] == expected
+            errors += abs(result['reps'] - expected)
+
+        mean = statistics.fmean(latencies)
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else mean
+        # CPU time per second of inference: 1.0 = one core fully busy
+        cores = cpu / wall if wall else 0.0
+        summary.append((spec, mean, errors))
+        print(f"{spec:28s} {mean:8.1f} {p95:8.1f} {cores:6.2f} "
+              f"{f'{correct}/{len(args.sessions)}':>8s} {errors:8d}")
+    print("=" * 78)
+
+    exact = [entry for entry in summary if entry[2] == 0]
+    if exact:
+        spec, mean, _ = min(exact, key=lambda entry: entry[1])
+        print(f"Cheapest backend that counts every session correctly: {spec} ({mean:.1f} ms/frame)")
+    else:
+        spec, mean, errors = min(summary, key=lambda entry: (entry[2], entry[1]))
+        print(f"No backend counted every session correctly; closest: {spec} ({errors} reps off)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from exercises import EXERCISES, ExerciseType
+from pose_backends import NUM_LANDMARKS
+from pose_detection import SKELETON, SkeletonRenderer
+
+# Annotation cost per frame: the skeleton as it used to be drawn (one
+# cv2.line per connection and one cv2.circle per joint on the full frame,
+# then scaled down for the preview) against SkeletonRenderer drawing the
+# same pose with batched cv2.polylines, on the full frame and straight onto
+# the 320x240 preview.
+#
+#   python bench_skeleton.py --sizes 640x480 1280x720 1920x1080
+#
+# Measured on one CPU core: drawing at preview size is 2.3-4.4x cheaper than
+# the loop on the full frame (DRAW SPEEDUP), and the renderer on the full
+# frame is 1.5-3x faster than the loop there. The per-frame Python
+# work is gone (cutting the paths at hidden joints was ~10 us of ~100 us);
+# what is left is OpenCV rasterizing the lines and the fixed cost of each
+# NumPy and OpenCV call, so this is a few times faster, not an order of
+# magnitude.
+
+PREVIEW_SIZE = (320, 240)
+
+
+def legacy_draw(frame, points, min_visibility=0.5):
+    """The per-joint loop the renderer replaced."""
+    height, width = frame.shape[:2]
+    pixels = (points[:, :2] * (width, height)).astype(np.int32)
+    visible = points[:, 2] > min_visibility
+    for start, end in SKELETON:
+        if visible[start] and visible[end]:
+            cv2.line(frame, tuple(pixels[start]), tuple(pixels[end]), (0, 255, 255), 2)
+    for x, y in pixels[visible]:
+        cv2.circle(frame, (int(x), int(y)), 2, (0, 255, 0), 2)
+
+
+# Rough standing pose (normalized x, y) for MediaPipe's 33 landmarks: face,
+# arms and hands, hips, legs and feet - a person filling most of the frame height
+STANDING_POSE = np.array([
+    (0.50, 0.12),
+    (0.48, 0.10), (0.47, 0.10), (0.46, 0.10), (0.52, 0.10), (0.53, 0.10), (0.54, 0.10),
+    (0.44, 0.11), (0.56, 0.11), (0.48, 0.15), (0.52, 0.15),
+    (0.42, 0.28), (0.58, 0.28), (0.38, 0.42), (0.62, 0.42), (0.36, 0.55), (0.64, 0.55),
+    (0.35, 0.58), (0.65, 0.58), (0.36, 0.59), (0.64, 0.59), (0.37, 0.57), (0.63, 0.57),
+    (0.45, 0.58), (0.55, 0.58), (0.45, 0.74), (0.55, 0.74), (0.45, 0.90), (0.55, 0.90),
+    (0.44, 0.92), (0.56, 0.92), (0.47, 0.94), (0.53, 0.94),
+], dtype=np.float32)
+
+
+def random_pose(rng):
+    """The standing pose with some jitter; a few joints drop below the visibility cut."""
+    points = np.empty((NUM_LANDMARKS, 3), dtype=np.float32)
+    points[:, :2] = STANDING_POSE + rng.normal(0, 0.01, (NUM_LANDMARKS, 2))
+    points[:, 2] = rng.uniform(0.4, 1.0, NUM_LANDMARKS)
+    return points
+
+
+def time_per_frame(step, poses, repeat=5):
+    """Best-of-repeat mean milliseconds per call of step(pose)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for pose in poses:
+            step(pose)
+        best = min(best, (time.perf_counter() - start) / len(poses))
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare skeleton drawing cost per frame")
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1280x720", "1920x1080"])
+    parser.add_argument("--poses", type=int, default=500, help="Random poses per measurement")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    poses = [random_pose(rng) for _ in range(args.poses)]
+    renderer = SkeletonRenderer(exercise=EXERCISES[ExerciseType.PUSHUPS])
+    preview = np.empty((PREVIEW_SIZE[1], PREVIEW_SIZE[0], 3), np.uint8)
+
+    print("=" * 86)
+    print(f"{'FRAME':>10s} {'LOOP ms':>9s} {'LOOP+SCALE ms':>14s} {'BATCHED ms':>11s} "
+          f"{'PREVIEW ms':>11s} {'DRAW SPEEDUP':>13s}")
+    print("=" * 86)
+    for size in args.sizes:
+        width, height = (int(value) for value in size.split("x"))
+        frame = np.full((height, width, 3), 90, np.uint8)
+
+        loop = time_per_frame(lambda pose: legacy_draw(frame, pose), poses)
+        # What the preview used to cost: full-size skeleton, then the HUD's downscale
+        loop_scaled = time_per_frame(
+            lambda pose: (legacy_draw(frame, pose), cv2.resize(frame, PREVIEW_SIZE, dst=preview)), poses)
+        batched = time_per_frame(lambda pose: renderer.draw(frame, pose), poses)
+        at_preview = time_per_frame(lambda pose: renderer.render_preview(frame, pose, preview), poses)
+        # Drawing alone, both at their target size
+        preview_draw = time_per_frame(lambda pose: renderer.draw(preview, pose), poses)
+        print(f"{size:>10s} {loop:9.3f} {loop_scaled:14.3f} {batched:11.3f} {at_preview:11.3f} "
+              f"{loop / preview_draw:12.1f}x")
+    print("=" * 86)
+    print("LOOP: per-joint cv2.line/cv2.circle on the full frame; BATCHED: SkeletonRenderer on the full frame;")
+    print(f"PREVIEW: scale to {PREVIEW_SIZE[0]}x{PREVIEW_SIZE[1]} and draw there (the scale replaces the HUD's own);")
+    print("DRAW SPEEDUP: full-frame loop vs drawing at preview size.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Compares startup time and peak memory of the GUI (main.py) and headless
+# (headless.py) entry points. Each one is started with --startup-only, which
+# performs all imports and setup (model, overlay, sessions) and exits before
+# opening a camera. The GUI runs on Qt's offscreen platform so this also works
+# on machines without a display.
+
+ENTRY_POINTS = {
+    'gui': "main.py",
+    'headless': "headless.py",
+}
+
+
+def measure(mode, runs=5):
+    """
+    Start an entry point several times and collect its startup reports.
+
+    Parameters:
+    - mode: "gui" or "headless"
+    - runs: Number of fresh processes to start
+
+    Returns:
+    - List of startup report dictionaries
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    reports = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, os.path.join(here, ENTRY_POINTS[mode]), "--startup-only"],
+            capture_output=True, text=True, env=env, cwd=here, check=True
+        )
+        # The report is the last JSON line (libraries may log before it)
+        line = [line for line in result.stdout.splitlines() if line.startswith("{")][-1]
+        reports.append(json.loads(line))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare GUI and headless startup time and memory")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"{'MODE':10s} {'STARTUP (median)':>18s} {'PEAK RSS (median)':>18s} {'QT':>6s}")
+    print("=" * 60)
+    results = {}
+    for mode in ENTRY_POINTS:
+        reports = measure(mode, args.runs)
+        startup = statistics.median(r['startup_s'] for r in reports)
+        rss = [r['peak_rss_mb'] for r in reports if r['peak_rss_mb'] is not None]
+        rss = statistics.median(rss) if rss else None
+        results[mode] = (startup, rss)
+        print(f"{mode:10s} {startup:17.2f}s {rss if rss is None else f'{rss:.0f} MB':>18} "
+              f"{'yes' if any(r['qt_loaded'] for r in reports) else 'no':>6s}")
+    print("=" * 60)
+
+    gui_startup, gui_rss = results['gui']
+    headless_startup, headless_rss = results['headless']
+    print(f"Headless saves {gui_startup - headless_startup:.2f}s startup"
+          + (f" and {gui_rss - headless_rss:.0f} MB peak RSS" if gui_rss and headless_rss else ""))
+
+
+if __name__ == "__main__":
+    main()
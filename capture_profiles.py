@@ -0,0 +1,360 @@
+import argparse
+import os
+import time
+import urllib.parse
+import urllib.request
+
+import cv2
+import numpy as np
+
+# Capture profiles: ask the camera for the resolution, frame rate and codec
+# the pipeline needs instead of accepting whatever it sends. Pose inference
+# runs fine at 480p, so a 1080p DroidCam stream wastes Wi-Fi bandwidth and
+# JPEG decode time on pixels that are thrown away again.
+#
+# How a profile is applied depends on the source:
+#   webcam index   CAP_PROP_FOURCC, CAP_PROP_FRAME_WIDTH/HEIGHT, CAP_PROP_FPS
+#   DroidCam URL   resolution in the URL (http://phone:4747/video?640x480);
+#                  the frame rate is set in the app
+#   other URLs     nothing can be requested, only verified
+# Every profile also asks for a one-frame capture buffer so cap.read()
+# returns the newest frame instead of a stale queued one.
+#
+# Devices silently fall back to the nearest mode they support, so what was
+# actually delivered is read back and compared with the request.
+#
+#   python capture_profiles.py http://192.168.0.20:4747/video --profiles native 720p 480p 360p
+#   python capture_profiles.py 0 --profiles 720p 640x480@30:YUYV 640x480@30:MJPG
+
+
+class CaptureProfile:
+    """What to request from a camera (None = leave the device default)."""
+
+    def __init__(self, name, width=None, height=None, fps=None, fourcc=None, buffer_size=1):
+        """
+        Parameters:
+        - name: Profile name shown in reports
+        - width, height: Requested frame size in pixels
+        - fps: Requested frame rate
+        - fourcc: Requested pixel format / codec for webcams, e.g. "MJPG" or "YUYV"
+        - buffer_size: Frames the capture backend may queue (1 = always the newest)
+        """
+        self.name = name
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+
+    def describe(self):
+        """Short description of the request, e.g. '640x480@30 YUYV'."""
+        if self.width is None:
+            return "device default"
+        text = f"{self.width}x{self.height}"
+        if self.fps:
+            text += f"@{self.fps:g}"
+        if self.fourcc:
+            text += f" {self.fourcc}"
+        return text
+
+
+# USB 2.0 webcams cannot carry uncompressed 720p at 30 FPS, so large profiles
+# ask for MJPG; small ones ask for YUYV, which costs no JPEG decode at all
+PROFILES = {
+    'native': CaptureProfile("native"),
+    '1080p': CaptureProfile("1080p", 1920, 1080, 30, "MJPG"),
+    '720p': CaptureProfile("720p", 1280, 720, 30, "MJPG"),
+    '480p': CaptureProfile("480p", 640, 480, 30, "YUYV"),
+    '360p': CaptureProfile("360p", 640, 360, 30, "YUYV"),
+    '240p': CaptureProfile("240p", 320, 240, 30, "YUYV"),
+}
+
+DROIDCAM_PORT = 4747
+DROIDCAM_PATHS = ("/video", "/mjpegfeed")
+
+
+def parse_profile(spec):
+    """
+    Turn a profile name or "WIDTHxHEIGHT[@FPS][:FOURCC]" into a CaptureProfile.
+
+    Examples: "480p", "native", "640x480", "1280x720@15:MJPG"
+    """
+    if isinstance(spec, CaptureProfile):
+        return spec
+    if spec is None:
+        return PROFILES['native']
+    spec = str(spec)
+    if spec in PROFILES:
+        return PROFILES[spec]
+    try:
+        size, _, fourcc = spec.partition(":")
+        size, _, fps = size.partition("@")
+        width, height = (int(value) for value in size.lower().split("x"))
+        fps = float(fps) if fps else None
+    except ValueError:
+        raise ValueError(f"Unknown capture profile '{spec}' (use {', '.join(PROFILES)} or WxH[@FPS][:FOURCC])")
+    if fourcc and len(fourcc) != 4:
+        raise ValueError(f"FOURCC must be 4 characters, got '{fourcc}'")
+    return CaptureProfile(spec, width, height, fps, fourcc.upper() or None)
+
+
+def is_stream(source):
+    """True for network stream URLs."""
+    return isinstance(source, str) and source.startswith(("http://", "https://", "rtsp://"))
+
+
+def is_live(source):
+    """
+    True for sources whose read() blocks until the next frame arrives:
+    webcam indexes, network streams and capture objects supplied by the
+    caller (the synthetic stand-ins deliver frames in real time). Video
+    files are read as fast as they decode.
+    """
+    return isinstance(source, int) or is_stream(source) or hasattr(source, "read")
+
+
+def is_droidcam(source):
+    """True for DroidCam stream URLs (default port or its video paths)."""
+    if not is_stream(source):
+        return False
+    url = urllib.parse.urlparse(source)
+    return url.port == DROIDCAM_PORT or url.path in DROIDCAM_PATHS
+
+
+def source_for_profile(source, profile):
+    """
+    The source to open for a profile (DroidCam URLs carry the resolution
+    in the query string; everything else is opened unchanged).
+    """
+    if profile.width and is_droidcam(source):
+        url = urllib.parse.urlparse(source)
+        return urllib.parse.urlunparse(url._replace(query=f"{profile.width}x{profile.height}"))
+    return source
+
+
+def open_capture(source, profile=None):
+    """
+    Open a camera and request the profile from it.
+
+    Parameters:
+    - source: DroidCam URL, video file or webcam index
+    - profile: CaptureProfile or profile spec (default: native)
+
+    Returns:
+    - cv2.VideoCapture (check isOpened())
+    """
+    profile = parse_profile(profile)
+    cap = cv2.VideoCapture(source_for_profile(source, profile))
+    if not cap.isOpened():
+        return cap
+    if profile.buffer_size:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, profile.buffer_size)  # Ignored by backends that cannot do it
+    if isinstance(source, int):
+        # FOURCC first: on V4L2 it decides which sizes and rates are on offer
+        if profile.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*profile.fourcc))
+        if profile.width:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, profile.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, profile.height)
+        if profile.fps:
+            cap.set(cv2.CAP_PROP_FPS, profile.fps)
+    return cap
+
+
+def fourcc_name(code):
+    """FOURCC property value as text ('-' if the backend does not report one)."""
+    code = int(code)
+    name = "".join(chr((code >> 8 * i) & 0xFF) for i in range(4))
+    return name if code and name.isprintable() else "-"
+
+
+def negotiated(cap, frame=None, source=None):
+    """
+    What the camera is actually delivering.
+
+    Parameters:
+    - cap: Opened capture
+    - frame: A frame read from it (its shape beats the reported size)
+    - source: The camera source (stream URLs have no trustworthy FPS property)
+
+    Returns:
+    - Dictionary with width, height, fps, fourcc and buffer_size
+    """
+    if frame is not None:
+        height, width = frame.shape[:2]
+    else:
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    return {
+        'width': width,
+        'height': height,
+        # FFmpeg reports a made-up 25 FPS for MJPEG streams; 0 = unknown
+        'fps': 0.0 if is_stream(source) else cap.get(cv2.CAP_PROP_FPS),
+        'fourcc': fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)),
+        'buffer_size': int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+    }
+
+
+def mismatches(profile, actual, source=None):
+    """
+    Where the delivered stream differs from the request.
+
+    Parameters:
+    - profile: CaptureProfile that was requested
+    - actual: What negotiated() read back
+    - source: The camera source (the format is only requested from webcams)
+
+    Returns:
+    - List of human-readable differences (empty if the camera complied)
+    """
+    problems = []
+    if profile.width and (actual['width'], actual['height']) != (profile.width, profile.height):
+        problems.append(f"resolution {actual['width']}x{actual['height']} (requested {profile.width}x{profile.height})")
+    # Unknown (0) FPS cannot disagree, and a measured rate jitters by a frame or two
+    if profile.fps and actual['fps'] and abs(actual['fps'] - profile.fps) > max(1.0, 0.1 * profile.fps):
+        problems.append(f"{actual['fps']:g} FPS (requested {profile.fps:g})")
+    if profile.fourcc and isinstance(source, int) and actual['fourcc'] not in ("-", profile.fourcc):
+        problems.append(f"format {actual['fourcc']} (requested {profile.fourcc})")
+    return problems
+
+
+def _measure_mjpeg(url, seconds):
+    """Read a raw MJPEG HTTP stream: count bytes on the wire and time each JPEG decode."""
+    received = frames = 0
+    decode_cpu = 0.0
+    shape = None
+    pending = bytearray()
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=10) as stream:
+        while time.perf_counter() - start < seconds:
+            chunk = stream.read1(65536) if hasattr(stream, "read1") else stream.read(65536)
+            if not chunk:
+                break
+            received += len(chunk)
+            pending += chunk
+            # Each multipart part holds one JPEG from SOI to EOI marker
+            while True:
+                begin = pending.find(b"\xff\xd8")
+                end = pending.find(b"\xff\xd9", begin + 2) if begin >= 0 else -1
+                if end < 0:
+                    if begin > 0:
+                        del pending[:begin]
+                    break
+                jpeg = np.frombuffer(bytes(pending[begin:end + 2]), np.uint8)
+                del pending[:end + 2]
+                cpu_start = time.thread_time()
+                image = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+                decode_cpu += time.thread_time() - cpu_start
+                if image is not None:
+                    frames += 1
+                    shape = image.shape
+    elapsed = time.perf_counter() - start
+    return {
+        'width': shape[1] if shape else 0,
+        'height': shape[0] if shape else 0,
+        'fourcc': "MJPG",
+        'frames': frames,
+        'fps_measured': frames / elapsed if elapsed else 0.0,
+        'mb_per_s': received / elapsed / 1024 ** 2 if elapsed else 0.0,
+        'decode_ms': decode_cpu / max(1, frames) * 1000,
+    }
+
+
+def _measure_capture(source, profile, seconds):
+    """Read through OpenCV: decode cost is the reading thread's CPU time per frame."""
+    cap = open_capture(source, profile)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open {source}")
+    frames = 0
+    decode_cpu = 0.0
+    actual = None
+    frame = None
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        cpu_start = time.thread_time()
+        if not cap.grab():
+            break
+        ret, frame = cap.retrieve(frame)
+        decode_cpu += time.thread_time() - cpu_start
+        if not ret:
+            break
+        if actual is None:
+            actual = negotiated(cap, frame, source)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    actual = actual or negotiated(cap, source=source)
+    fps_measured = frames / elapsed if elapsed else 0.0
+
+    # Bytes on the wire: known for files and uncompressed webcam formats only
+    mb_per_s = None
+    if isinstance(source, str) and os.path.isfile(source):
+        total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        if total_frames and actual['fps']:
+            mb_per_s = os.path.getsize(source) / (total_frames / actual['fps']) / 1024 ** 2
+    elif actual['fourcc'] in ("YUYV", "YUY2"):
+        mb_per_s = actual['width'] * actual['height'] * 2 * fps_measured / 1024 ** 2
+    cap.release()
+
+    return dict(actual, frames=frames, fps_measured=fps_measured, mb_per_s=mb_per_s,
+                decode_ms=decode_cpu / max(1, frames) * 1000)
+
+
+def measure_profile(source, profile, seconds=5.0):
+    """
+    Open a source with a profile and measure what it costs to receive.
+
+    Parameters:
+    - source: DroidCam URL, video file or webcam index
+    - profile: CaptureProfile or profile spec
+    - seconds: How long to read frames
+
+    Returns:
+    - Dictionary with the delivered width, height and fourcc, frames read,
+      fps_measured, mb_per_s received (None if unknown), decode_ms of CPU
+      per frame and the list of mismatches against the request
+    """
+    profile = parse_profile(profile)
+    url = source_for_profile(source, profile)
+    if is_stream(url) and not url.startswith("rtsp"):
+        result = _measure_mjpeg(url, seconds)
+        result['fps'] = result['fps_measured']
+    else:
+        result = _measure_capture(source, profile, seconds)
+    result['mismatches'] = mismatches(profile, result, source)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare capture profiles: what is delivered and what it costs")
+    parser.add_argument("source", help="DroidCam URL, video file or webcam index")
+    parser.add_argument("--profiles", nargs="+", default=["native", "720p", "480p", "360p"],
+                        help=f"Profile names ({', '.join(PROFILES)}) or WxH[@FPS][:FOURCC]")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Seconds to read per profile")
+    args = parser.parse_args()
+    source = int(args.source) if args.source.isdigit() else args.source
+
+    results = []
+    for spec in args.profiles:
+        profile = parse_profile(spec)
+        print(f"Measuring {profile.name} ({profile.describe()}) for {args.seconds:g}s...")
+        try:
+            results.append((profile, measure_profile(source, profile, args.seconds)))
+        except (OSError, ValueError) as error:
+            print(f"  ⚠️  {error}")
+
+    print("=" * 86)
+    print(f"{'PROFILE':16s} {'REQUESTED':18s} {'DELIVERED':10s} {'FORMAT':>6s} {'FPS':>6s} "
+          f"{'MB/s':>7s} {'DECODE ms/fr':>13s}")
+    print("=" * 86)
+    for profile, r in results:
+        bandwidth = f"{r['mb_per_s']:7.2f}" if r['mb_per_s'] is not None else f"{'-':>7s}"
+        print(f"{profile.name[:16]:16s} {profile.describe():18s} {r['width']:4d}x{r['height']:<5d} {r['fourcc']:>6s} "
+              f"{r['fps_measured']:6.1f} {bandwidth} {r['decode_ms']:13.2f}")
+    print("=" * 86)
+    for profile, r in results:
+        for problem in r['mismatches']:
+            print(f"⚠️  {profile.name}: camera delivered {problem}")
+
+
+if __name__ == "__main__":
+    main()
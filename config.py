@@ -0,0 +1,113 @@
+import argparse
+import json
+
+from exercises import ExerciseType
+
+# Defaults used when neither the command line nor a config file says otherwise
+DEFAULT_CONFIG = {
+    'sources': ["http://192.168.0.109:4747/video"],  # DroidCam URL, video file or webcam index
+    'reps_per_set': 12,
+    'total_sets': 3,
+    'exercise': "pushups",
+    'target_fps': 30.0,
+    'record': None,
+    'checkpoint': None,         # Resume from / keep saving the counter state to this file
+    'replay_mb': 32,            # Memory for instant replay of the last reps in the GUI (0 = off)
+    'opacity': 1.0,             # GUI window opacity (below 1 the compositor blends every frame)
+    'backends': ["mediapipe"],  # Pose backend per source (the last one repeats)
+    'profiles': ["native"],     # Capture profile per source (the last one repeats)
+    'governor': False,          # Share the CPU between sessions (see resource_governor.py)
+    'pin_cpus': False,          # ...and pin every session to its own cores
+}
+
+
+def parse_source(source):
+    """
+    Turn a camera source from the command line or a config file into what
+    cv2.VideoCapture expects: webcam indexes as int, everything else as str.
+    """
+    if isinstance(source, int):
+        return source
+    source = str(source)
+    return int(source) if source.isdigit() else source
+
+
+def load_config(argv=None, description="RepBot workout tracker"):
+    """
+    Build the session configuration from defaults, an optional JSON config
+    file and command line arguments (in increasing priority).
+
+    Example config file:
+        {"sources": ["http://192.168.0.20:4747/video", 0], "reps_per_set": 10, "total_sets": 4,
+         "backends": ["mediapipe", "movenet:models/movenet_lightning.onnx"], "profiles": ["480p", "native"]}
+
+    Parameters:
+    - argv: Argument list (default: sys.argv[1:])
+    - description: Help text for --help
+
+    Returns:
+    - Dictionary with sources, reps_per_set, total_sets, exercise (ExerciseType),
+      target_fps, record, checkpoint, replay_mb, opacity, backends, profiles, governor, pin_cpus and startup_only
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--config", help="JSON config file")
+    parser.add_argument("--source", action="append", dest="sources",
+                        help="Camera source: DroidCam URL, video file or webcam index (repeatable)")
+    parser.add_argument("--reps", type=int, dest="reps_per_set", help="Reps per set")
+    parser.add_argument("--sets", type=int, dest="total_sets", help="Number of sets")
+    parser.add_argument("--exercise", choices=[e.name.lower() for e in ExerciseType], help="Exercise to track")
+    parser.add_argument("--fps", type=float, dest="target_fps", help="Target processing frame rate")
+    parser.add_argument("--backend", action="append", dest="backends",
+                        help="Pose backend for the matching --source, e.g. mediapipe, mediapipe:0 or "
+                             "movenet:model.onnx (repeatable; the last one applies to remaining sources)")
+    parser.add_argument("--profile", action="append", dest="profiles",
+                        help="Capture profile for the matching --source: native, 1080p, 720p, 480p, 360p, 240p "
+                             "or WxH[@FPS][:FOURCC] (repeatable; the last one applies to remaining sources)")
+    parser.add_argument("--governor", action="store_true", default=None,
+                        help="Give every session a CPU share and lower pose quality when the host is saturated")
+    parser.add_argument("--pin-cpus", action="store_true", default=None, dest="pin_cpus",
+                        help="With --governor: pin every session to its own cores")
+    parser.add_argument("--record", help="Save the annotated session video to this file")
+    parser.add_argument("--checkpoint",
+                        help="Save the rep count to this file as it changes and resume from it after a crash")
+    parser.add_argument("--replay-mb", type=float, dest="replay_mb",
+                        help="Memory (MB) kept for replaying the last reps with 'r' / 's' in the GUI (0 = off)")
+    parser.add_argument("--opacity", type=float,
+                        help="GUI window opacity, e.g. 0.85 to see through the overlay (default: 1, opaque and cheapest)")
+    parser.add_argument("--startup-only", action="store_true",
+                        help="Report startup time and memory, then exit without opening a camera")
+    args = parser.parse_args(argv)
+
+    config = dict(DEFAULT_CONFIG)
+    if args.config:
+        with open(args.config) as f:
+            file_config = json.load(f)
+        unknown = set(file_config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+        config.update(file_config)
+
+    for key in DEFAULT_CONFIG:
+        value = getattr(args, key, None)
+        if value is not None:
+            config[key] = value
+
+    config['sources'] = [parse_source(source) for source in config['sources']]
+    config['exercise'] = ExerciseType[str(config['exercise']).upper()]
+    config['startup_only'] = args.startup_only
+    return config
+
+
+def _for_source(values, index):
+    """Entry for the source at the given index (the last listed one applies to any remaining sources)."""
+    return values[min(index, len(values) - 1)]
+
+
+def backend_for(config, index):
+    """Pose backend spec for the source at the given index."""
+    return _for_source(config['backends'], index)
+
+
+def profile_for(config, index):
+    """Capture profile spec for the source at the given index."""
+    return _for_source(config['profiles'], index)
@@ -0,0 +1,315 @@
+import collections
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+# ---------------------------------------------------------------------------
+# Event types
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Event:
+    """Base class for everything published on the EventBus."""
+    timestamp: float
+
+
+@dataclass(frozen=True)
+class CameraRetry(Event):
+    attempt: int
+    max_attempts: int
+
+
+@dataclass(frozen=True)
+class CameraConnected(Event):
+    source: object
+
+
+@dataclass(frozen=True)
+class CaptureNegotiated(Event):
+    requested: str
+    width: int
+    height: int
+    fps: float
+    fourcc: str
+    mismatches: tuple = ()
+
+
+@dataclass(frozen=True)
+class CameraFailed(Event):
+    source: object
+
+
+@dataclass(frozen=True)
+class CameraLost(Event):
+    source: object
+
+
+@dataclass(frozen=True)
+class CalibrationStarted(Event):
+    duration: float
+
+
+@dataclass(frozen=True)
+class CalibrationProgress(Event):
+    elapsed: float
+    duration: float
+
+
+@dataclass(frozen=True)
+class CalibrationFailed(Event):
+    reason: str
+
+
+@dataclass(frozen=True)
+class CalibrationComplete(Event):
+    up_threshold: float
+    down_threshold: float
+    movement_range: float
+    samples: int
+    elapsed: float
+    torso_length: Optional[float] = None  # Median during calibration (None if never visible)
+
+
+@dataclass(frozen=True)
+class PositionChanged(Event):
+    state: str
+    joint: str
+    y: float
+    reps: int
+    sets: int
+
+
+@dataclass(frozen=True)
+class RepCounted(Event):
+    rep: int
+    set: int
+    joint: str
+    y: float
+    metrics: Optional[dict] = field(default=None, compare=False)
+
+
+@dataclass(frozen=True)
+class SetCompleted(Event):
+    set: int
+    total_sets: int
+
+
+@dataclass(frozen=True)
+class WorkoutCompleted(Event):
+    total_sets: int
+    reps_per_set: int
+
+
+@dataclass(frozen=True)
+class CheckpointRestored(Event):
+    path: str
+    rep: int
+    set: int
+
+
+@dataclass(frozen=True)
+class FrameStats(Event):
+    frames: int
+    deadline_misses: int
+    skipped: dict = field(compare=False)
+    stage_ms: dict = field(compare=False)
+    cpu_percent: float = 0.0  # CPU time of the session thread, % of one core
+
+
+@dataclass(frozen=True)
+class QualityChanged(Event):
+    level: int
+    stride: int
+    height: int  # 0 = native
+    reason: str
+
+
+# ---------------------------------------------------------------------------
+# Bus
+# ---------------------------------------------------------------------------
+
+class EventBus:
+    """
+    Non-blocking in-process event bus.
+
+    publish() only appends to a deque (atomic in CPython, no lock) and is
+    safe to call from the frame loop. A dispatcher thread drains the queue
+    and calls the subscribers, so a slow terminal or consumer can only
+    delay other subscribers, never the publisher. If the queue is full
+    the oldest events are dropped.
+    """
+
+    MAX_QUEUED = 4096
+
+    def __init__(self, max_queued=MAX_QUEUED):
+        self._queue = collections.deque(maxlen=max_queued)
+        self._wakeup = threading.Event()
+        self._subscribers = []
+        self._thread = None
+        self._running = False
+        self.dropped = 0
+
+    def subscribe(self, callback, *event_types):
+        """
+        Register a subscriber.
+
+        Parameters:
+        - callback: Called with each matching event on the dispatcher thread
+        - event_types: Event classes to receive (default: all events)
+        """
+        self._subscribers.append((callback, event_types or (Event,)))
+
+    def publish(self, event):
+        """Queue an event for the subscribers. Never blocks."""
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(event)
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def start(self):
+        """Start the dispatcher thread."""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._dispatch_loop, name="EventBus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Deliver everything still queued, then stop the dispatcher thread."""
+        if self._thread is None:
+            return
+        self._running = False
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+
+    def _dispatch_loop(self):
+        while self._running:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        while True:
+            try:
+                event = self._queue.popleft()
+            except IndexError:
+                return
+            for callback, event_types in self._subscribers:
+                if isinstance(event, event_types):
+                    try:
+                        callback(event)
+                    except Exception as error:
+                        print(f"ERROR: Event subscriber {callback!r} failed on {event!r}: {error}")
+
+
+# ---------------------------------------------------------------------------
+# Subscribers
+# ---------------------------------------------------------------------------
+
+
+class ConsoleLogger:
+    """Prints session events to the terminal (off the frame loop)."""
+
+    def __init__(self, prefix=""):
+        """
+        Parameters:
+        - prefix: Put in front of every line, e.g. the camera name when several sessions share a terminal
+        """
+        self.prefix = prefix
+
+    def _write(self, text=""):
+        if self.prefix:
+            text = "\n".join(self.prefix + line for line in text.split("\n"))
+        print(text)
+
+    def __call__(self, event):
+        if isinstance(event, CalibrationStarted):
+            self._write("=" * 50)
+            self._write("CALIBRATION MODE")
+            self._write("=" * 50)
+            self._write(f"Do 3 SLOW push-ups (take {event.duration:.0f}-{event.duration + 1:.0f} seconds total)")
+            self._write("Go ALL THE WAY down and ALL THE WAY up")
+            self._write("=" * 50)
+
+        elif isinstance(event, CalibrationProgress):
+            self._write(f"Calibration progress: {min(event.elapsed, event.duration):.0f}/{event.duration:.0f} seconds")
+
+        elif isinstance(event, CalibrationFailed):
+            self._write(f"\n⚠️  WARNING: {event.reason}")
+            self._write("Try doing fuller push-ups during calibration")
+
+        elif isinstance(event, CalibrationComplete):
+            self._write("\n" + "=" * 50)
+            self._write("✅ CALIBRATION COMPLETE!")
+            self._write("=" * 50)
+            self._write(f"  Up threshold: {event.up_threshold:.3f}")
+            self._write(f"  Down threshold: {event.down_threshold:.3f}")
+            if event.torso_length:
+                self._write(f"  Range: {event.movement_range:.3f} frame heights "
+                            f"({event.movement_range / event.torso_length:.2f} torso lengths)")
+            else:
+                self._write(f"  Range: {event.movement_range:.3f} frame heights")
+            self._write(f"  Samples: {event.samples} frames in {event.elapsed:.1f}s")
+            self._write("=" * 50)
+            self._write("Starting workout tracking...\n")
+
+        elif isinstance(event, PositionChanged):
+            if event.state == "down":
+                self._write(f"  ⬇ DOWN position locked ({event.joint}: {event.y:.3f})")
+
+        elif isinstance(event, RepCounted):
+            self._write(f"  ✅ REP {event.rep} COUNTED! ({event.joint}: {event.y:.3f})")
+            if event.metrics:
+                m = event.metrics
+                self._write(f"     down {m['eccentric_s']:.1f}s | up {m['concentric_s']:.1f}s | "
+                      f"range {m['rom']:.0%} | asymmetry {m['asymmetry']:.0%}")
+
+        elif isinstance(event, SetCompleted):
+            self._write(f"\n🎯 SET {event.set} COMPLETE!")
+            if event.set < event.total_sets:
+                self._write(f"Rest briefly, then start SET {event.set + 1}...\n")
+
+        elif isinstance(event, WorkoutCompleted):
+            self._write("\n" + "🏆" * 20)
+            self._write("WORKOUT COMPLETE! All sets finished!")
+            self._write("🏆" * 20 + "\n")
+
+        elif isinstance(event, CheckpointRestored):
+            self._write(f"♻️  Resumed from {event.path}: SET {event.set}, REP {event.rep}")
+
+        elif isinstance(event, CameraRetry):
+            self._write(f"Camera connection attempt {event.attempt} of {event.max_attempts} failed")
+
+        elif isinstance(event, CameraConnected):
+            self._write("Workout tracker started!")
+
+        elif isinstance(event, CaptureNegotiated):
+            fps = f" @ {event.fps:g} FPS" if event.fps else ""
+            self._write(f"Camera delivers {event.width}x{event.height}{fps} ({event.fourcc}), "
+                        f"requested {event.requested}")
+            for problem in event.mismatches:
+                self._write(f"⚠️  Camera ignored the capture profile: {problem}")
+
+        elif isinstance(event, CameraFailed):
+            self._write("ERROR: Cannot access camera after all attempts")
+
+        elif isinstance(event, CameraLost):
+            self._write("ERROR: Lost camera feed")
+
+        elif isinstance(event, QualityChanged):
+            if event.level == 0:
+                self._write(f"✅ Full pose quality restored ({event.reason})")
+            else:
+                every = "every frame" if event.stride == 1 else f"every {event.stride} frames"
+                height = f"{event.height}p" if event.height else "native resolution"
+                self._write(f"⚠️  Pose quality lowered to {every} at {height} ({event.reason})")
+
+        elif isinstance(event, FrameStats):
+            if event.deadline_misses:
+                skipped = ", ".join(f"{stage} {count}" for stage, count in event.skipped.items() if count)
+                self._write(f"⚠️  {event.deadline_misses}/{event.frames} frames missed their deadline"
+                      + (f" (skipped: {skipped})" if skipped else ""))
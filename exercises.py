@@ -1,5 +1,7 @@
 from enum import Enum
 
+import numpy as np
+
 class ExerciseType(Enum):
     PUSHUPS = "Push-Ups"
     SQUATS = "Squats"
@@ -7,18 +9,59 @@ class ExerciseType(Enum):
     JUMPING_JACKS = "Jumping Jacks"
     LUNGES = "Lunges"
 
+# MediaPipe Pose landmark index of every joint an exercise can use
+LANDMARK_INDEX = {
+    'nose': 0,
+    'left_shoulder': 11,
+    'right_shoulder': 12,
+    'left_elbow': 13,
+    'right_elbow': 14,
+    'left_wrist': 15,
+    'right_wrist': 16,
+    'left_hip': 23,
+    'right_hip': 24,
+    'left_knee': 25,
+    'right_knee': 26,
+    'left_ankle': 27,
+    'right_ankle': 28,
+}
+
+# Rep counting follows the shoulders, so every exercise extracts them and a
+# frame only counts if at least one of them is clearly visible
+GATE_JOINTS = ('left_shoulder', 'right_shoulder')
+MIN_VISIBILITY = 0.5
+
+# Torso length (shoulder to hip, per side) is the body's scale: how much
+# movement calibration needs is measured in it, so every exercise extracts
+# the hips too
+TORSO_SIDES = (('left_shoulder', 'left_hip'), ('right_shoulder', 'right_hip'))
+
+# Exercises done lying down. Person detectors trained on upright people
+# (like OpenCV's HOG detector) do not find people in these positions
+HORIZONTAL_EXERCISES = frozenset({ExerciseType.PUSHUPS, ExerciseType.SITUPS})
+
 class Exercise:
     def __init__(self, type: ExerciseType, joint_pairs: list, range_threshold: float = 0.35):
         self.type = type
         self.joint_pairs = joint_pairs  # List of joint pairs to track
         self.range_threshold = range_threshold  # Movement range threshold
         
+        # Compiled once: the joints to extract every frame, in a fixed order,
+        # and their landmark indexes so extraction is a single array lookup
+        points = set(GATE_JOINTS)
+        for pair in TORSO_SIDES:
+            points.update(pair)
+        for pair in joint_pairs:
+            points.update(pair)
+        self.tracking_points = tuple(sorted(points, key=LANDMARK_INDEX.__getitem__))
+        self.landmark_indices = np.array([LANDMARK_INDEX[name] for name in self.tracking_points], dtype=np.intp)
+        # Visibility gate: positions of the gate joints within tracking_points
+        self.gate_positions = np.array([self.tracking_points.index(name) for name in GATE_JOINTS], dtype=np.intp)
+        self.min_visibility = MIN_VISIBILITY
+        
     def get_tracking_points(self):
         """Returns the list of body points needed for this exercise"""
-        points = set()
-        for pair in self.joint_pairs:
-            points.update(pair)
-        return list(points)
+        return list(self.tracking_points)
 
 # Exercise definitions with their tracking joints
 EXERCISES = {
@@ -0,0 +1,353 @@
+import argparse
+import http.server
+import random
+import threading
+import time
+import urllib.parse
+
+import cv2
+import numpy as np
+
+# Stand-in for the DroidCam app: serves a recorded or synthetic video as
+# DroidCam-compatible MJPEG over HTTP (GET /video, optionally /video?640x480
+# for the size, the same URL capture_profiles.py asks a real phone for).
+# Any number of clients can connect at once; each gets its own stream with
+# the configured frame rate, timing jitter and frame loss.
+#
+# Every frame carries a stamp in its top rows (sequence number + send time),
+# so the receiving end can tell how late each frame arrived and how many
+# never did - see read_stamp(). load_test.py uses this to find how many
+# streams one host can handle.
+#
+#   python fake_droidcam.py --video pushups.mp4 --port 4747 --fps 30 --jitter-ms 15 --loss 0.02
+#   python headless.py --source http://127.0.0.1:4747/video
+
+STAMP_BITS = 32       # 16-bit sequence number + 16-bit send time in milliseconds
+STAMP_WRAP = 1 << 16  # Both halves wrap around: latencies and gaps must stay below 65 s / 65536 frames
+STAMP_ROWS = 10       # The stamp band is 1/STAMP_ROWS of the frame height (survives JPEG and downscaling)
+
+
+def stamp_millis(now=None):
+    """Wall-clock milliseconds modulo STAMP_WRAP (shared by server and client on one host)."""
+    return int((time.time() if now is None else now) * 1000) % STAMP_WRAP
+
+
+def stamp_frame(frame, sequence, millis):
+    """Write the sequence number and send time into the top band as black/white blocks."""
+    band = max(1, frame.shape[0] // STAMP_ROWS)
+    block = frame.shape[1] // STAMP_BITS
+    value = (sequence % STAMP_WRAP) | (millis % STAMP_WRAP) << 16
+    for bit in range(STAMP_BITS):
+        frame[:band, bit * block:(bit + 1) * block] = 255 if (value >> bit) & 1 else 0
+
+
+def read_stamp(image):
+    """
+    Read the stamp written by stamp_frame() (BGR or RGB, any scale).
+
+    Returns:
+    - (sequence, millis)
+    """
+    height, width = image.shape[:2]
+    y = height // (STAMP_ROWS * 2)
+    block = width / STAMP_BITS
+    value = 0
+    for bit in range(STAMP_BITS):
+        if image[y, int((bit + 0.5) * block), 0] > 127:
+            value |= 1 << bit
+    return value & (STAMP_WRAP - 1), value >> 16
+
+
+def stamp_age_ms(millis, now=None):
+    """Milliseconds since the stamp was sent."""
+    return (stamp_millis(now) - millis) % STAMP_WRAP
+
+
+class FrameSource:
+    """
+    Loop of frames to stream, decoded once per requested size and shared
+    by all clients (the per-client work is only the stamp and the JPEG).
+    """
+
+    def __init__(self, video=None, width=640, height=480, loop_frames=90):
+        """
+        Parameters:
+        - video: Video file to replay (default: synthetic moving gradient)
+        - width, height: Size served when the client does not ask for one
+        - loop_frames: Frames kept in memory per size (the stream loops over them)
+        """
+        self.video = video
+        self.size = (width, height)
+        self.loop_frames = loop_frames
+        self._loops = {}
+        self._lock = threading.Lock()
+
+    def frames(self, size=None):
+        """Frames at the given (width, height), loaded on first use."""
+        size = size or self.size
+        with self._lock:
+            if size not in self._loops:
+                self._loops[size] = self._load(*size)
+            return self._loops[size]
+
+    def _load(self, width, height):
+        if self.video is None:
+            x = np.linspace(0, 255, width, dtype=np.float32)
+            frames = []
+            for i in range(self.loop_frames):
+                frame = np.empty((height, width, 3), np.uint8)
+                frame[:] = ((x + i * 4) % 256).astype(np.uint8)[None, :, None]
+                frames.append(frame)
+            return frames
+        cap = cv2.VideoCapture(self.video)
+        frames = []
+        while len(frames) < self.loop_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame.shape[1] != width or frame.shape[0] != height:
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            raise ValueError(f"Cannot read frames from {self.video}")
+        return frames
+
+
+class StreamStats:
+    """What the server did for one client connection."""
+
+    def __init__(self, index, size):
+        self.index = index
+        self.size = size
+        self.sent = 0
+        self.lost = 0     # Dropped on purpose (simulated loss)
+        self.late = 0     # Skipped because the client was not reading fast enough
+        self.bytes = 0
+        self.started = time.monotonic()
+        self.ended = None
+
+
+class FakeDroidCam:
+    """
+    Threaded HTTP server speaking enough of DroidCam's protocol for
+    cv2.VideoCapture: one multipart/x-mixed-replace MJPEG stream per GET.
+    """
+
+    BOUNDARY = "frame"
+
+    def __init__(self, source=None, host="127.0.0.1", port=4747, fps=30.0, jitter_ms=0.0,
+                 loss=0.0, quality=80, stamp=True, seed=None):
+        """
+        Parameters:
+        - source: FrameSource to stream (default: synthetic 640x480)
+        - host, port: Address to listen on (port 0 = any free port)
+        - fps: Frames per second per stream
+        - jitter_ms: Standard deviation of the send time around each frame's slot
+        - loss: Chance per frame that it is not sent at all
+        - quality: JPEG quality
+        - stamp: Stamp sequence number and send time into every frame
+        - seed: Random seed for jitter and loss
+        """
+        self.source = source or FrameSource()
+        self.fps = fps
+        self.jitter = jitter_ms / 1000
+        self.loss = loss
+        self.quality = quality
+        self.stamp = stamp
+        self.seed = seed
+        self.streams = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._serve(self)
+
+            def log_message(self, *args):
+                pass  # One line per connection is too much with dozens of streams
+
+        self.httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def url(self, width=None, height=None):
+        """Stream URL, optionally asking for a size the way DroidCam does."""
+        query = f"?{width}x{height}" if width else ""
+        return f"http://{self.httpd.server_address[0]}:{self.port}/video{query}"
+
+    def start(self):
+        """Serve on a background thread."""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self.httpd.serve_forever, name="FakeDroidCam", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop serving and end all streams."""
+        self._running = False
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.httpd.server_close()
+
+    def _serve(self, request):
+        url = urllib.parse.urlparse(request.path)
+        if url.path not in ("/video", "/mjpegfeed"):
+            request.send_error(404)
+            return
+        size = None
+        if url.query:
+            try:
+                width, height = (int(value) for value in url.query.split("x"))
+                size = (width, height)
+            except ValueError:
+                request.send_error(400, "Expected ?WIDTHxHEIGHT")
+                return
+        frames = self.source.frames(size)
+
+        with self._lock:
+            stats = StreamStats(len(self.streams), (frames[0].shape[1], frames[0].shape[0]))
+            self.streams.append(stats)
+        rng = random.Random(None if self.seed is None else self.seed + stats.index)
+
+        request.send_response(200)
+        request.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={self.BOUNDARY}")
+        request.send_header("Cache-Control", "no-cache")
+        request.end_headers()
+
+        buffer = np.empty_like(frames[0])
+        period = 1.0 / self.fps
+        start = time.monotonic()
+        sequence = 0
+        try:
+            while self._running:
+                # Each frame has a slot on the ideal clock; jitter moves it, loss removes it
+                due = start + sequence * period + (rng.gauss(0.0, self.jitter) if self.jitter else 0.0)
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif -delay > period:
+                    # The client is not keeping up (writes blocked): skip to the newest frame, like a live camera
+                    behind = int(-delay / period)
+                    stats.late += behind
+                    sequence += behind
+                    continue
+                if self.loss and rng.random() < self.loss:
+                    stats.lost += 1
+                    sequence += 1
+                    continue
+
+                frame = frames[sequence % len(frames)]
+                if self.stamp:
+                    np.copyto(buffer, frame)
+                    stamp_frame(buffer, sequence, stamp_millis())
+                    frame = buffer
+                ok, jpeg = cv2.imencode(".jpg", frame, (cv2.IMWRITE_JPEG_QUALITY, self.quality))
+                part = (f"--{self.BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                        f"Content-Length: {len(jpeg)}\r\n\r\n").encode()
+                request.wfile.write(part + jpeg.tobytes() + b"\r\n")
+                stats.sent += 1
+                stats.bytes += len(part) + len(jpeg) + 2
+                sequence += 1
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away
+        finally:
+            stats.ended = time.monotonic()
+
+    def stats(self):
+        """
+        Per-connection counters.
+
+        Returns:
+        - List of dictionaries with stream, size, active, sent, lost, late, fps and mb_per_s
+        """
+        result = []
+        with self._lock:
+            streams = list(self.streams)
+        for stats in streams:
+            elapsed = (stats.ended or time.monotonic()) - stats.started
+            result.append({
+                'stream': stats.index,
+                'size': f"{stats.size[0]}x{stats.size[1]}",
+                'active': stats.ended is None,
+                'sent': stats.sent,
+                'lost': stats.lost,
+                'late': stats.late,
+                'fps': stats.sent / elapsed if elapsed > 0 else 0.0,
+                'mb_per_s': stats.bytes / elapsed / 1e6 if elapsed > 0 else 0.0,
+            })
+        return result
+
+
+def test_fake_droidcam():
+    """Read a few stamped frames through cv2.VideoCapture and check the stamps survive JPEG."""
+    camera = FakeDroidCam(port=0, fps=30.0, seed=1)
+    camera.start()
+    cap = cv2.VideoCapture(camera.url(320, 240))
+    assert cap.isOpened(), "cv2.VideoCapture could not open the stream"
+    sequences = []
+    ages = []
+    for _ in range(30):
+        ret, frame = cap.read()
+        assert ret
+        assert frame.shape[:2] == (240, 320), frame.shape
+        sequence, millis = read_stamp(frame)
+        sequences.append(sequence)
+        ages.append(stamp_age_ms(millis))
+    cap.release()
+    camera.stop()
+    assert sequences == sorted(sequences) and len(set(sequences)) == len(sequences), sequences
+    assert max(ages) < 1000, ages
+    print(f"✅ {len(sequences)} stamped frames received, sequence {sequences[0]}..{sequences[-1]}, "
+          f"age {min(ages)}-{max(ages)} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a video as DroidCam-compatible MJPEG streams")
+    parser.add_argument("--video", help="Video file to replay (default: synthetic frames)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=4747)
+    parser.add_argument("--width", type=int, default=640, help="Size when the client does not ask for one")
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Send time jitter (standard deviation)")
+    parser.add_argument("--loss", type=float, default=0.0, help="Chance per frame of dropping it")
+    parser.add_argument("--quality", type=int, default=80, help="JPEG quality")
+    parser.add_argument("--loop-frames", type=int, default=90, help="Frames held in memory and looped")
+    parser.add_argument("--no-stamp", action="store_true", help="Do not stamp sequence/time into the frames")
+    parser.add_argument("--test", action="store_true", help="Run the self-test and exit")
+    args = parser.parse_args()
+
+    if args.test:
+        test_fake_droidcam()
+        return
+
+    source = FrameSource(args.video, args.width, args.height, args.loop_frames)
+    camera = FakeDroidCam(source, args.host, args.port, args.fps, args.jitter_ms, args.loss,
+                          args.quality, stamp=not args.no_stamp)
+    print(f"Serving {args.video or 'synthetic frames'} on http://{args.host}:{camera.port}/video "
+          f"({args.width}x{args.height} @ {args.fps:g} FPS). Press Ctrl+C to stop.")
+    camera.start()
+    try:
+        while True:
+            time.sleep(5)
+            streams = [s for s in camera.stats() if s['active']]
+            if streams:
+                print(f"{len(streams)} stream(s), "
+                      f"{sum(s['mb_per_s'] for s in streams):.1f} MB/s, "
+                      f"{sum(s['late'] for s in streams)} frames skipped for slow clients")
+    except KeyboardInterrupt:
+        pass
+    camera.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import collections
+import threading
+
+import numpy as np
+
+# Preallocated buffers for the per-frame hot path. At 1080p every frame-sized
+# temporary is ~6 MB, so allocating a few per frame at 30 FPS churns hundreds
+# of MB per second. Instead, frames and scratch images live in buffers that
+# are kept one per name and reused until the shape changes; OpenCV writes into
+# them via its dst= arguments.
+
+
+class BufferPool:
+    """
+    Resolution-keyed buffers.
+
+    - get(): named scratch buffers that are only used inside one call
+      (e.g. the RGB copy handed to the pose model). There is one buffer per
+      name: a new shape replaces it, so callers whose input size keeps
+      changing (person crops) don't pile up a buffer per size
+    - acquire()/release(): buffers that are handed to another thread and
+      come back when it is done with them (e.g. frames queued for encoding)
+
+    A new buffer is only allocated when a name's shape changes or when more
+    buffers are in flight than ever before.
+    """
+
+    def __init__(self):
+        self.scratch = {}
+        self.free = collections.defaultdict(collections.deque)
+        self.allocated = 0  # Buffers ever allocated (should stop growing)
+
+    def get(self, name, shape, dtype=np.uint8, zeros=False):
+        """
+        Scratch buffer for one purpose, reused on every call with the same shape.
+
+        Parameters:
+        - name: What the buffer is for (two uses never share a buffer)
+        - shape: Array shape, e.g. frame.shape
+        - dtype: Array dtype
+        - zeros: Start a newly allocated buffer out zeroed instead of uninitialized
+
+        Returns:
+        - Array whose contents are whatever the last user left (a new, zeroed
+          or uninitialized one if the shape or dtype changed)
+        """
+        buffer = self.scratch.get(name)
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != np.dtype(dtype):
+            buffer = np.zeros(shape, dtype=dtype) if zeros else np.empty(shape, dtype=dtype)
+            self.scratch[name] = buffer  # The buffer for the old shape is freed
+            self.allocated += 1
+        return buffer
+
+    def acquire(self, shape, dtype=np.uint8):
+        """Take a buffer of this shape out of the pool (allocating only if none is free)."""
+        key = (tuple(shape), np.dtype(dtype))
+        try:
+            return self.free[key].pop()
+        except IndexError:
+            self.allocated += 1
+            return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer):
+        """Give a buffer from acquire() back to the pool (safe from any thread)."""
+        self.free[(buffer.shape, buffer.dtype)].append(buffer)
+
+
+class FrameRing:
+    """
+    A fixed number of frame slots used in rotation - capture writes into the
+    next slot while consumers (preview, annotation) still read the previous
+    ones. With three slots a frame stays valid for two more captures.
+    """
+
+    def __init__(self, slots=3):
+        self.slots = [None] * slots
+        self.index = 0
+
+    def next(self):
+        """
+        Slot to capture the next frame into (None until it has been used once,
+        so the first capture allocates it).
+        """
+        self.index = (self.index + 1) % len(self.slots)
+        return self.slots[self.index]
+
+    def store(self, frame):
+        """
+        Remember the array the capture actually filled - OpenCV allocates a
+        new one if the slot was missing or the resolution changed.
+        """
+        self.slots[self.index] = frame
+        return frame
+
+
+class FrameMailbox:
+    """
+    Hands the newest frame from one thread to another.
+
+    put() copies the frame into a buffer nobody else is using and makes it
+    the newest; take() gives the newest frame to the consumer, which owns
+    it until its next take(). The producer never writes into a buffer the
+    consumer holds or was told about, so however long the consumer stalls
+    it never sees a half-written or different frame - frames it did not
+    take in time are simply replaced by newer ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = None  # Newest frame, not taken yet
+        self._held = None    # Frame the consumer took last
+        self._free = []
+        self.put_count = 0
+        self.taken = 0
+
+    def put(self, frame):
+        """
+        Copy a frame in as the newest one (producer thread).
+
+        Returns:
+        - True if the consumer had taken the previous frame, i.e. it needs to be
+          told about this one; False if a notification is still pending
+        """
+        with self._lock:
+            buffer = self._free.pop() if self._free else None
+        if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+            buffer = np.empty_like(frame)
+        np.copyto(buffer, frame)
+        with self._lock:
+            replaced = self._latest
+            self._latest = buffer
+            self.put_count += 1
+            if replaced is not None:
+                self._free.append(replaced)
+            return replaced is None
+
+    def take(self):
+        """
+        Newest frame (consumer thread), or None if there is none since the last take().
+        The consumer may use it until it calls take() again.
+        """
+        with self._lock:
+            frame = self._latest
+            if frame is None:
+                return None
+            self._latest = None
+            if self._held is not None:
+                self._free.append(self._held)
+            self._held = frame
+            self.taken += 1
+            return frame
@@ -0,0 +1,120 @@
+import time
+from contextlib import contextmanager
+
+
+class FrameScheduler:
+    """
+    Deadline-based pacing for the worker loop.
+
+    Every frame gets a deadline one frame period after it starts. Optional
+    stages (annotation, preview, analytics, replay) only run when their expected
+    cost - learned from earlier frames - still fits before the deadline,
+    so a frame that is running late sheds work instead of making the next
+    frame late too. Deadline misses and skipped stages are counted.
+    """
+
+    OPTIONAL_STAGES = ("annotation", "preview", "analytics", "replay")
+    COST_SMOOTHING = 0.1    # Weight of the newest sample in the stage cost average
+
+    def __init__(self, target_fps=30.0, pace=True, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize the scheduler.
+
+        Parameters:
+        - target_fps: Frames per second the loop should run at
+        - pace: Sleep when a frame finishes early so the loop doesn't outrun target_fps
+          (for sources that don't block until the next frame, e.g. video files)
+        - clock, sleep: Time source and sleep function (replaceable for simulations)
+        """
+        self.period = 1.0 / target_fps
+        self.pace = pace
+        self.clock = clock
+        self.sleep = sleep
+
+        self.frame_start = None
+        self.deadline = None
+
+        # Expected cost of each stage in seconds (moving average)
+        self.costs = {}
+
+        # Statistics
+        self.frames = 0
+        self.deadline_misses = 0
+        self.skipped = {stage: 0 for stage in self.OPTIONAL_STAGES}
+
+    def begin_frame(self, timestamp=None):
+        """
+        Start a new frame and set its deadline.
+
+        Parameters:
+        - timestamp: When the frame started, e.g. its capture time (default: now)
+
+        Returns:
+        - The frame's deadline
+        """
+        self.frame_start = self.clock() if timestamp is None else timestamp
+        self.deadline = self.frame_start + self.period
+        return self.deadline
+
+    def should_run(self, stage, pending=()):
+        """
+        Decide whether an optional stage still fits in this frame.
+
+        Parameters:
+        - stage: Name of the optional stage
+        - pending: Mandatory stages that still have to run after this decision
+
+        Returns:
+        - True if the stage should run, False if it should be skipped
+        """
+        expected = self.costs.get(stage, 0.0) + sum(self.costs.get(name, 0.0) for name in pending)
+        if self.clock() + expected <= self.deadline:
+            return True
+        self.skipped[stage] = self.skipped.get(stage, 0) + 1
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage and update its expected cost."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - start
+            previous = self.costs.get(name)
+            if previous is None:
+                self.costs[name] = elapsed
+            else:
+                self.costs[name] = previous + self.COST_SMOOTHING * (elapsed - previous)
+
+    def end_frame(self):
+        """
+        Finish the frame: record a deadline miss if it ran late, otherwise
+        sleep until the next frame is due (when pacing).
+
+        Returns:
+        - True if the frame met its deadline
+        """
+        self.frames += 1
+        now = self.clock()
+        if now > self.deadline:
+            self.deadline_misses += 1
+            return False
+        if self.pace:
+            self.sleep(self.deadline - now)
+        return True
+
+    def stats(self):
+        """
+        Scheduler statistics.
+
+        Returns:
+        - Dictionary with frame and miss counts, skipped stages and stage costs in ms
+        """
+        return {
+            'frames': self.frames,
+            'deadline_misses': self.deadline_misses,
+            'miss_rate': self.deadline_misses / self.frames if self.frames else 0.0,
+            'skipped': dict(self.skipped),
+            'stage_ms': {name: cost * 1000 for name, cost in self.costs.items()},
+        }
@@ -0,0 +1,104 @@
+import time
+STARTED = time.perf_counter()  # For the startup report (before the heavy imports)
+
+import json
+import threading
+
+from config import load_config, backend_for, profile_for
+from events import EventBus, ConsoleLogger
+from process_stats import startup_report
+from resource_governor import ResourceGovernor, print_usage
+from session_recorder import SessionRecorder
+from workout_session import WorkoutSession
+
+# Headless mode for machines without a display: no PyQt5 import anywhere in
+# this path. Example:
+#   python headless.py --source http://192.168.0.20:4747/video --source 0 --reps 10 --sets 4
+
+
+def _per_source(path, index):
+    """Give each camera its own file when several share one path: out.mp4 -> out_1.mp4."""
+    stem, dot, ext = path.rpartition(".")
+    return f"{stem}_{index}.{ext}" if dot else f"{path}_{index}"
+
+
+def main():
+    """Run one WorkoutSession per camera source until they finish or Ctrl+C."""
+    config = load_config(description="RepBot workout tracker (headless, no GUI)")
+    several = len(config['sources']) > 1
+
+    governor = None
+    if config['governor'] or config['pin_cpus']:
+        governor = ResourceGovernor(len(config['sources']), pin=config['pin_cpus'])
+        governor.configure()
+
+    sessions = []
+    buses = []
+    for index, source in enumerate(config['sources']):
+        events = EventBus()
+        events.subscribe(ConsoleLogger(prefix=f"[cam {index}] " if several else ""))
+
+        recorder = None
+        if config['record']:
+            recorder = SessionRecorder(_per_source(config['record'], index) if several else config['record'],
+                                       fps=config['target_fps'])
+        checkpoint = config['checkpoint']
+        if checkpoint and several:
+            checkpoint = _per_source(checkpoint, index)
+
+        sessions.append(WorkoutSession(
+            source, events,
+            reps_per_set=config['reps_per_set'],
+            total_sets=config['total_sets'],
+            exercise_type=config['exercise'],
+            recorder=recorder,
+            target_fps=config['target_fps'],
+            backend=backend_for(config, index),
+            capture_profile=profile_for(config, index),
+            budget=governor.budget(index) if governor else None,
+            checkpoint=checkpoint
+        ))
+        buses.append(events)
+
+    if config['startup_only']:
+        print(json.dumps(startup_report("headless", time.perf_counter() - STARTED)))
+        return
+
+    for events in buses:
+        events.start()
+
+    threads = [
+        threading.Thread(target=session.run, name=f"WorkoutSession-{index}", daemon=True)
+        for index, session in enumerate(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    if governor:
+        governor.start()
+
+    print(f"Headless tracking {len(sessions)} camera(s). Press Ctrl+C to stop.")
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+        for session in sessions:
+            session.stop()
+        for thread in threads:
+            thread.join(timeout=5)
+
+    if governor:
+        governor.stop()
+    for events in buses:
+        events.stop()
+
+    for index, session in enumerate(sessions):
+        counter = session.counter
+        print(f"[cam {index}] Set {min(counter.current_set, counter.total_sets)}/{counter.total_sets}, "
+              f"Rep {counter.current_rep}/{counter.reps_per_set} - {session.scheduler.stats()}")
+    if governor:
+        print_usage(governor)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import sys
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PyQt5.QtWidgets import QApplication, QWidget
+from PyQt5.QtCore import Qt, QRect, QTimer
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QImage, QPainter, QPen, QPixmap
+
+
+class HudWidget(QWidget):
+    """
+    Workout screen painted with QPainter instead of a stack of QLabels.
+
+    Everything that doesn't change per update (header, prefixes, progress
+    bar segments, footer) is rendered once into cached pixmaps; changing
+    text (counts, messages) is rendered once per distinct string and cached.
+    Setters only mark the rectangle that actually changed, so a rep update
+    repaints a few bar segments and a count instead of relayouting and
+    recompositing the whole window.
+    """
+
+    BACKGROUND = QColor(5, 5, 10)
+    MARGIN = 50
+    BAR_LENGTH = 10
+    CAMERA_SIZE = (320, 240)
+    TEXT_CACHE_SIZE = 64  # Distinct messages/counts kept as pixmaps
+
+    def __init__(self, brand_name="RepBot", brand_by="Ace Technologies", exercise_name="Push-Ups", parent=None):
+        super().__init__(parent)
+        # We paint every pixel of the dirty area ourselves
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+
+        self.brand_name = brand_name
+        self.brand_by = brand_by
+        self.exercise_name = exercise_name
+
+        self.fonts = {
+            'header': self._font(28),
+            'exercise': self._font(22),
+            'status': self._font(20),
+            'message': self._font(16),
+            'footer': self._font(14),
+        }
+
+        # Current state of the screen
+        self.message = "> SYSTEM: Awaiting calibration..."
+        self.rows = {
+            'set': {'prefix': "SET STATUS : [", 'filled': 0, 'count': "0/5"},
+            'rep': {'prefix': "REP STATUS : [", 'filled': 0, 'count': "0/12"},
+        }
+        # Camera feed: a preallocated RGB buffer and a QImage wrapping it, so
+        # a new frame allocates nothing
+        camera_w, camera_h = self.CAMERA_SIZE
+        self.camera_rgb = np.empty((camera_h, camera_w, 3), np.uint8)
+        self.camera_image = QImage(self.camera_rgb.data, camera_w, camera_h, 3 * camera_w, QImage.Format_RGB888)
+        self.has_camera_frame = False
+
+        # Optional callable(region) run after every paint (see latency_probe.py)
+        self.paint_hook = None
+
+        # Pixmap caches
+        self.static = {}
+        self.text_cache = OrderedDict()
+        self.rects = {}
+
+        # Paint metrics
+        self.paints = 0
+        self.paint_seconds = 0.0
+        self.paint_max = 0.0
+        self.painted_area = 0
+        self.updates = 0
+        self.update_seconds = 0.0
+
+    @staticmethod
+    def _font(size):
+        font = QFont("Courier New", size)
+        font.setWeight(QFont.Bold)
+        return font
+
+    def _render_text(self, text, font, color):
+        """Render (multi-line, centered) text into a transparent pixmap."""
+        metrics = QFontMetrics(font)
+        lines = text.split("\n")
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 2
+        height = metrics.lineSpacing() * len(lines)
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(width * ratio), int(height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setFont(font)
+        painter.setPen(QPen(QColor(color)))
+        painter.drawText(QRect(0, 0, width, height), Qt.AlignCenter, text)
+        painter.end()
+        return pixmap
+
+    def _cached_text(self, text, font_key, color):
+        """Pixmap for changing text, rendered once per distinct string."""
+        key = (text, font_key, color)
+        pixmap = self.text_cache.get(key)
+        if pixmap is None:
+            pixmap = self._render_text(text, self.fonts[font_key], color)
+            self.text_cache[key] = pixmap
+            if len(self.text_cache) > self.TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return pixmap
+
+    def _build_static(self):
+        """Pre-render everything that doesn't change during a workout."""
+        header = (
+            f"╔════════════════════════════════════════════════════╗\n"
+            f"║        {self.brand_name}        ║\n"
+            f"║        by {self.brand_by}        ║\n"
+            f"╚════════════════════════════════════════════════════╝"
+        )
+        self.static = {
+            'header': self._render_text(header, self.fonts['header'], "#00ffff"),
+            'exercise': self._render_text(f"EXERCISE: {self.exercise_name}", self.fonts['exercise'], "#00ff00"),
+            'footer': self._render_text("[Press 'q' to terminate session]", self.fonts['footer'], "#888888"),
+            'filled': self._render_text("█", self.fonts['status'], "#00ff00"),
+            'empty': self._render_text("─", self.fonts['status'], "#00ff00"),
+            'close': self._render_text("] ", self.fonts['status'], "#00ff00"),
+        }
+        for name, row in self.rows.items():
+            self.static[f'{name}_prefix'] = self._render_text(row['prefix'], self.fonts['status'], "#00ff00")
+
+    def _layout(self):
+        """Compute where every element goes for the current widget size."""
+        width, height = self.width(), self.height()
+        static = self.static
+        rects = {}
+
+        def centered(key, size, y):
+            rects[key] = QRect((width - size.width()) // 2, y, size.width(), size.height())
+            return y + size.height()
+
+        def logical(pixmap):
+            return pixmap.size() / pixmap.devicePixelRatio()
+
+        y = self.MARGIN
+        y = centered('header', logical(static['header']), y) + 10
+        y = centered('exercise', logical(static['exercise']), y) + 30
+
+        # Progress rows: prefix, BAR_LENGTH segments, "] ", count (room for "DONE!")
+        segment = logical(static['filled'])
+        count_width = QFontMetrics(self.fonts['status']).horizontalAdvance("DONE!!") + 2
+        prefix_width = max(logical(static[f'{name}_prefix']).width() for name in self.rows)
+        close = logical(static['close'])
+        row_width = prefix_width + segment.width() * self.BAR_LENGTH + close.width() + count_width
+        x = (width - row_width) // 2
+        for name in self.rows:
+            prefix = logical(static[f'{name}_prefix'])
+            rects[f'{name}_prefix'] = QRect(x + prefix_width - prefix.width(), y, prefix.width(), prefix.height())
+            seg_x = x + prefix_width
+            rects[f'{name}_segments'] = [
+                QRect(seg_x + i * segment.width(), y, segment.width(), segment.height())
+                for i in range(self.BAR_LENGTH)
+            ]
+            close_x = seg_x + segment.width() * self.BAR_LENGTH
+            rects[f'{name}_close'] = QRect(close_x, y, close.width(), close.height())
+            rects[f'{name}_count'] = QRect(close_x + close.width(), y, count_width, segment.height())
+            y += segment.height() + 6
+        y += 24
+
+        # Message: up to three lines
+        message_height = QFontMetrics(self.fonts['message']).lineSpacing() * 3
+        rects['message'] = QRect(self.MARGIN, y, width - 2 * self.MARGIN, message_height)
+
+        # Footer at the bottom, camera feed right above it
+        footer = logical(static['footer'])
+        footer_y = height - self.MARGIN - footer.height()
+        centered('footer', footer, footer_y)
+        camera_w, camera_h = self.CAMERA_SIZE
+        rects['camera'] = QRect((width - camera_w) // 2, footer_y - 20 - camera_h, camera_w, camera_h)
+
+        self.rects = rects
+
+    def resizeEvent(self, event):
+        if not self.static:
+            self._build_static()
+        self._layout()
+        super().resizeEvent(event)
+
+    def _invalidate(self, rect, started):
+        """Schedule a repaint of one rectangle and record the setter's cost."""
+        if rect is not None and self.rects:
+            self.update(rect)
+        self.updates += 1
+        self.update_seconds += time.perf_counter() - started
+
+    def set_exercise(self, name):
+        """Change the exercise name (re-renders its cached pixmap)."""
+        started = time.perf_counter()
+        self.exercise_name = name
+        if self.static:
+            self._build_static()
+            self._layout()
+        self._invalidate(self.rect(), started)
+
+    def set_progress(self, reps, sets, total_reps, total_sets):
+        """Update both progress bars; only changed segments and counts repaint."""
+        started = time.perf_counter()
+        dirty = None
+        for name, current, total in (('set', sets, total_sets), ('rep', reps, total_reps)):
+            filled = int((current / total) * self.BAR_LENGTH) if total else 0
+            dirty = self._set_row(name, min(filled, self.BAR_LENGTH), f"{current}/{total}", dirty)
+        self._invalidate(dirty, started)
+
+    def set_done(self):
+        """Show both bars full with DONE!."""
+        started = time.perf_counter()
+        dirty = None
+        for name in self.rows:
+            dirty = self._set_row(name, self.BAR_LENGTH, "DONE!", dirty)
+        self._invalidate(dirty, started)
+
+    def _set_row(self, name, filled, count, dirty):
+        """Change one progress row's state and grow the dirty rectangle."""
+        row = self.rows[name]
+        if not self.rects:
+            row['filled'], row['count'] = filled, count
+            return dirty
+        changed = []
+        if filled != row['filled']:
+            segments = self.rects[f'{name}_segments']
+            low, high = sorted((filled, row['filled']))
+            changed.append(segments[low].united(segments[high - 1]))
+        if count != row['count']:
+            changed.append(self.rects[f'{name}_count'])
+        row['filled'], row['count'] = filled, count
+        for rect in changed:
+            dirty = rect if dirty is None else dirty.united(rect)
+        return dirty
+
+    def set_message(self, message):
+        """Change the status message."""
+        started = time.perf_counter()
+        if message == self.message:
+            return
+        self.message = message
+        self._invalidate(self.rects.get('message'), started)
+
+    def set_camera_frame(self, frame):
+        """
+        Show a camera frame (BGR) in the feed area; only that area repaints.
+        """
+        started = time.perf_counter()
+        cv2.resize(frame, self.CAMERA_SIZE, dst=self.camera_rgb)
+        cv2.cvtColor(self.camera_rgb, cv2.COLOR_BGR2RGB, dst=self.camera_rgb)
+        self.has_camera_frame = True
+        self._invalidate(self.rects.get('camera'), started)
+
+    def paintEvent(self, event):
+        started = time.perf_counter()
+        painter = QPainter(self)
+        region = event.region()
+        painter.fillRect(event.rect(), self.BACKGROUND)
+
+        rects = self.rects
+        static = self.static
+        for key in ('header', 'exercise', 'footer'):
+            if region.intersects(rects[key]):
+                painter.drawPixmap(rects[key].topLeft(), static[key])
+
+        for name, row in self.rows.items():
+            if region.intersects(rects[f'{name}_prefix']):
+                painter.drawPixmap(rects[f'{name}_prefix'].topLeft(), static[f'{name}_prefix'])
+            for i, rect in enumerate(rects[f'{name}_segments']):
+                if region.intersects(rect):
+                    painter.drawPixmap(rect.topLeft(), static['filled' if i < row['filled'] else 'empty'])
+            if region.intersects(rects[f'{name}_close']):
+                painter.drawPixmap(rects[f'{name}_close'].topLeft(), static['close'])
+            if region.intersects(rects[f'{name}_count']):
+                painter.drawPixmap(rects[f'{name}_count'].topLeft(),
+                                   self._cached_text(row['count'], 'status', "#00ff00"))
+
+        if region.intersects(rects['message']):
+            pixmap = self._cached_text(self.message, 'message', "#00ff00")
+            size = pixmap.size() / pixmap.devicePixelRatio()
+            rect = rects['message']
+            painter.drawPixmap(rect.x() + (rect.width() - size.width()) // 2, rect.y(), pixmap)
+
+        camera = rects['camera']
+        if region.intersects(camera):
+            if self.has_camera_frame:
+                painter.drawImage(camera, self.camera_image)
+            else:
+                painter.fillRect(camera, Qt.black)
+            painter.setPen(QPen(QColor("#00ff00"), 2))
+            painter.drawRect(camera.adjusted(-1, -1, 1, 1))
+
+        painter.end()
+
+        if self.paint_hook is not None:
+            self.paint_hook(region)
+
+        elapsed = time.perf_counter() - started
+        self.paints += 1
+        self.paint_seconds += elapsed
+        self.paint_max = max(self.paint_max, elapsed)
+        self.painted_area += sum(rect.width() * rect.height() for rect in region.rects())
+
+    def paint_stats(self):
+        """
+        Paint-time metrics.
+
+        Returns:
+        - Dictionary with paints, mean/max paint time in ms, mean fraction of
+          the widget repainted, setter calls and mean setter time in ms
+        """
+        paints = max(1, self.paints)
+        area = max(1, self.width() * self.height())
+        return {
+            'paints': self.paints,
+            'paint_ms_mean': self.paint_seconds / paints * 1000,
+            'paint_ms_max': self.paint_max * 1000,
+            'dirty_fraction': self.painted_area / paints / area,
+            'updates': self.updates,
+            'update_ms_mean': self.update_seconds / max(1, self.updates) * 1000,
+        }
+
+
+def test_hud_widget(updates=240):
+    """Simulate a workout on the HUD and print its paint metrics."""
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    hud = HudWidget()
+    hud.resize(1280, 800)
+    hud.show()
+    app.processEvents()
+    first = hud.paint_stats()
+
+    frame = np.zeros((480, 640, 3), np.uint8)
+    for i in range(updates):
+        rep = i % 13
+        hud.set_progress(rep, 1 + i // 13, 12, 3)
+        hud.set_message(f"STATUS: Set {1 + i // 13}, Rep {rep} - Position: {'down' if i % 2 else 'up'}")
+        hud.set_camera_frame(frame)
+        app.processEvents()
+
+    stats = hud.paint_stats()
+    print(f"Full paint: {first['paint_ms_mean']:.2f} ms")
+    print(f"After {updates} updates: {stats}")
+    QTimer.singleShot(0, app.quit)
+
+
+if __name__ == "__main__":
+    test_hud_widget()
@@ -0,0 +1,393 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import zipfile
+
+import cv2
+import numpy as np
+
+# On-disk cache of pose landmarks for recorded videos. Re-scoring archived
+# sessions with new counting logic (sweep.py, batch_counter.py) used to run
+# pose inference on every frame again, although neither the video nor the
+# model had changed. With the cache, the second run reads the landmarks
+# back and never loads MediaPipe.
+#
+# An entry is keyed by a hash of
+#   - the video's content (BLAKE2b of the file, so renaming or copying it
+#     still hits and re-encoding it misses)
+#   - the model (backend spec plus the MediaPipe version, or the model
+#     file's hash for MoveNet)
+#   - everything else that changes the landmarks: inference height and stride
+# and stored as one .npz file of columns: frame_index, x, y and visibility
+# ((frames, 33) float32, NaN where nobody was found) plus the video's fps,
+# size and what the inference cost when it ran. Every read marks an entry as
+# recently used; once the directory is over its size cap, the least
+# recently used entries are deleted.
+#
+#   python landmark_cache.py pushups_20.mp4 squats_15.mp4
+#   python sweep.py pushups_20.mp4:20 --cache
+
+CACHE_VERSION = 1  # Bump when the backends' settings or the entry format change
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "repbot", "landmarks")
+
+_digests = {}  # (path, size, mtime) -> content hash, so a file is only read once per process
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    Hash of a file's content.
+
+    Parameters:
+    - path: File to hash
+    - chunk_size: Bytes read at a time
+
+    Returns:
+    - Hex digest
+    """
+    stat = os.stat(path)
+    memo = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(memo)
+    if digest is None:
+        hasher = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hasher.update(chunk)
+        digest = _digests[memo] = hasher.hexdigest()
+    return digest
+
+
+def model_fingerprint(backend):
+    """
+    Identify the model a backend spec (or PoseBackend) runs.
+
+    Returns:
+    - String that changes whenever the model's output can change
+    """
+    spec = backend if isinstance(backend, str) else backend.name
+    name, _, arg = spec.partition(":")
+    if name == "mediapipe":
+        from importlib.metadata import PackageNotFoundError, version
+        try:
+            release = version("mediapipe")
+        except PackageNotFoundError:
+            release = "unknown"
+        return f"mediapipe:{arg or 1}@{release}"
+    if name == "movenet" and arg and os.path.exists(arg):
+        return f"movenet:{file_digest(arg)}"
+    return spec
+
+
+class LandmarkCache:
+    """Size-capped, least-recently-used directory of landmark arrays."""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=2_000_000_000):
+        """
+        Parameters:
+        - directory: Where entries are stored (created on first write)
+        - max_bytes: Total size of the entries; the least recently used go first
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def key(self, video_path, backend, **config):
+        """
+        Cache key for a video, a model and the inference settings.
+
+        Parameters:
+        - video_path: Video file (hashed by content)
+        - backend: Pose backend spec or PoseBackend
+        - config: Anything else that changes the landmarks (e.g. inference_height, stride)
+
+        Returns:
+        - Hex key
+        """
+        payload = json.dumps({
+            'version': CACHE_VERSION,
+            'video': file_digest(video_path),
+            'model': model_fingerprint(backend),
+            **config,
+        }, sort_keys=True)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Read an entry.
+
+        Returns:
+        - Dictionary of arrays, or None if there is no (readable) entry
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, zipfile.BadZipFile) as error:
+            print(f"⚠️  Dropping unreadable landmark cache entry {path}: {error}")
+            os.remove(path)
+            self.misses += 1
+            return None
+        os.utime(path)  # Most recently used
+        self.hits += 1
+        return entry
+
+    def put(self, key, **arrays):
+        """Store an entry (atomically), then evict down to max_bytes."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temp_path, path)
+        self._evict(keep=path)
+
+    def _entries(self):
+        """(last used, size, path) of every entry, least recently used first."""
+        entries = []
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".npz"):
+                    path = os.path.join(self.directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue  # Evicted by another process meanwhile
+                    entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return sorted(entries)
+
+    def _evict(self, keep=None):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue  # The entry just written stays even if it alone is over the cap
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evicted += 1
+
+    def stats(self):
+        """
+        Returns:
+        - Dictionary with entries, bytes, hits, misses and evicted
+        """
+        entries = self._entries()
+        return {
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evicted': self.evicted,
+        }
+
+
+def infer_video(path, backend="mediapipe", inference_height=0, stride=1, cache=None):
+    """
+    Pose landmarks for every processed frame of a video, from the cache if
+    this video, model and settings have been seen before.
+
+    Parameters:
+    - path: Video file
+    - backend: Pose backend spec or PoseBackend
+    - inference_height: Run the model on frames scaled down to this height (0 = native)
+    - stride: Run inference on every stride-th frame
+    - cache: Optional LandmarkCache
+
+    Returns:
+    - Dictionary with frame_index (processed frames), points ((N, 33, 3)
+      float32 [x, y, visibility] normalized per axis, NaN rows where nobody
+      was found), fps, frames (decoded), width, height, cpu_s and wall_s (what
+      the inference cost when it ran) and cached (True if read from the cache)
+    """
+    key = None
+    if cache is not None:
+        key = cache.key(path, backend, inference_height=inference_height or 0, stride=stride)
+        entry = cache.get(key)
+        if entry is not None:
+            points = np.stack((entry['x'], entry['y'], entry['visibility']), axis=2)
+            return {
+                'frame_index': entry['frame_index'], 'points': points, 'fps': float(entry['fps']),
+                'frames': int(entry['frames']), 'width': int(entry['width']), 'height': int(entry['height']),
+                'cpu_s': float(entry['cpu_s']), 'wall_s': float(entry['wall_s']), 'cached': True,
+            }
+
+    from frame_buffers import BufferPool
+    from pose_backends import NUM_LANDMARKS, PoseBackend
+    from pose_detection import create_pose_detector
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    owned = not isinstance(backend, PoseBackend)
+    detector = create_pose_detector(backend) if owned else backend
+    buffers = BufferPool()
+
+    rows = []
+    frame_index = []
+    cpu = wall = 0.0
+    frames = 0
+    width = height = 0
+    missing = np.full((NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        index = frames
+        frames += 1
+        if index % stride:
+            continue
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        image = frame
+        if inference_height and inference_height < height:
+            size = (round(width * inference_height / height), inference_height)
+            image = buffers.get("resized", (size[1], size[0], 3))
+            cv2.resize(frame, size, dst=image, interpolation=cv2.INTER_AREA)
+        points = detector.detect(image)
+        wall += time.perf_counter() - start
+        cpu += time.process_time() - cpu_start
+
+        # The backend may reuse its array: keep a copy
+        rows.append(missing if points is None else points.astype(np.float32, copy=True))
+        frame_index.append(index)
+
+    cap.release()
+    if owned:
+        detector.close()
+
+    points = np.stack(rows) if rows else np.empty((0, NUM_LANDMARKS, 3), dtype=np.float32)
+    result = {
+        'frame_index': np.array(frame_index, dtype=np.int32), 'points': points, 'fps': fps,
+        'frames': frames, 'width': width, 'height': height, 'cpu_s': cpu, 'wall_s': wall, 'cached': False,
+    }
+    if cache is not None:
+        cache.put(
+            key, frame_index=result['frame_index'],
+            x=np.ascontiguousarray(points[:, :, 0]), y=np.ascontiguousarray(points[:, :, 1]),
+            visibility=np.ascontiguousarray(points[:, :, 2]),
+            fps=np.float64(fps), frames=np.int64(frames), width=np.int32(width), height=np.int32(height),
+            cpu_s=np.float64(cpu), wall_s=np.float64(wall)
+        )
+    return result
+
+
+def test_landmark_cache():
+    """
+    Check hits and misses (content, model and settings in the key), that a
+    hit returns the same landmarks without running the model, and that the
+    directory stays under its size cap with the least recently used entries
+    going first.
+    """
+    import shutil
+    import tempfile
+
+    from pose_backends import NUM_LANDMARKS, PoseBackend
+
+    class CountingBackend(PoseBackend):
+        """Deterministic fake model that counts its calls."""
+        name = "fake"
+
+        def __init__(self):
+            self.calls = 0
+
+        def detect(self, frame, indices=None):
+            self.calls += 1
+            value = frame[0, 0, 0] / 255.0
+            if value > 0.9:
+                return None  # "Nobody" in the brightest frames
+            return np.full((NUM_LANDMARKS, 3), value, dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        videos = []
+        for n, (width, height) in enumerate(((160, 120), (320, 240))):
+            video = os.path.join(directory, f"video_{n}.avi")
+            writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*"MJPG"), 30, (width, height))
+            for i in range(60):
+                writer.write(np.full((height, width, 3), (i * 4 + n) % 256, np.uint8))
+            writer.release()
+            videos.append(video)
+
+        cache = LandmarkCache(os.path.join(directory, "cache"))
+        backend = CountingBackend()
+        first = infer_video(videos[0], backend, cache=cache)
+        calls = backend.calls
+        second = infer_video(videos[0], backend, cache=cache)
+        assert not first['cached'] and second['cached'] and backend.calls == calls
+        assert np.array_equal(first['points'], second['points'], equal_nan=True)
+        assert np.array_equal(first['frame_index'], second['frame_index'])
+        assert np.isnan(first['points'][:, 0, 0]).any()
+
+        # Same content under another name hits; other settings or content miss
+        copy = os.path.join(directory, "renamed.avi")
+        shutil.copyfile(videos[0], copy)
+        assert infer_video(copy, backend, cache=cache)['cached']
+        assert not infer_video(videos[0], backend, stride=2, cache=cache)['cached']
+        assert not infer_video(videos[1], backend, cache=cache)['cached']
+
+        # Cap the size at about two entries: reading video 0 makes the stride-2
+        # entry the least recently used, so it goes when a new entry arrives. The
+        # headroom absorbs size differences between entries (e.g. stored timings)
+        sizes = [size for _, size, _ in cache._entries()]
+        cache.max_bytes = sum(sorted(sizes)[-2:]) + min(sizes) // 2
+        time.sleep(0.01)
+        infer_video(videos[0], backend, cache=cache)
+        time.sleep(0.01)
+        infer_video(videos[1], backend, inference_height=60, cache=cache)
+        stats = cache.stats()
+        assert stats['bytes'] <= cache.max_bytes, stats
+        assert infer_video(videos[0], backend, cache=cache)['cached']
+        assert not infer_video(videos[0], backend, stride=2, cache=cache)['cached']
+
+    print(f"✅ Landmark cache: hits skip the model, keys follow content and settings, "
+          f"LRU eviction keeps it under the cap ({stats})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count reps in recorded videos, with pose landmarks cached on disk")
+    parser.add_argument("videos", nargs="*", help="Video files")
+    parser.add_argument("--backend", default="mediapipe", help="Pose backend spec (see pose_backends.py)")
+    parser.add_argument("--height", type=int, default=0, help="Inference height in pixels (0 = native)")
+    parser.add_argument("--stride", type=int, default=1, help="Run inference on every stride-th frame")
+    parser.add_argument("--cache-dir", default=DEFAULT_DIRECTORY)
+    parser.add_argument("--cache-mb", type=float, default=2000, help="Size cap of the cache directory")
+    parser.add_argument("--test", action="store_true", help="Run the self-test and exit")
+    args = parser.parse_args()
+
+    if args.test:
+        test_landmark_cache()
+        return
+
+    from batch_counter import count_series, shoulder_series_from_points
+
+    cache = LandmarkCache(args.cache_dir, int(args.cache_mb * 1_000_000))
+    for video in args.videos:
+        start = time.perf_counter()
+        run = infer_video(video, args.backend, args.height, args.stride, cache)
+        loaded = time.perf_counter() - start
+        # Counting follows the shoulders whatever the exercise, like RepCounter
+        series = shoulder_series_from_points(run['points'], run['width'], run['height'])
+        result = count_series(series, run['frame_index'] / run['fps'], reps_per_set=10_000, total_sets=1)
+        source = "cache" if run['cached'] else f"inference ({run['wall_s']:.1f}s)"
+        print(f"{video}: {result['total_reps']} reps, {len(run['points'])} frames "
+              f"from {source} in {loaded:.2f}s")
+    print(f"Cache {args.cache_dir}: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
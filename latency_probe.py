@@ -0,0 +1,280 @@
+import argparse
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
+
+from events import EventBus, RepCounted
+from exercises import LANDMARK_INDEX, ExerciseType
+from main import EventBridge, WorkoutThread
+from overlay import WorkoutOverlay
+from pose_backends import NUM_LANDMARKS, PoseBackend, create_backend
+from synthetic_traces import FRAME_WIDTH, FRAME_HEIGHT, generate_trace
+
+# Glass-to-glass latency measurement: a synthetic camera with frame IDs
+# embedded in the pixels and scripted push-up motion runs through the real
+# pipeline (WorkoutSession -> RepCounter -> EventBus -> Qt -> WorkoutOverlay)
+# and every stage is timestamped:
+#
+#   capture    frame due from the camera
+#   read       WorkoutSession got it from cap.read()
+#   pose       pose backend done (frame ID decoded from the frame it was given)
+#   published  RepCounted put on the EventBus
+#   dispatched EventBus thread delivered it
+#   handled    WorkoutOverlay.handle_event() ran on the GUI thread
+#   painted    the HUD painted the new rep count
+#
+# The preview path is measured the same way: the frame ID is decoded from
+# the HUD's camera image when it is painted.
+#
+#   QT_QPA_PLATFORM=offscreen python latency_probe.py --reps 20 --inference mediapipe
+
+ID_BITS = 16
+ID_BAND = 48  # Pixel rows at the top of the frame holding the frame ID blocks
+
+
+def encode_frame_id(frame, frame_id):
+    """Write frame_id into the top band as ID_BITS black/white blocks (big enough to survive downscaling)."""
+    block = frame.shape[1] // ID_BITS
+    for bit in range(ID_BITS):
+        value = 255 if (frame_id >> bit) & 1 else 0
+        frame[:ID_BAND, bit * block:(bit + 1) * block] = value
+
+
+def decode_frame_id(image, band=ID_BAND):
+    """Read the frame ID back from the band (works on BGR or RGB, any scale)."""
+    height, width = image.shape[:2]
+    y = band * height // FRAME_HEIGHT // 2
+    block = width / ID_BITS
+    frame_id = 0
+    for bit in range(ID_BITS):
+        if image[y, int((bit + 0.5) * block), 0] > 127:
+            frame_id |= 1 << bit
+    return frame_id
+
+
+class SyntheticCamera:
+    """
+    cv2.VideoCapture stand-in delivering frames at a fixed rate with the
+    frame ID in the pixels. read() blocks until the next frame is due, like
+    a real camera; frames that are due while the pipeline is busy are
+    skipped, as a live stream would drop them.
+    """
+
+    def __init__(self, frames, fps=30.0, probe=None):
+        self.total = frames
+        self.fps = fps
+        self.probe = probe
+        self.start = None
+        self.next_id = 0
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        return self.fps if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def read(self, image=None):
+        now = time.perf_counter()
+        if self.start is None:
+            self.start = now
+        # Newest frame that is already due (or wait for the next one)
+        frame_id = max(self.next_id, int((now - self.start) * self.fps))
+        if frame_id >= self.total:
+            return False, None
+        due = self.start + frame_id / self.fps
+        if due > now:
+            time.sleep(due - now)
+        self.next_id = frame_id + 1
+
+        if image is None or image.shape != (FRAME_HEIGHT, FRAME_WIDTH, 3):
+            image = np.empty((FRAME_HEIGHT, FRAME_WIDTH, 3), np.uint8)
+        image.fill(40)
+        encode_frame_id(image, frame_id)
+        if self.probe:
+            self.probe.frames[frame_id] = {'capture': due, 'read': time.perf_counter()}
+        return True, image
+
+    def release(self):
+        pass
+
+
+class ScriptedBackend(PoseBackend):
+    """
+    Pose backend that decodes the frame ID and returns the scripted
+    landmarks for that frame. Optionally runs a real backend on the frame
+    too (results discarded) so inference cost is realistic.
+    """
+
+    name = "scripted"
+
+    def __init__(self, trace, probe=None, inference=None):
+        self.trace = trace
+        self.probe = probe
+        self.inference = create_backend(inference) if inference else None
+        self.points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self.last_frame_id = None
+
+    def detect(self, frame, indices=None):
+        frame_id = decode_frame_id(frame)
+        if self.inference:
+            self.inference.detect(frame, indices)
+        landmarks = self.trace.frames[frame_id] if frame_id < len(self.trace.frames) else None
+        self.last_frame_id = frame_id
+        if self.probe and frame_id in self.probe.frames:
+            self.probe.frames[frame_id]['pose'] = time.perf_counter()
+        if landmarks is None:
+            return None
+        points = self.points
+        points[:, 2] = 0.0
+        for name, joint in landmarks.items():
+            # Frame heights back to MediaPipe's per-axis normalization
+            points[LANDMARK_INDEX[name]] = (joint['x'] * FRAME_HEIGHT / FRAME_WIDTH, joint['y'], joint['visibility'])
+        return points
+
+    def close(self):
+        if self.inference:
+            self.inference.close()
+
+
+class ProbeBus(EventBus):
+    """EventBus that notes which frame each RepCounted came from and when it was published."""
+
+    def __init__(self, probe, backend):
+        super().__init__()
+        self.probe = probe
+        self.backend = backend
+
+    def publish(self, event):
+        if isinstance(event, RepCounted):
+            # count_rep() runs right after detect() on the same thread
+            self.probe.reps[event.rep] = {'frame': self.backend.last_frame_id, 'published': time.perf_counter()}
+        super().publish(event)
+
+
+class LatencyProbe:
+    """Collects per-frame and per-rep stage timestamps."""
+
+    def __init__(self):
+        self.frames = {}
+        self.reps = {}
+        self.previews = {}
+
+    def on_dispatched(self, event):
+        if isinstance(event, RepCounted) and event.rep in self.reps:
+            self.reps[event.rep]['dispatched'] = time.perf_counter()
+
+    def on_handled(self, event):
+        if isinstance(event, RepCounted) and event.rep in self.reps:
+            self.reps[event.rep]['handled'] = time.perf_counter()
+
+    def on_paint(self, hud, region):
+        now = time.perf_counter()
+        if region.intersects(hud.rects['rep_count']):
+            shown = hud.rows['rep']['count'].split("/")[0]
+            if shown.isdigit():
+                for rep in range(1, int(shown) + 1):
+                    record = self.reps.get(rep)
+                    if record is not None and 'painted' not in record:
+                        record['painted'] = now
+        if hud.has_camera_frame and region.intersects(hud.rects['camera']):
+            self.previews.setdefault(decode_frame_id(hud.camera_rgb), now)
+
+    def report(self):
+        """
+        Latency per stage in milliseconds.
+
+        Returns:
+        - Dictionary of stage name -> list of latencies
+        """
+        stages = {name: [] for name in (
+            "capture -> read", "read -> pose", "pose -> published", "published -> dispatched",
+            "dispatched -> handled", "handled -> painted", "TOTAL capture -> rep painted",
+            "TOTAL capture -> preview painted",
+        )}
+        for record in self.reps.values():
+            frame = self.frames.get(record['frame'])
+            if frame is None or 'pose' not in frame or 'painted' not in record:
+                continue
+            steps = [frame['capture'], frame['read'], frame['pose'], record['published'],
+                     record.get('dispatched'), record.get('handled'), record['painted']]
+            if None in steps:
+                continue
+            for name, start, end in zip(list(stages)[:6], steps, steps[1:]):
+                stages[name].append((end - start) * 1000)
+            stages["TOTAL capture -> rep painted"].append((steps[-1] - steps[0]) * 1000)
+        for frame_id, painted in self.previews.items():
+            frame = self.frames.get(frame_id)
+            if frame is not None:
+                stages["TOTAL capture -> preview painted"].append((painted - frame['capture']) * 1000)
+        return stages
+
+
+def print_report(stages):
+    print("=" * 76)
+    print(f"{'STAGE':34s} {'N':>5s} {'P50 ms':>8s} {'P95 ms':>8s} {'P99 ms':>8s} {'MAX ms':>8s}")
+    print("=" * 76)
+    for name, values in stages.items():
+        if not values:
+            print(f"{name:34s} {0:5d} {'-':>8s} {'-':>8s} {'-':>8s} {'-':>8s}")
+            continue
+        values = sorted(values)
+        quantiles = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else [values[0]] * 99
+        print(f"{name:34s} {len(values):5d} {quantiles[49]:8.1f} {quantiles[94]:8.1f} "
+              f"{quantiles[98]:8.1f} {values[-1]:8.1f}")
+    print("=" * 76)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure capture -> repaint latency with a synthetic camera")
+    parser.add_argument("--reps", type=int, default=20, help="Scripted reps after calibration")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--inference", help="Also run this pose backend on every frame, e.g. mediapipe")
+    args = parser.parse_args()
+
+    trace = generate_trace(ExerciseType.PUSHUPS, n_reps=args.reps, seed=args.seed,
+                           fps=args.fps, fps_variation=False)
+    probe = LatencyProbe()
+    camera = SyntheticCamera(len(trace.frames), args.fps, probe)
+    backend = ScriptedBackend(trace, probe, args.inference)
+
+    app = QApplication(sys.argv[:1])
+    events = ProbeBus(probe, backend)
+    events.subscribe(probe.on_dispatched, RepCounted)
+
+    overlay = WorkoutOverlay()
+    overlay.total_reps = 1000
+    overlay.total_sets = 1
+    overlay.show()
+    overlay.switch_to_main_screen()
+    overlay.hud.paint_hook = lambda region: probe.on_paint(overlay.hud, region)
+
+    workout_thread = WorkoutThread(camera, events, reps_per_set=1000, total_sets=1,
+                                   target_fps=args.fps, backend=backend)
+    workout_thread.update_camera_frame.connect(overlay.take_camera_frame)
+    bridge = EventBridge()
+    bridge.event_received.connect(overlay.handle_event)
+    bridge.event_received.connect(probe.on_handled)  # Runs after the overlay's handler
+    events.subscribe(bridge.emit_event)
+
+    # Give the last repaint a moment after the camera runs out
+    workout_thread.finished.connect(lambda: QTimer.singleShot(500, app.quit))
+
+    print(f"Running {len(trace.frames)} synthetic frames ({len(trace.frames) / args.fps:.0f}s, "
+          f"{args.reps} reps) through the pipeline...")
+    events.start()
+    workout_thread.start()
+    app.exec_()
+    events.stop()
+
+    print(f"Reps counted: {len(probe.reps)}/{args.reps}, preview frames painted: {len(probe.previews)}")
+    print_report(probe.report())
+
+
+if __name__ == "__main__":
+    main()
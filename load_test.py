@@ -0,0 +1,279 @@
+import argparse
+import os
+import statistics
+import threading
+import time
+
+import cv2
+
+from events import EventBus
+from fake_droidcam import FakeDroidCam, FrameSource, read_stamp, stamp_age_ms, STAMP_WRAP
+from process_stats import host_cpu_times
+from resource_governor import ResourceGovernor
+from workout_session import WorkoutSession
+
+# Load test: how many camera streams can this host run the full pipeline
+# on? For each stream count, that many WorkoutSessions (the loop
+# WorkoutThread and headless.py run) read their own stream from a
+# FakeDroidCam, and every stream's frame rate, latency and dropped frames
+# are measured from the stamps the server puts in each frame:
+#
+#   latency  stamp (server sent the frame) -> the pipeline read it
+#   dropped  sequence numbers that never reached the pipeline: lost on
+#            purpose by the server, skipped because the client was too
+#            slow, or dropped by the decoder
+#
+# The server runs in this process by default, so its JPEG encoding competes
+# for the same CPU. To measure the pipeline alone, start fake_droidcam.py on
+# another machine (with synced clocks) and pass --url.
+#
+#   python load_test.py --streams 1 2 4 8 16 --seconds 20 --video pushups.mp4
+#   python load_test.py --streams 8 16 24 --url http://192.168.0.50:4747/video --governor
+
+
+class ProbedCapture:
+    """
+    cv2.VideoCapture wrapper that reads the stamp of every frame it returns.
+
+    The connection is opened on the first read(): WorkoutSession waits a
+    few seconds after "opening" the camera, and a stream connected during
+    that wait would start the test with seconds of frames queued up.
+    """
+
+    def __init__(self, url, warmup=1.0):
+        """
+        Parameters:
+        - url: Stream URL
+        - warmup: Seconds after the first frame that are not measured
+        """
+        self.url = url
+        self.cap = None
+        self.warmup = warmup
+        self.first_read = None
+        self.started = None
+        self.last_read = None
+        self.frames = 0
+        self.dropped = 0
+        self.latencies_ms = []
+        self._last_sequence = None
+
+    def isOpened(self):
+        return True  # Connects on the first read()
+
+    def get(self, prop):
+        return self.cap.get(prop) if self.cap is not None else 0.0
+
+    def read(self, image=None):
+        if self.cap is None:
+            self.cap = cv2.VideoCapture(self.url)
+        ret, frame = self.cap.read(image)
+        if not ret:
+            return ret, frame
+        now = time.monotonic()
+        sequence, millis = read_stamp(frame)
+        if self.first_read is None:
+            self.first_read = now
+        if now - self.first_read >= self.warmup:
+            if self.started is None:
+                self.started = now
+            else:
+                self.frames += 1
+                self.dropped += (sequence - self._last_sequence - 1) % STAMP_WRAP
+                self.latencies_ms.append(stamp_age_ms(millis))
+            self.last_read = now
+        self._last_sequence = sequence
+        return ret, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+    def result(self):
+        """
+        Returns:
+        - Dictionary with fps, frames, dropped, drop_rate and latencies_ms
+          (all zero if the stream could not be read)
+        """
+        elapsed = (self.last_read - self.started) if self.started is not None else 0.0
+        received = self.frames + self.dropped
+        return {
+            'fps': self.frames / elapsed if elapsed > 0 else 0.0,
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'drop_rate': self.dropped / received if received else 0.0,
+            'latencies_ms': self.latencies_ms,
+        }
+
+
+def run_streams(url, streams, seconds, backend="mediapipe", target_fps=30.0, governor=False, pin=False):
+    """
+    Run one WorkoutSession per stream for a while.
+
+    Parameters:
+    - url: Stream URL (every session opens its own connection)
+    - streams: Number of concurrent sessions
+    - seconds: How long to measure (after each session's connection delay and warmup)
+    - backend: Pose backend spec
+    - target_fps: Frame rate the sessions set their frame deadlines for
+    - governor, pin: Share the CPU with a ResourceGovernor (see resource_governor.py)
+
+    Returns:
+    - Dictionary with streams (per-stream results from ProbedCapture plus
+      inference_ms and deadline_misses), cpu_percent of this process and
+      host_busy (0-1, None if unknown)
+    """
+    resource_governor = None
+    if governor or pin:
+        resource_governor = ResourceGovernor(streams, pin=pin)
+        resource_governor.configure()
+
+    sessions = []
+    for index in range(streams):
+        sessions.append(WorkoutSession(
+            ProbedCapture(url), EventBus(), reps_per_set=10_000, total_sets=1, target_fps=target_fps, backend=backend,
+            budget=resource_governor.budget(index) if resource_governor else None
+        ))
+
+    threads = [
+        threading.Thread(target=session.run, name=f"LoadTest-{index}", daemon=True)
+        for index, session in enumerate(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    if resource_governor:
+        resource_governor.start()
+
+    # WorkoutSession waits 3 s after connecting, then the capture's warmup
+    time.sleep(3.0 + sessions[0].camera_source.warmup)
+    cpu_start, host_start, wall_start = os.times(), host_cpu_times(), time.monotonic()
+    time.sleep(seconds)
+    cpu_end, host_end, wall_end = os.times(), host_cpu_times(), time.monotonic()
+
+    for session in sessions:
+        session.stop()
+    for thread in threads:
+        thread.join(timeout=10)
+    if resource_governor:
+        resource_governor.stop()
+
+    results = []
+    for session in sessions:
+        result = session.camera_source.result()
+        stats = session.scheduler.stats()
+        result['inference_ms'] = stats['stage_ms'].get('inference', 0.0)
+        result['deadline_misses'] = stats['deadline_misses']
+        results.append(result)
+        session.camera_source.release()
+
+    cpu = (cpu_end.user + cpu_end.system) - (cpu_start.user + cpu_start.system)
+    host_busy = None
+    if host_start is not None and host_end is not None and host_end[1] > host_start[1]:
+        host_busy = (host_end[0] - host_start[0]) / (host_end[1] - host_start[1])
+    return {
+        'streams': results,
+        'cpu_percent': cpu / (wall_end - wall_start) * 100,
+        'host_busy': host_busy,
+    }
+
+
+def summarize(run):
+    """
+    One table row for a stream count.
+
+    Returns:
+    - Dictionary with streams, fps_mean, fps_min, latency_p50, latency_p95,
+      drop_rate, inference_ms, cpu_percent and host_busy
+    """
+    streams = run['streams']
+    latencies = sorted(value for stream in streams for value in stream['latencies_ms'])
+    received = sum(stream['frames'] + stream['dropped'] for stream in streams)
+    if len(latencies) > 1:
+        quantiles = statistics.quantiles(latencies, n=20, method="inclusive")
+        p50, p95 = statistics.median(latencies), quantiles[-1]
+    else:
+        p50 = p95 = latencies[0] if latencies else float("nan")
+    return {
+        'streams': len(streams),
+        'fps_mean': statistics.fmean(stream['fps'] for stream in streams),
+        'fps_min': min(stream['fps'] for stream in streams),
+        'latency_p50': p50,
+        'latency_p95': p95,
+        'drop_rate': sum(stream['dropped'] for stream in streams) / received if received else 0.0,
+        'inference_ms': statistics.fmean(stream['inference_ms'] for stream in streams),
+        'cpu_percent': run['cpu_percent'],
+        'host_busy': run['host_busy'],
+    }
+
+
+def keeps_up(row, target_fps, max_drop, max_latency_ms):
+    """True if every stream held its frame rate within the drop and latency limits."""
+    return (row['fps_min'] >= 0.9 * target_fps
+            and row['drop_rate'] <= max_drop
+            and row['latency_p95'] <= max_latency_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find how many camera streams this host can process")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Stream counts to try, in order")
+    parser.add_argument("--seconds", type=float, default=15.0, help="Measurement time per stream count")
+    parser.add_argument("--url", help="Use a running fake_droidcam.py (or a real camera) instead of "
+                                      "starting a server in this process")
+    parser.add_argument("--video", help="Video for the in-process server (default: synthetic frames)")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=float, default=30.0, help="Stream and pipeline frame rate")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--backend", default="mediapipe", help="Pose backend spec (see pose_backends.py)")
+    parser.add_argument("--governor", action="store_true", help="Share the CPU with a ResourceGovernor")
+    parser.add_argument("--pin-cpus", action="store_true", help="With --governor: pin sessions to cores")
+    parser.add_argument("--max-drop", type=float, default=0.05, help="Drop rate a stream count may have")
+    parser.add_argument("--max-latency-ms", type=float, default=200.0, help="P95 latency a stream count may have")
+    args = parser.parse_args()
+
+    camera = None
+    url = args.url
+    if url is None:
+        source = FrameSource(args.video, args.width, args.height)
+        camera = FakeDroidCam(source, port=0, fps=args.fps, jitter_ms=args.jitter_ms, loss=args.loss, seed=0)
+        camera.start()
+        url = camera.url(args.width, args.height)
+        print(f"Serving {args.video or 'synthetic frames'} at {url} "
+              f"({args.fps:g} FPS, jitter {args.jitter_ms:g} ms, loss {args.loss:.0%})")
+
+    rows = []
+    for streams in args.streams:
+        print(f"Running {streams} stream(s) for {args.seconds:g}s...")
+        rows.append(summarize(run_streams(url, streams, args.seconds, args.backend, args.fps,
+                                          args.governor, args.pin_cpus)))
+    if camera:
+        camera.stop()
+
+    print("=" * 96)
+    print(f"{'STREAMS':>7s} {'FPS MEAN':>9s} {'FPS MIN':>8s} {'P50 ms':>7s} {'P95 ms':>7s} {'DROPPED':>8s} "
+          f"{'POSE ms':>8s} {'CPU %':>7s} {'HOST':>6s} {'OK':>4s}")
+    print("=" * 96)
+    limit = None
+    for row in rows:
+        ok = keeps_up(row, args.fps, args.max_drop, args.max_latency_ms)
+        if ok and (limit is None or row['streams'] > limit):
+            limit = row['streams']
+        host = f"{row['host_busy']:6.0%}" if row['host_busy'] is not None else f"{'-':>6s}"
+        print(f"{row['streams']:7d} {row['fps_mean']:9.1f} {row['fps_min']:8.1f} {row['latency_p50']:7.0f} "
+              f"{row['latency_p95']:7.0f} {row['drop_rate']:8.1%} {row['inference_ms']:8.1f} "
+              f"{row['cpu_percent']:7.0f} {host} {'yes' if ok else 'no':>4s}")
+    print("=" * 96)
+    if limit is None:
+        print(f"No stream count kept up (>= {0.9 * args.fps:.0f} FPS per stream, <= {args.max_drop:.0%} dropped, "
+              f"P95 <= {args.max_latency_ms:.0f} ms)")
+    else:
+        print(f"This host keeps up with {limit} stream(s) at {args.fps:g} FPS "
+              f"(>= {0.9 * args.fps:.0f} FPS per stream, <= {args.max_drop:.0%} dropped, "
+              f"P95 <= {args.max_latency_ms:.0f} ms)")
+    if camera:
+        print("The server ran in this process; its JPEG encoding is included in CPU %.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,155 +1,165 @@
-import sys
-import cv2
 import time
+STARTED = time.perf_counter()  # For the startup report (before the heavy imports)
+
+import json
+import sys
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QThread, pyqtSignal, Qt, QTimer
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, Qt, QTimer
 
-from pose_detection import detect_pose
-from rep_counter import RepCounter
+from config import load_config, backend_for, profile_for
+from events import EventBus, ConsoleLogger, CameraConnected
+from frame_buffers import FrameMailbox
 from overlay import WorkoutOverlay
+from process_stats import startup_report
+from replay_buffer import ReplayBuffer
+from session_recorder import SessionRecorder
+from workout_session import WorkoutSession
+
+
+class EventBridge(QObject):
+    """
+    Forwards events from the EventBus dispatcher thread to the GUI thread.
+    Subscribe emit_event() to the bus and connect event_received to the overlay.
+    """
+
+    event_received = pyqtSignal(object)
+
+    def emit_event(self, event):
+        self.event_received.emit(event)
 
 
 class WorkoutThread(QThread):
     """
     Separate thread for camera/pose detection.
     Prevents GUI from freezing.
+
+    Runs a WorkoutSession; progress goes out as events on the EventBus and
+    only camera frames are sent to the overlay through a Qt signal.
     """
-    
-    # Signals to communicate with overlay
-    update_progress = pyqtSignal(int, int, int, int, str)
-    update_camera_frame = pyqtSignal(object)  # NEW: Send camera frames to overlay
-    camera_connected = pyqtSignal()  # NEW: Signal when camera connects
-    calibrating = pyqtSignal()
-    ready = pyqtSignal()
-    complete = pyqtSignal()
-    
-    def __init__(self, camera_source):
+
+    # Carries the FrameMailbox with the newest preview; emitted only when the
+    # GUI has taken the previous frame, so a busy GUI skips to the latest one
+    update_camera_frame = pyqtSignal(object)
+
+    def __init__(self, camera_source, events, recorder=None, reps_per_set=12, total_sets=3,
+                 exercise_type=None, target_fps=WorkoutSession.TARGET_FPS, backend="mediapipe",
+                 capture_profile="native", checkpoint=None, replay=None):
         super().__init__()
-        self.camera_source = camera_source
-        self.running = True
-        self.counter = RepCounter(reps_per_set=12, total_sets=3)
-    
+        self.session = WorkoutSession(
+            camera_source, events,
+            reps_per_set=reps_per_set,
+            total_sets=total_sets,
+            exercise_type=exercise_type,
+            recorder=recorder,
+            on_frame=self._post_frame,
+            target_fps=target_fps,
+            backend=backend,
+            capture_profile=capture_profile,
+            checkpoint=checkpoint,
+            replay=replay
+        )
+        self.counter = self.session.counter
+        self.replay = replay
+        self.frames = FrameMailbox()  # The session reuses its preview buffers, so the GUI gets copies
+
+    def _post_frame(self, frame):
+        if self.frames.put(frame):
+            self.update_camera_frame.emit(self.frames)
+
     def run(self):
         """Main workout tracking loop."""
-        max_attempts = 5
-        attempt = 1
-        cap = None
-        
-        while attempt <= max_attempts:
-            cap = cv2.VideoCapture(self.camera_source)
-            if cap.isOpened():
-                break
-                
-            print(f"Camera connection attempt {attempt} of {max_attempts} failed")
-            self.update_progress.emit(0, 0, 0, 0, f"CONNECTION ATTEMPT {attempt}/{max_attempts}")
-            attempt += 1
-            time.sleep(2)  # Wait 2 seconds between attempts
-            
-        if not cap or not cap.isOpened():
-            print("ERROR: Cannot access camera after all attempts")
-            self.update_progress.emit(0, 0, 0, 0, "CAMERA CONNECTION FAILED")
-            return
-            
-        print("Workout tracker started!")
-        time.sleep(3)  # Extra delay to ensure stable connection
-        
-        # Signal that camera is connected
-        self.camera_connected.emit()
-        
-        while self.running:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Detect pose
-            landmarks, annotated_frame = detect_pose(frame)
-            
-            # Send camera frame to overlay for display in corner
-            self.update_camera_frame.emit(annotated_frame)
-            
-            # Calibration phase
-            if not self.counter.is_calibrated:
-                self.calibrating.emit()
-                self.counter.calibrate(landmarks)
-                
-                if self.counter.is_calibrated:
-                    self.ready.emit()
-            else:
-                # Counting phase
-                progress = self.counter.count_rep(landmarks)
-                
-                # Update overlay
-                message = f"STATUS: Set {progress['sets']}, Rep {progress['reps']} - Position: {progress['state']}"
-                self.update_progress.emit(
-                    progress['reps'],
-                    progress['sets'],
-                    self.counter.reps_per_set,
-                    self.counter.total_sets,
-                    message
-                )
-                
-                # Check completion
-                if progress['completed']:
-                    self.complete.emit()
-                    self.running = False
-            
-            # Optional: Display camera feed in separate window (for debugging)
-            # cv2.imshow("Camera Feed", annotated_frame)
-            
-            # Check for 'q' key
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                self.running = False
-                break
-        
-        cap.release()
-        cv2.destroyAllWindows()
-    
+        self.session.run()
+
     def stop(self):
-        """Stop the workout thread."""
-        self.running = False
+        """Stop the workout thread (the loop exits after the current frame)."""
+        self.session.stop()
 
 
 def main():
     """Main function to run the complete workout tracker."""
-    
+    config = load_config(description="RepBot workout tracker (GUI)")
+
     # Create PyQt application
-    app = QApplication(sys.argv)
-    
+    app = QApplication(sys.argv[:1])
+
+    # Event bus: the frame loop publishes, subscribers run on the bus thread
+    events = EventBus()
+    events.subscribe(ConsoleLogger())
+
     # Create overlay
-    overlay = WorkoutOverlay()
-    
+    overlay = WorkoutOverlay(opacity=config['opacity'])
+    overlay.total_reps = config['reps_per_set']
+    overlay.total_sets = config['total_sets']
+
     # Start connection animation
     overlay.start_connection_animation()
-    
+
     # Show overlay
     overlay.show()
-    
-    # Create workout thread
-    camera_source = "http://192.168.0.109:4747/video"  # Change to your camera
-    # camera_source = 0  # Or use laptop webcam
-    
-    workout_thread = WorkoutThread(camera_source)
-    
-    # Connect signals to overlay methods
-    workout_thread.update_progress.connect(overlay.update_progress)
-    workout_thread.update_camera_frame.connect(overlay.update_camera_feed)
-    workout_thread.calibrating.connect(overlay.update_calibrating)
-    workout_thread.ready.connect(overlay.update_ready)
-    workout_thread.complete.connect(overlay.update_complete)
-    
+
+    # Camera comes from --source / the config file (the overlay shows one camera)
+    camera_source = config['sources'][0]
+    if len(config['sources']) > 1:
+        print("NOTE: The GUI tracks one camera; use headless.py for several")
+
+    # Optional: save the annotated session video in the background (at the loop's rate)
+    recorder = SessionRecorder(config['record'], fps=config['target_fps']) if config['record'] else None
+
+    # Optional: keep the last reps as small JPEGs for instant replay ('r' / 's')
+    replay = ReplayBuffer(budget_bytes=int(config['replay_mb'] * 1_000_000)) if config['replay_mb'] > 0 else None
+
+    workout_thread = WorkoutThread(
+        camera_source, events, recorder,
+        reps_per_set=config['reps_per_set'],
+        total_sets=config['total_sets'],
+        exercise_type=config['exercise'],
+        target_fps=config['target_fps'],
+        backend=backend_for(config, 0),
+        capture_profile=profile_for(config, 0),
+        checkpoint=config['checkpoint'],
+        replay=replay
+    )
+    workout_thread.update_camera_frame.connect(overlay.take_camera_frame)
+
+    if config['startup_only']:
+        print(json.dumps(startup_report("gui", time.perf_counter() - STARTED)))
+        return
+
+    # Deliver bus events to the overlay on the GUI thread
+    bridge = EventBridge()
+    bridge.event_received.connect(overlay.handle_event)
+    events.subscribe(bridge.emit_event)
+
     # When camera connects, switch to main screen after a short delay
-    def on_camera_connected():
-        # Give the connection animation time to finish
-        QTimer.singleShot(2000, overlay.switch_to_main_screen)
-    
-    workout_thread.camera_connected.connect(on_camera_connected)
-    
+    def on_event(event):
+        if isinstance(event, CameraConnected):
+            # Give the connection animation time to finish
+            QTimer.singleShot(2000, overlay.switch_to_main_screen)
+
+    bridge.event_received.connect(on_event)
+
+    # 'q' / Esc on the overlay ends the session
+    def on_quit():
+        workout_thread.stop()
+        workout_thread.wait(3000)
+        app.quit()
+
+    overlay.quit_requested.connect(on_quit)
+
+    # 'r' / 's' replays the last rep / set in the camera area
+    if replay is not None:
+        overlay.replay_requested.connect(lambda kind: overlay.play_replay(*replay.clip(kind)))
+
     # Start workout tracking (starts immediately but overlay shows connection first)
+    events.start()
     workout_thread.start()
-    
+
     # Run application
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    events.stop()
+    print(f"HUD paint stats: {overlay.hud.paint_stats()}")
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,478 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from exercises import EXERCISES, HORIZONTAL_EXERCISES, ExerciseType
+from pose_backends import landmarks_to_array, mp
+from pose_detection import create_pose_detector, extract_landmarks
+from rep_counter import RepCounter
+
+# Multi-person mode for group classes: find every person in the frame, give
+# each one a stable track ID and route each track to its own RepCounter.
+#
+# Two ways to get per-person poses:
+# - Crops (default): a person detector finds people every few frames, then
+#   each track runs its own pose backend on its crop. Between detections
+#   the crop follows the person's own landmarks, so the detector cost is
+#   spread out and pose cost grows with the number of people.
+# - Batched: with a MediaPipe Tasks pose landmarker model (.task file) one
+#   inference returns the poses of everybody in the frame at once.
+#
+# The crop mode's default detector is OpenCV's HOG people detector, which
+# is trained on upright people and misses people lying down. For push-ups
+# and sit-ups it also searches the frame turned 90 degrees both ways (a
+# lying person is upright there), but that is a fallback: the batched
+# landmarker finds people in any posture and is the better choice for
+# horizontal exercises.
+
+
+class PersonDetector:
+    """
+    Finds people with OpenCV's HOG people detector (CPU only, no model files).
+    Runs on a downscaled copy of the frame for speed.
+
+    HOG only finds upright people. With rotations, the frame is also
+    searched turned by each rotation (cv2.ROTATE_* codes) so people lying
+    horizontally are found; boxes found in several orientations are merged.
+    """
+
+    LYING = (cv2.ROTATE_90_CLOCKWISE, cv2.ROTATE_90_COUNTERCLOCKWISE)  # Head to the left or to the right
+    NMS_THRESHOLD = 0.3  # Boxes overlapping more than this are the same person
+
+    def __init__(self, scale=0.5, min_confidence=0.3, rotations=()):
+        self.scale = scale
+        self.min_confidence = min_confidence
+        self.rotations = tuple(rotations)
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(self, frame):
+        """
+        Parameters:
+        - frame: BGR frame
+
+        Returns:
+        - List of (x0, y0, x1, y1) boxes in full-frame pixels
+        """
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        found = self._detect(small, None)
+        for rotation in self.rotations:
+            found += self._detect(cv2.rotate(small, rotation), rotation, small.shape[:2])
+
+        # Strongest first; drop boxes that overlap one already kept
+        boxes = []
+        for weight, box in sorted(found, reverse=True):
+            if all(box_iou(box, kept) <= self.NMS_THRESHOLD for kept in boxes):
+                boxes.append(box)
+        return [tuple(int(v / self.scale) for v in box) for box in boxes]
+
+    def _detect(self, image, rotation, size=None):
+        """HOG boxes in image as (weight, box), mapped back to the unrotated (height, width) size."""
+        rects, weights = self.hog.detectMultiScale(image, winStride=(8, 8), padding=(8, 8), scale=1.05)
+        found = []
+        for (x, y, w, h), weight in zip(rects, np.ravel(weights)):
+            if weight < self.min_confidence:
+                continue
+            x0, y0, x1, y1 = x, y, x + w, y + h
+            if rotation == cv2.ROTATE_90_CLOCKWISE:
+                x0, y0, x1, y1 = y0, size[0] - x1, y1, size[0] - x0
+            elif rotation == cv2.ROTATE_90_COUNTERCLOCKWISE:
+                x0, y0, x1, y1 = size[1] - y1, x0, size[1] - y0, x1
+            found.append((float(weight), (x0, y0, x1, y1)))
+        return found
+
+
+class BatchedPoseDetector:
+    """
+    Returns the poses of everybody in the frame in one inference, using a
+    MediaPipe Tasks pose landmarker model (e.g. pose_landmarker_lite.task).
+    """
+
+    def __init__(self, model_path, max_people=6):
+        vision = mp.tasks.vision
+        options = vision.PoseLandmarkerOptions(
+            base_options=mp.tasks.BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.VIDEO,
+            num_poses=max_people,
+            min_pose_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.landmarker = vision.PoseLandmarker.create_from_options(options)
+        self.last_timestamp_ms = -1
+
+    def detect(self, frame, timestamp):
+        """
+        Parameters:
+        - frame: BGR frame
+        - timestamp: Capture time in seconds
+
+        Returns:
+        - List of (33, 3) landmark arrays normalized to the full frame
+        """
+        # The landmarker needs strictly increasing timestamps
+        timestamp_ms = max(int(timestamp * 1000), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        poses = self.landmarker.detect_for_video(image, timestamp_ms).pose_landmarks
+        return [landmarks_to_array(landmarks) for landmarks in poses]
+
+    def close(self):
+        self.landmarker.close()
+
+
+class Track:
+    """One person followed across frames."""
+
+    def __init__(self, track_id, box, counter, detector=None):
+        self.id = track_id
+        self.box = box
+        self.counter = counter
+        self.detector = detector  # Per-person pose backend (crop mode only)
+        self.missed = 0
+        self.landmarks = None
+        self.progress = None
+
+
+def box_iou(a, b):
+    """Intersection over union of two (x0, y0, x1, y1) boxes."""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    intersection = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def landmark_box(points, width, height, offset_x=0, offset_y=0, min_visibility=0.3):
+    """
+    Bounding box of all visible landmarks in full-frame pixels.
+
+    Parameters:
+    - points: (33, 3) landmark array normalized to the processed image
+
+    Returns:
+    - (x0, y0, x1, y1) or None if no landmark is visible
+    """
+    visible = points[points[:, 2] > min_visibility]
+    if not len(visible):
+        return None
+    (x0, y0), (x1, y1) = visible[:, :2].min(axis=0), visible[:, :2].max(axis=0)
+    return (offset_x + float(x0) * width, offset_y + float(y0) * height,
+            offset_x + float(x1) * width, offset_y + float(y1) * height)
+
+
+class MultiPersonTracker:
+    """
+    Tracks several people in one camera and counts reps for each of them.
+    """
+
+    DETECT_INTERVAL = 10     # Frames between person detections (crop mode)
+    MAX_MISSED = 15          # Frames a track may go without a pose before it is dropped
+    IOU_THRESHOLD = 0.3      # Minimum overlap to match a detection to a track (or to merge two tracks)
+    CROP_MARGIN = 0.25       # Extra space around a person's box, as a fraction of its size
+    # Crop sides are rounded up to one of these so the pose backends see a few
+    # input sizes and reuse their buffers, instead of a new size almost every frame
+    CROP_SIZES = (64, 96, 128, 192, 256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096)
+
+    def __init__(self, reps_per_set=12, total_sets=3, exercise=None, person_detector=None,
+                 batched_model_path=None, max_people=6, events_factory=None, backend="mediapipe"):
+        """
+        Initialize the tracker.
+
+        Parameters:
+        - reps_per_set, total_sets, exercise: Passed to every person's RepCounter
+        - person_detector: Detector for crop mode (default: PersonDetector, which also
+          searches rotated frames for horizontal exercises)
+        - batched_model_path: MediaPipe Tasks pose landmarker model; enables batched mode
+        - max_people: Most people tracked at once
+        - events_factory: Optional function track_id -> EventBus for that person's RepCounter
+        - backend: Pose backend spec for each person's crop (see pose_backends.py)
+        """
+        self.reps_per_set = reps_per_set
+        self.total_sets = total_sets
+        self.exercise = exercise
+        self.max_people = max_people
+        self.events_factory = events_factory
+        self.backend = backend
+
+        self.batched = BatchedPoseDetector(batched_model_path, max_people) if batched_model_path else None
+        self.person_detector = None
+        if not self.batched:
+            self.person_detector = person_detector or self._default_person_detector()
+
+        self.tracks = {}
+        self.next_id = 1
+        self.frame_index = 0
+
+    def _default_person_detector(self):
+        """HOG detector; for exercises done lying down it also searches the frame turned sideways."""
+        exercise_type = self.exercise.type if self.exercise else ExerciseType.PUSHUPS
+        if exercise_type not in HORIZONTAL_EXERCISES:
+            return PersonDetector()
+        print(f"⚠️  {exercise_type.value} are done lying down: the HOG person detector is made for upright "
+              f"people and only finds them in rotated frames, which is slower and less reliable. "
+              f"Pass a pose landmarker model (--batched-model) to find people in any posture")
+        return PersonDetector(rotations=PersonDetector.LYING)
+
+    def _new_track(self, box):
+        track_id = self.next_id
+        self.next_id += 1
+        events = self.events_factory(track_id) if self.events_factory else None
+        counter = RepCounter(self.reps_per_set, self.total_sets, exercise=self.exercise, events=events)
+        detector = None if self.batched else create_pose_detector(self.backend)
+        track = Track(track_id, box, counter, detector)
+        self.tracks[track_id] = track
+        return track
+
+    def _drop_track(self, track_id):
+        track = self.tracks.pop(track_id)
+        if track.detector is not None:
+            track.detector.close()
+
+    def _associate(self, boxes):
+        """
+        Greedily match boxes to tracks by overlap.
+
+        Returns:
+        - List of (track, box_index) pairs, one per box (new tracks for unmatched boxes)
+        """
+        pairs = sorted(
+            ((box_iou(track.box, box), track_id, i)
+             for track_id, track in self.tracks.items()
+             for i, box in enumerate(boxes)),
+            reverse=True
+        )
+        matched = {}
+        used_tracks = set()
+        for iou, track_id, i in pairs:
+            if iou < self.IOU_THRESHOLD:
+                break
+            if track_id in used_tracks or i in matched:
+                continue
+            matched[i] = self.tracks[track_id]
+            used_tracks.add(track_id)
+
+        result = []
+        for i, box in enumerate(boxes):
+            track = matched.get(i)
+            if track is None:
+                if len(self.tracks) >= self.max_people:
+                    continue
+                track = self._new_track(box)
+            track.box = box
+            result.append((track, i))
+        return result
+
+    def _merge_overlapping(self):
+        """
+        Drop tracks that have locked onto the same person as another track.
+
+        Between detections a track's box follows its own landmarks, so when
+        people overlap two crops can end up on one person. Of two tracks
+        whose boxes overlap more than IOU_THRESHOLD, the one with more
+        counting history (calibrated, further into the workout, then older)
+        is kept.
+        """
+        def history(track):
+            counter = track.counter
+            return counter.is_calibrated, counter.current_set, counter.current_rep, -track.id
+
+        tracks = sorted(self.tracks.values(), key=history, reverse=True)
+        kept = []
+        for track in tracks:
+            if any(box_iou(track.box, other.box) > self.IOU_THRESHOLD for other in kept):
+                self._drop_track(track.id)
+            else:
+                kept.append(track)
+
+    def _crop(self, frame, box):
+        """
+        Crop a box plus margin, grown to a standard size and kept inside the frame.
+
+        Returns:
+        - (crop, x0, y0), with crop None if the box is too small
+        """
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = box
+        margin_x = (x1 - x0) * self.CROP_MARGIN
+        margin_y = (y1 - y0) * self.CROP_MARGIN
+        x0, x1 = max(0, x0 - margin_x), min(width, x1 + margin_x)
+        y0, y1 = max(0, y0 - margin_y), min(height, y1 + margin_y)
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            return None, int(x0), int(y0)
+        x0, crop_w = self._snap(x0, x1, width)
+        y0, crop_h = self._snap(y0, y1, height)
+        return frame[y0:y0 + crop_h, x0:x0 + crop_w], x0, y0
+
+    def _snap(self, start, end, limit):
+        """
+        Grow [start, end) around its centre to the next CROP_SIZES length,
+        shifted to stay within [0, limit). Returns (start, length) in pixels.
+        """
+        length = next((size for size in self.CROP_SIZES if size >= end - start), limit)
+        if length >= limit:
+            return 0, limit
+        start = int(round((start + end - length) / 2))
+        return min(max(0, start), limit - length), length
+
+    def _update_crops(self, frame):
+        """Crop mode: run each track's own pose detector on its crop."""
+        if self.frame_index % self.DETECT_INTERVAL == 0 or not self.tracks:
+            self._associate(self.person_detector.detect(frame))
+
+        for track in self.tracks.values():
+            track.landmarks = None
+            crop, x0, y0 = self._crop(frame, track.box)
+            if crop is None:
+                continue
+            landmarks = track.detector.detect(crop)
+            if landmarks is None:
+                continue
+            crop_h, crop_w = crop.shape[:2]
+            track.landmarks = extract_landmarks(landmarks, crop_w, crop_h, x0, y0, self.exercise,
+                                                frame_height=frame.shape[0])
+            # Follow the person with their own landmarks until the next detection
+            box = landmark_box(landmarks, crop_w, crop_h, x0, y0)
+            if box is not None:
+                track.box = box
+        self._merge_overlapping()
+
+    def _update_batched(self, frame, timestamp):
+        """Batched mode: one inference for everybody, matched to tracks by box overlap."""
+        height, width = frame.shape[:2]
+        poses = self.batched.detect(frame, timestamp)
+        boxes = []
+        kept = []
+        for landmarks in poses:
+            box = landmark_box(landmarks, width, height)
+            if box is not None:
+                boxes.append(box)
+                kept.append(landmarks)
+
+        for track in self.tracks.values():
+            track.landmarks = None
+        for track, i in self._associate(boxes):
+            track.landmarks = extract_landmarks(kept[i], width, height, exercise=self.exercise)
+
+    def process(self, frame, timestamp=None):
+        """
+        Find, track and count every person in a frame.
+
+        Parameters:
+        - frame: BGR frame
+        - timestamp: Capture time in seconds (default: now)
+
+        Returns:
+        - List of Track objects currently followed (with .landmarks and .progress)
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        if self.batched:
+            self._update_batched(frame, timestamp)
+        else:
+            self._update_crops(frame)
+        self.frame_index += 1
+
+        for track_id in list(self.tracks):
+            track = self.tracks[track_id]
+            if track.landmarks is None:
+                track.missed += 1
+                if track.missed > self.MAX_MISSED:
+                    self._drop_track(track_id)
+                    continue
+            else:
+                track.missed = 0
+
+            if not track.counter.is_calibrated:
+                track.counter.calibrate(track.landmarks, timestamp)
+            else:
+                track.progress = track.counter.count_rep(track.landmarks, timestamp)
+
+        return list(self.tracks.values())
+
+    def close(self):
+        """Release every detector."""
+        for track_id in list(self.tracks):
+            self._drop_track(track_id)
+        if self.batched:
+            self.batched.close()
+
+
+def draw_tracks(frame, tracks):
+    """Draw each track's box, ID and rep count on the frame (in place)."""
+    for track in tracks:
+        x0, y0, x1, y1 = (int(v) for v in track.box)
+        color = (0, 255, 0) if track.landmarks else (0, 0, 255)
+        cv2.rectangle(frame, (x0, y0), (x1, y1), color, 2)
+        if track.progress:
+            label = f"#{track.id} SET {track.progress['sets']} REP {track.progress['reps']}"
+        else:
+            label = f"#{track.id} CALIBRATING"
+        cv2.putText(frame, label, (x0, max(20, y0 - 8)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return frame
+
+
+def benchmark(video_path, max_people=4, frames=150, batched_model_path=None, exercise=None):
+    """
+    Measure throughput against the number of people in the frame.
+
+    A single-person clip is tiled side by side 1..max_people times so the
+    number of people is controlled while each person keeps the same size.
+
+    Parameters:
+    - video_path: Recorded clip with one person
+    - max_people: Largest number of tiles to test
+    - frames: Frames processed per configuration
+    - batched_model_path: MediaPipe Tasks model to benchmark batched mode instead of crops
+    - exercise: Exercise performed in the clip (horizontal ones search rotated frames too in crop mode)
+
+    Returns:
+    - List of (people, fps, mean tracks found) tuples
+    """
+    cap = cv2.VideoCapture(video_path)
+    clip = []
+    while len(clip) < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        clip.append(frame)
+    cap.release()
+    if not clip:
+        raise ValueError(f"Cannot read frames from {video_path}")
+
+    results = []
+    for people in range(1, max_people + 1):
+        tracker = MultiPersonTracker(exercise=exercise, batched_model_path=batched_model_path, max_people=max_people)
+        tiled = [np.hstack([frame] * people) for frame in clip]
+        tracks_seen = 0
+        start = time.perf_counter()
+        for i, frame in enumerate(tiled):
+            tracks_seen += sum(track.landmarks is not None for track in tracker.process(frame, i / 30.0))
+        elapsed = time.perf_counter() - start
+        tracker.close()
+        results.append((people, len(tiled) / elapsed, tracks_seen / len(tiled)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-person tracking benchmark: FPS vs people in frame")
+    parser.add_argument("video", help="Recorded clip with one person in it")
+    parser.add_argument("--max-people", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--batched-model", help="MediaPipe Tasks pose landmarker .task file (batched mode)")
+    parser.add_argument("--exercise", choices=[e.name.lower() for e in ExerciseType], default="pushups")
+    args = parser.parse_args()
+    exercise = EXERCISES[ExerciseType[args.exercise.upper()]]
+
+    print("=" * 50)
+    print(f"{'PEOPLE':>8s} {'FPS':>10s} {'PER PERSON':>12s} {'TRACKED':>10s}")
+    print("=" * 50)
+    for people, fps, tracked in benchmark(args.video, args.max_people, args.frames, args.batched_model, exercise):
+        print(f"{people:8d} {fps:10.1f} {fps * people:12.1f} {tracked:10.2f}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
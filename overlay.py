@@ -1,20 +1,37 @@
 import sys
-import cv2
-import numpy as np
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel
-from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtGui import QFont, QImage, QPixmap
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont
+
+from events import (
+    CameraRetry, CameraFailed, CameraLost, CalibrationStarted, CalibrationProgress,
+    CalibrationFailed, CalibrationComplete, PositionChanged, RepCounted, SetCompleted,
+    WorkoutCompleted
+)
+from hud_widget import HudWidget
+from replay_buffer import render_replay_frame
 
 
 class WorkoutOverlay(QWidget):
     """
     Fullscreen overlay window with hacker aesthetic.
-    Always-on-top, semi-transparent, displays workout progress.
+    Always-on-top, optionally semi-transparent, displays workout progress.
     Now includes camera connection screen and live feed display.
     """
+
+    REPLAY_MAX_GAP = 0.2  # Seconds: longer gaps in a replay clip (dropped frames) are shortened
+
+    quit_requested = pyqtSignal()  # 'q' or Esc pressed
+    replay_requested = pyqtSignal(str)  # 'r' (last rep) or 's' (last set) pressed
     
-    def __init__(self):
-        """Initialize the fullscreen overlay window."""
+    def __init__(self, opacity=1.0):
+        """
+        Initialize the fullscreen overlay window.
+
+        Parameters:
+        - opacity: Window opacity. 1.0 (default) is opaque; anything lower makes the
+          compositor blend the whole fullscreen window with the desktop on every update
+        """
         super().__init__()
         # Branding
         self.brand_name = "RepBot"
@@ -34,13 +51,14 @@ class WorkoutOverlay(QWidget):
         # Set fullscreen
         self.showFullScreen()
         
-        # Set transparency
-        self.setWindowOpacity(0.85)
+        # Translucency is opt-in: an opaque window is just copied to the screen
+        if opacity < 1.0:
+            self.setWindowOpacity(opacity)
         
         # Set background color and style
         self.setStyleSheet("""
             QWidget {
-                background-color: rgba(5, 5, 10, 200);
+                background-color: rgb(5, 5, 10);
                 border: 3px solid #00ff00;
             }
         """)
@@ -75,48 +93,9 @@ class WorkoutOverlay(QWidget):
             size=16, color="#00ff00"
         )
         
-        # Create MAIN WORKOUT labels
-        self.header_label = self._create_label(
-            f"╔════════════════════════════════════════════════════╗\n"
-            f"║        {self.brand_name}        ║\n"
-            f"║        by {self.brand_by}        ║\n"
-            f"╚════════════════════════════════════════════════════╝",
-            size=28, color="#00ffff"
-        )
-        
-        self.exercise_label = self._create_label(
-            f"EXERCISE: {self.exercise_name}",
-            size=22, color="#00ff00"
-        )
-        
-        self.set_label = self._create_label(
-            "SET STATUS : [──────────] 0/5",
-            size=20, color="#00ff00"
-        )
-        
-        self.rep_label = self._create_label(
-            "REP STATUS : [──────────] 0/12",
-            size=20, color="#00ff00"
-        )
-        
-        self.message_label = self._create_label(
-            "> SYSTEM: Awaiting calibration...", 
-            size=16, color="#00ff00"
-        )
-        
-        # Camera feed label (positioned in corner)
-        self.camera_label = QLabel()
-        self.camera_label.setStyleSheet("""
-            border: 2px solid #00ff00;
-            background-color: rgba(0, 0, 0, 150);
-        """)
-        self.camera_label.setAlignment(Qt.AlignCenter)
-        self.camera_label.setFixedSize(320, 240)  # Fixed size for camera feed
-        
-        self.footer_label = self._create_label(
-            "\n[Press 'q' to terminate session]", 
-            size=14, color="#888888"
-        )
+        # MAIN WORKOUT screen: one custom-painted widget (cached pixmaps,
+        # partial repaints) instead of a stack of labels
+        self.hud = HudWidget(self.brand_name, self.brand_by, self.exercise_name)
         
         # Start with connection screen
         self._show_connection_screen()
@@ -131,6 +110,13 @@ class WorkoutOverlay(QWidget):
         self.connection_progress = 0
         self.connection_timer = QTimer()
         self.connection_timer.timeout.connect(self._animate_connection)
+
+        # Instant replay state: the clip being played in the camera area
+        self.replay_frames = []
+        self.replay_index = 0
+        self.replay_timer = QTimer()
+        self.replay_timer.setSingleShot(True)
+        self.replay_timer.timeout.connect(self._show_replay_frame)
         
     def _create_label(self, text, size=10, color="#00ff00"):
         """
@@ -171,19 +157,9 @@ class WorkoutOverlay(QWidget):
         # Clear layout
         self._clear_layout()
         
-        # Add main screen elements with camera feed
-        self.layout.addWidget(self.header_label)
-        self.layout.addSpacing(10)
-        self.layout.addWidget(self.exercise_label)
-        self.layout.addSpacing(30)
-        self.layout.addWidget(self.set_label)
-        self.layout.addWidget(self.rep_label)
-        self.layout.addSpacing(30)
-        self.layout.addWidget(self.message_label)
-        self.layout.addStretch()
-        # Camera feed in the center
-        self.layout.addWidget(self.camera_label, alignment=Qt.AlignCenter)
-        self.layout.addWidget(self.footer_label)
+        # The HUD paints header, progress, messages and camera feed itself
+        self.layout.addWidget(self.hud)
+        self.hud.set_progress(self.current_reps, self.current_sets, self.total_reps, self.total_sets)
         
     def _clear_layout(self):
         """Remove all widgets from layout."""
@@ -245,43 +221,20 @@ class WorkoutOverlay(QWidget):
         Parameters:
         - frame: OpenCV frame (BGR format)
         """
-        if frame is None:
-            return
-        
-        # Resize frame to fit the label
-        frame_resized = cv2.resize(frame, (320, 240))
-        
-        # Convert BGR to RGB
-        frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
+        if frame is None or self.replay_frames:
+            return  # The live feed waits while a replay plays
         
-        # Convert to QImage
-        h, w, ch = frame_rgb.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        
-        # Display in label
-        self.camera_label.setPixmap(QPixmap.fromImage(qt_image))
+        # Only the feed area repaints
+        self.hud.set_camera_frame(frame)
     
-    def _generate_progress_bar(self, current, total, length=10):
+    def take_camera_frame(self, frames):
         """
-        Generate ASCII progress bar.
-        
+        Show the newest frame from a FrameMailbox (the GUI owns it until the next take).
+
         Parameters:
-        - current: Current progress value
-        - total: Total/max value
-        - length: Length of bar in characters
-        
-        Returns:
-        - String like "[███───────]"
+        - frames: FrameMailbox the workout thread puts its previews into
         """
-        if total == 0:
-            filled = 0
-        else:
-            filled = int((current / total) * length)
-        
-        empty = length - filled
-        bar = "█" * filled + "─" * empty
-        return f"[{bar}]"
+        self.update_camera_feed(frames.take())
     
     def update_progress(self, reps, sets, total_reps, total_sets, message=None):
         """
@@ -296,31 +249,106 @@ class WorkoutOverlay(QWidget):
         """
         self.current_reps = reps
         self.current_sets = sets
-        self.total_reps = 12  # Always show out of 12
-        self.total_sets = 5   # Always show out of 5
-        
-        # Generate progress bars
-        set_bar = self._generate_progress_bar(sets, 5, 10)
-        rep_bar = self._generate_progress_bar(reps, 12, 10)
+        self.total_reps = total_reps
+        self.total_sets = total_sets
         
-        # Update labels
-        self.set_label.setText(f"SET STATUS : {set_bar} {sets}/5")
-        self.rep_label.setText(f"REP STATUS : {rep_bar} {reps}/12")
+        # Update progress bars (only changed segments repaint)
+        self.hud.set_progress(reps, sets, total_reps, total_sets)
         
         # Update message if provided
         if message:
-            self.message_label.setText(message)
+            self.hud.set_message(message)
 
     def update_calibrating(self):
-        self.message_label.setText("> SYSTEM: Calibrating... Hold push-up position!")
+        self.hud.set_message("> SYSTEM: Calibrating... Hold push-up position!")
 
     def update_ready(self):
-        self.message_label.setText("> SYSTEM: Calibration complete! Start your reps!")
+        self.hud.set_message("> SYSTEM: Calibration complete! Start your reps!")
 
     def update_complete(self):
-        self.message_label.setText("> WORKOUT COMPLETE! Congratulations!")
-        self.set_label.setText("SET STATUS : [██████████] DONE!")
-        self.rep_label.setText("REP STATUS : [██████████] DONE!")
+        self.hud.set_message("> WORKOUT COMPLETE! Congratulations!")
+        self.hud.set_done()
+
+    def play_replay(self, label, frames):
+        """
+        Play a clip from the ReplayBuffer in the camera area at its recorded pace.
+
+        Parameters:
+        - label: What the clip shows (e.g. "SET 2, REP 7")
+        - frames: ReplayFrame list from ReplayBuffer.clip()
+        """
+        if not frames:
+            self.hud.set_message("> REPLAY: No rep recorded yet")
+            return
+        self.replay_timer.stop()
+        self.replay_frames = frames
+        self.replay_index = 0
+        self.hud.set_message(f"> REPLAY: {label}")
+        self._show_replay_frame()
+
+    def _show_replay_frame(self):
+        """Show the next replay frame and schedule the one after it."""
+        frames, index = self.replay_frames, self.replay_index
+        self.hud.set_camera_frame(render_replay_frame(frames, index))
+        self.replay_index += 1
+        if self.replay_index < len(frames):
+            delay = frames[self.replay_index].timestamp - frames[index].timestamp
+            self.replay_timer.start(int(min(max(delay, 0.0), self.REPLAY_MAX_GAP) * 1000))
+        else:
+            self.replay_frames = []  # Back to the live feed
+
+    def keyPressEvent(self, event):
+        """Handle 'q' / Esc to terminate the session, 'r' / 's' to replay the last rep / set."""
+        if event.key() in (Qt.Key_Q, Qt.Key_Escape):
+            self.quit_requested.emit()
+        elif event.key() == Qt.Key_R:
+            self.replay_requested.emit("rep")
+        elif event.key() == Qt.Key_S:
+            self.replay_requested.emit("set")
+        else:
+            super().keyPressEvent(event)
+
+    def handle_event(self, event):
+        """
+        Update the overlay from a session event (must run on the GUI thread).
+        
+        Parameters:
+        - event: Event from the EventBus
+        """
+        if isinstance(event, CalibrationStarted):
+            self.update_calibrating()
+        elif isinstance(event, CalibrationProgress):
+            self.hud.set_message(
+                f"> SYSTEM: Calibrating... {min(event.elapsed, event.duration):.0f}/{event.duration:.0f}s"
+            )
+        elif isinstance(event, CalibrationFailed):
+            self.hud.set_message(f"> WARNING: {event.reason} Calibrating again...")
+        elif isinstance(event, CalibrationComplete):
+            self.update_ready()
+        elif isinstance(event, PositionChanged):
+            self.update_progress(
+                event.reps, event.sets, self.total_reps, self.total_sets,
+                f"STATUS: Set {event.sets}, Rep {event.reps} - Position: {event.state}"
+            )
+        elif isinstance(event, RepCounted):
+            message = f"STATUS: Set {event.set}, Rep {event.rep} - Position: up"
+            metrics = event.metrics
+            if metrics:
+                message += (f"\nLAST REP: down {metrics['eccentric_s']:.1f}s / up {metrics['concentric_s']:.1f}s"
+                            f" - range {metrics['rom']:.0%} - asymmetry {metrics['asymmetry']:.0%}")
+            self.update_progress(event.rep, event.set, self.total_reps, self.total_sets, message)
+        elif isinstance(event, SetCompleted):
+            self.hud.set_message(f"> ALERT: Set {event.set} complete. Rest period initiated.")
+        elif isinstance(event, WorkoutCompleted):
+            self.update_complete()
+        elif isinstance(event, CameraRetry):
+            self.hud.set_message(f"CONNECTION ATTEMPT {event.attempt}/{event.max_attempts}")
+            self.connection_status.setText(f"> CONNECTION ATTEMPT {event.attempt}/{event.max_attempts} FAILED\n> Retrying...")
+        elif isinstance(event, CameraFailed):
+            self.hud.set_message("CAMERA CONNECTION FAILED")
+            self.connection_status.setText("> CAMERA CONNECTION FAILED")
+        elif isinstance(event, CameraLost):
+            self.hud.set_message("> ERROR: Camera feed lost")
 
 
 def test_overlay():
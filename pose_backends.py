@@ -0,0 +1,232 @@
+import os
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from frame_buffers import BufferPool
+
+# Pose backends turn a BGR frame into body landmarks. Every backend returns
+# the same thing: a (33, 3) float array of [x, y, visibility] in MediaPipe's
+# landmark order, with x/y normalized to the frame (0..1). Joints a model
+# doesn't estimate get visibility 0, so the rest of the pipeline never needs
+# to know which backend produced them.
+#
+# Backends are chosen with a spec string:
+#   "mediapipe"                 MediaPipe Pose (model complexity 1)
+#   "mediapipe:0"               MediaPipe Pose lite (complexity 0..2)
+#   "movenet:models/x.onnx"     MoveNet SinglePose from a local ONNX or TFLite file
+
+mp_pose = mp.solutions.pose
+
+NUM_LANDMARKS = 33
+
+# MoveNet (COCO) keypoint order -> MediaPipe landmark index
+MOVENET_TO_MEDIAPIPE = np.array([
+    mp_pose.PoseLandmark.NOSE,
+    mp_pose.PoseLandmark.LEFT_EYE,
+    mp_pose.PoseLandmark.RIGHT_EYE,
+    mp_pose.PoseLandmark.LEFT_EAR,
+    mp_pose.PoseLandmark.RIGHT_EAR,
+    mp_pose.PoseLandmark.LEFT_SHOULDER,
+    mp_pose.PoseLandmark.RIGHT_SHOULDER,
+    mp_pose.PoseLandmark.LEFT_ELBOW,
+    mp_pose.PoseLandmark.RIGHT_ELBOW,
+    mp_pose.PoseLandmark.LEFT_WRIST,
+    mp_pose.PoseLandmark.RIGHT_WRIST,
+    mp_pose.PoseLandmark.LEFT_HIP,
+    mp_pose.PoseLandmark.RIGHT_HIP,
+    mp_pose.PoseLandmark.LEFT_KNEE,
+    mp_pose.PoseLandmark.RIGHT_KNEE,
+    mp_pose.PoseLandmark.LEFT_ANKLE,
+    mp_pose.PoseLandmark.RIGHT_ANKLE,
+], dtype=np.intp)
+
+
+def landmarks_to_array(landmarks, indices=None, out=None):
+    """
+    Convert a MediaPipe landmark list into the (33, 3) backend array.
+
+    Parameters:
+    - landmarks: MediaPipe landmark list (solutions or tasks API)
+    - indices: Only convert these landmarks (the others get visibility 0)
+    - out: Array to fill instead of allocating a new one
+
+    Returns:
+    - Array of [x, y, visibility] rows
+    """
+    if indices is None and out is None:
+        return np.array([(lm.x, lm.y, lm.visibility) for lm in landmarks], dtype=np.float32)
+    points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32) if out is None else out
+    if indices is None:
+        indices = range(len(landmarks))
+    else:
+        points[:, 2] = 0.0
+    for index in indices:
+        lm = landmarks[index]
+        row = points[index]
+        row[0] = lm.x
+        row[1] = lm.y
+        row[2] = lm.visibility
+    return points
+
+
+class PoseBackend:
+    """
+    Interface every pose backend implements. A backend tracks one person
+    over time and is not thread-safe, so every camera/thread needs its own.
+    The array detect() returns may be reused by the next detect() call.
+    """
+
+    name = "backend"
+
+    def detect(self, frame, indices=None):
+        """
+        Parameters:
+        - frame: Image from camera (BGR format)
+        - indices: Landmarks the caller needs (default: all); backends may skip the others
+
+        Returns:
+        - (33, 3) array of [x, y, visibility] normalized to the frame, or None if no person found
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release the model."""
+
+
+class MediaPipeBackend(PoseBackend):
+    """MediaPipe Pose (solutions API)."""
+
+    def __init__(self, model_complexity=1):
+        self.name = f"mediapipe:{model_complexity}"
+        self.pose = mp_pose.Pose(
+            model_complexity=model_complexity,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.buffers = BufferPool()
+        self.points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+
+    def detect(self, frame, indices=None):
+        # MediaPipe needs RGB (converted into a reused buffer)
+        frame_rgb = self.buffers.get("rgb", frame.shape)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame_rgb)
+        results = self.pose.process(frame_rgb)
+        if not results.pose_landmarks:
+            return None
+        return landmarks_to_array(results.pose_landmarks.landmark, indices, out=self.points)
+
+    def close(self):
+        self.pose.close()
+
+
+class MoveNetBackend(PoseBackend):
+    """
+    MoveNet SinglePose (Lightning or Thunder), CPU only, from a local model file.
+    .onnx files run on ONNX Runtime, .tflite files on tflite_runtime or TensorFlow Lite.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"MoveNet model not found: {model_path}")
+        self.name = f"movenet:{os.path.basename(model_path)}"
+
+        if model_path.endswith(".onnx"):
+            try:
+                import onnxruntime
+            except ImportError:
+                raise ImportError("MoveNet .onnx models need onnxruntime (pip install onnxruntime)")
+            options = onnxruntime.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            self.session = onnxruntime.InferenceSession(
+                model_path, options, providers=["CPUExecutionProvider"]
+            )
+            model_input = self.session.get_inputs()[0]
+            self.input_name = model_input.name
+            self.input_size = model_input.shape[1]
+            self.input_dtype = np.float32 if "float" in model_input.type else np.int32
+            self._run = self._run_onnx
+        elif model_path.endswith(".tflite"):
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                try:
+                    from tensorflow.lite import Interpreter
+                except ImportError:
+                    raise ImportError("MoveNet .tflite models need tflite-runtime or tensorflow")
+            self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+            self.interpreter.allocate_tensors()
+            model_input = self.interpreter.get_input_details()[0]
+            self.input_index = model_input['index']
+            self.output_index = self.interpreter.get_output_details()[0]['index']
+            self.input_size = int(model_input['shape'][1])
+            self.input_dtype = model_input['dtype']
+            self._run = self._run_tflite
+        else:
+            raise ValueError(f"Unsupported MoveNet model format: {model_path} (use .onnx or .tflite)")
+
+        self.buffers = BufferPool()
+        self.points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._letterbox = None  # (width, height) the input buffer's image area last had
+
+    def _run_onnx(self, image):
+        return self.session.run(None, {self.input_name: image})[0]
+
+    def _run_tflite(self, image):
+        self.interpreter.set_tensor(self.input_index, image)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index)
+
+    def detect(self, frame, indices=None):
+        # All 17 keypoints come out of one tensor, so indices saves nothing here
+        # Letterbox into the square model input so the body isn't squashed
+        height, width = frame.shape[:2]
+        size = self.input_size
+        scale = size / max(height, width)
+        resized_w, resized_h = round(width * scale), round(height * scale)
+        resized = self.buffers.get("resized", (resized_h, resized_w, 3))
+        cv2.resize(frame, (resized_w, resized_h), dst=resized, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=resized)
+        # The padding stays zero: for a given frame size the same area is overwritten every time,
+        # and when the frame size changes the old image area is cleared first
+        image = self.buffers.get("input", (1, size, size, 3), self.input_dtype, zeros=True)
+        if self._letterbox != (resized_w, resized_h):
+            image.fill(0)
+            self._letterbox = (resized_w, resized_h)
+        np.copyto(image[0, :resized_h, :resized_w], resized, casting="unsafe")
+
+        # Output is [1, 1, 17, 3] rows of (y, x, score) normalized to the square input
+        keypoints = self._run(image).reshape(-1, 3)
+        points = self.points
+        points[MOVENET_TO_MEDIAPIPE, 0] = keypoints[:, 1] * size / resized_w
+        points[MOVENET_TO_MEDIAPIPE, 1] = keypoints[:, 0] * size / resized_h
+        points[MOVENET_TO_MEDIAPIPE, 2] = keypoints[:, 2]
+        return points
+
+
+BACKENDS = {
+    'mediapipe': lambda arg, num_threads: MediaPipeBackend(int(arg) if arg else 1),
+    'movenet': lambda arg, num_threads: MoveNetBackend(arg, num_threads),
+}
+
+
+def create_backend(spec="mediapipe", num_threads=None):
+    """
+    Create a pose backend from a spec string ("name" or "name:argument").
+
+    Parameters:
+    - spec: e.g. "mediapipe", "mediapipe:0", "movenet:models/movenet_lightning.onnx"
+    - num_threads: Inference threads for backends that take a setting (MoveNet;
+      MediaPipe's solutions API has none)
+
+    Returns:
+    - New PoseBackend instance
+    """
+    name, _, arg = spec.partition(":")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown pose backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if name == "movenet" and not arg:
+        raise ValueError("The movenet backend needs a model file: movenet:<path to .onnx/.tflite>")
+    return BACKENDS[name](arg, num_threads)
@@ -1,97 +1,297 @@
 import cv2
-import mediapipe as mp
+import numpy as np
 
-# Initialize MediaPipe Pose
-mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
+from exercises import EXERCISES, LANDMARK_INDEX, ExerciseType
+from pose_backends import NUM_LANDMARKS, create_backend, mp_pose
 
-# Create the pose detector object
-pose = mp_pose.Pose(
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+def create_pose_detector(backend="mediapipe", num_threads=None):
+    """
+    Create a pose backend (see pose_backends.py). The backend tracks one
+    person over time and is not thread-safe, so every camera/thread needs
+    its own.
+    
+    Parameters:
+    - backend: Backend spec, e.g. "mediapipe" or "movenet:models/movenet_lightning.onnx"
+    - num_threads: Inference threads (default: the backend's own choice)
+    """
+    return create_backend(backend, num_threads)
+
+# Shared pose detector for single-camera scripts (created on first use)
+pose = None
+
+# Joints are extracted for push-ups unless told otherwise
+DEFAULT_EXERCISE = EXERCISES[ExerciseType.PUSHUPS]
 
-def detect_pose(frame):
+# Skeleton lines drawn on the preview
+SKELETON = np.array(sorted(mp_pose.POSE_CONNECTIONS), dtype=np.intp)
+
+def extract_landmarks(points, width, height, offset_x=0, offset_y=0, exercise=None, out=None, frame_height=None):
+    """
+    Convert backend landmarks into the joint dictionary RepCounter uses.
+    Only the joints the exercise tracks are extracted (one array lookup
+    with the exercise's precompiled landmark indexes).
+
+    Coordinates are in frame heights: full-frame pixels divided by the
+    frame's height, for x as well as y so distances and angles keep their
+    shape. They do not change with the capture or inference resolution, so
+    a calibration stays valid when either changes mid-session.
+    
+    Parameters:
+    - points: (33, 3) array of [x, y, visibility] normalized to the processed image
+    - width, height: Size of the processed image in pixels
+    - offset_x, offset_y: Position of the processed image in the full frame (for crops)
+    - exercise: Exercise being tracked (default: push-ups)
+    - out: Dictionary from an earlier call to update in place instead of building a new one
+    - frame_height: Height of the full frame in pixels (default: height, i.e. no crop)
+    
+    Returns:
+    - Dictionary with joint coordinates in frame heights, or None if
+      neither shoulder is clearly visible
+    """
+    exercise = exercise or DEFAULT_EXERCISE
+    selected = points[exercise.landmark_indices]
+    
+    # ✨ NEW: Only proceed if at least one shoulder is clearly visible
+    if not (selected[exercise.gate_positions, 2] > exercise.min_visibility).any():
+        return None
+    
+    scale = frame_height or height
+    xs = ((selected[:, 0] * width + offset_x) / scale).tolist()
+    ys = ((selected[:, 1] * height + offset_y) / scale).tolist()
+    visibility = selected[:, 2].tolist()
+    if out is not None:
+        for name, x, y, v in zip(exercise.tracking_points, xs, ys, visibility):
+            joint = out.get(name)
+            if joint is None:
+                joint = out[name] = {}
+            joint['x'] = x
+            joint['y'] = y
+            joint['visibility'] = v
+        return out
+    return {
+        name: {'x': x, 'y': y, 'visibility': v}
+        for name, x, y, v in zip(exercise.tracking_points, xs, ys, visibility)
+    }
+
+class SkeletonRenderer:
+    """
+    Draws the pose with a few batched OpenCV and NumPy calls instead of one
+    cv2.line and one cv2.circle per connection and joint.
+
+    Everything that does not change between frames is worked out once: the
+    two ends of every connection as index arrays, the segments the exercise
+    tracks and the pixel offsets of a joint dot. Per frame one boolean
+    visibility mask picks the connections with both ends shown, and they go
+    to one cv2.polylines call as two-point segments; the joints are stamped
+    into the image with one NumPy assignment per colour. There is no Python
+    loop over joints or connections left, so what remains is the drawing
+    itself (see bench_skeleton.py).
+
+    Line width and joint size scale with the image, so the skeleton looks
+    the same drawn on a 320x240 preview as on the full frame.
+    """
+
+    LINE_COLOR = (0, 255, 255)
+    JOINT_COLOR = (0, 255, 0)
+    HIGHLIGHT_COLOR = (0, 140, 255)  # Joints and segments the exercise tracks
+    REFERENCE_HEIGHT = 480           # Image height the base sizes below are for
+    LINE_WIDTH = 2
+    JOINT_SIZE = 4
+
+    def __init__(self, exercise=None, min_visibility=0.5, connections=SKELETON):
+        """
+        Parameters:
+        - exercise: Highlight the joints and segments this exercise tracks (default: no highlight)
+        - min_visibility: Joints below this visibility are not drawn
+        - connections: (N, 2) array of landmark index pairs to draw
+        """
+        self.min_visibility = min_visibility
+        self.connections = np.asarray(connections, dtype=np.intp).reshape(-1, 2)
+        self.highlight_joints = np.zeros(NUM_LANDMARKS, dtype=bool)
+        self.highlight_lines = np.empty((0, 2), dtype=np.intp)
+        if exercise is not None:
+            self.highlight_joints[exercise.landmark_indices] = True
+            self.highlight_lines = np.array(
+                [(LANDMARK_INDEX[a], LANDMARK_INDEX[b]) for a, b in exercise.joint_pairs], dtype=np.intp
+            ).reshape(-1, 2)
+        self._pixels = np.empty((NUM_LANDMARKS, 2), dtype=np.int32)
+        self._dots = {}  # (joint size, image width) -> dot offsets
+
+    def _dot(self, size, width):
+        """
+        Offsets of the pixels of a round dot, cached per size and image width.
+
+        Returns:
+        - rows, columns: Offsets from the dot's center
+        - flat: The same offsets as positions in the flattened image
+        """
+        offsets = self._dots.get((size, width))
+        if offsets is None:
+            radius = np.arange(size) - size // 2
+            rows, columns = np.meshgrid(radius, radius, indexing="ij")
+            inside = rows ** 2 + columns ** 2 <= (size / 2) ** 2
+            rows, columns = rows[inside], columns[inside]
+            offsets = self._dots[(size, width)] = (rows, columns, rows * width + columns)
+        return offsets
+
+    def draw(self, image, points):
+        """
+        Draw the pose on an image (in place).
+
+        Parameters:
+        - image: BGR image to draw on, at any resolution
+        - points: (33, 3) landmark array normalized to the image
+        """
+        height, width = image.shape[:2]
+        scale = height / self.REFERENCE_HEIGHT
+        line_width = max(1, round(self.LINE_WIDTH * scale))
+        joint_size = max(3, round(self.JOINT_SIZE * scale))
+
+        pixels = self._pixels
+        np.multiply(points[:, :2], (width, height), out=pixels, casting="unsafe")
+        visible = points[:, 2] > self.min_visibility
+
+        # Every connection with both ends visible is one two-point polyline
+        lines = self.connections[visible[self.connections].all(axis=1)]
+        if len(lines):
+            cv2.polylines(image, pixels[lines], False, self.LINE_COLOR, line_width)
+        if len(self.highlight_lines):
+            lines = self.highlight_lines[visible[self.highlight_lines].all(axis=1)]
+            if len(lines):
+                cv2.polylines(image, pixels[lines], False, self.HIGHLIGHT_COLOR, line_width + 1)
+
+        # Joints: one assignment per colour (joints off the image are not drawn)
+        visible &= (pixels[:, 0] >= 0) & (pixels[:, 0] < width) & (pixels[:, 1] >= 0) & (pixels[:, 1] < height)
+        self._stamp(image, pixels[visible & ~self.highlight_joints], self.JOINT_COLOR, joint_size)
+        self._stamp(image, pixels[visible & self.highlight_joints], self.HIGHLIGHT_COLOR, joint_size + 2)
+
+    def _stamp(self, image, centers, color, size):
+        """Paint a round dot of the given size at every (x, y) center on the image."""
+        if not len(centers):
+            return
+        if not image.flags.c_contiguous:
+            # The flat view below would be a copy - draw into the image itself instead
+            for x, y in centers.tolist():
+                cv2.circle(image, (x, y), size // 2, color, -1)
+            return
+        height, width = image.shape[:2]
+        rows, columns, flat = self._dot(size, width)
+        pixels = image.reshape(-1, image.shape[2])
+        low, high = centers.min(axis=0), centers.max(axis=0)
+        if low.min() >= size and high[0] < width - size and high[1] < height - size:
+            # No dot reaches the edge: the flat offsets are all in the image
+            pixels[(centers[:, 1] * width + centers[:, 0])[:, None] + flat] = color
+            return
+        rows = centers[:, 1, None] + rows
+        columns = centers[:, 0, None] + columns
+        # Parts of dots near the edge that fall off the image are cut, not wrapped onto the next row
+        inside = (rows >= 0) & (rows < height) & (columns >= 0) & (columns < width)
+        pixels[rows[inside] * width + columns[inside]] = color
+
+    def render_preview(self, frame, points, preview):
+        """
+        Scale the frame into the preview image and draw the pose at that
+        size (much cheaper than drawing on the full frame and scaling the
+        result down).
+
+        Parameters:
+        - frame: Full-resolution BGR frame
+        - points: (33, 3) landmark array normalized to the frame, or None
+        - preview: Preallocated BGR image at preview size (written in place)
+
+        Returns:
+        - The preview image
+        """
+        cv2.resize(frame, (preview.shape[1], preview.shape[0]), dst=preview)
+        if points is not None:
+            self.draw(preview, points)
+        return preview
+
+
+# Used by draw_skeleton() and detect_pose() when no renderer is passed in
+default_renderer = SkeletonRenderer()
+
+def draw_skeleton(frame, points, min_visibility=0.5, renderer=None):
+    """
+    Draw the pose on a frame (in place).
+    
+    Parameters:
+    - frame: BGR frame to draw on
+    - points: (33, 3) landmark array normalized to the frame
+    - min_visibility: Joints below this visibility are not drawn
+    - renderer: SkeletonRenderer to draw with (default: plain skeleton)
+    """
+    renderer = renderer or default_renderer
+    if min_visibility != renderer.min_visibility:
+        renderer = SkeletonRenderer(min_visibility=min_visibility)
+    renderer.draw(frame, points)
+
+def detect_pose(frame, annotate=True, detector=None, exercise=None, in_place=False, landmarks_out=None,
+                inference_height=None, buffers=None, renderer=None, preview=None):
     """
     Detects body joints in a video frame.
     
     Parameters:
     - frame: Image from camera (BGR format)
+    - annotate: Draw the skeleton on a copy of the frame (default: True)
+    - detector: Pose backend to use (default: the shared module-level MediaPipe one)
+    - exercise: Exercise being tracked; only its joints are extracted (default: push-ups)
+    - in_place: Draw on the frame itself instead of a copy (for callers that own the buffer)
+    - landmarks_out: Dictionary to reuse for the landmarks (see extract_landmarks)
+    - inference_height: Run the model on a copy scaled down to this height (landmarks
+      come back the same at every inference height)
+    - buffers: BufferPool for the scaled copy (default: allocate one per call)
+    - renderer: SkeletonRenderer to draw with (default: plain skeleton)
+    - preview: Preallocated BGR image; the frame is scaled into it and the skeleton
+      drawn at that size (see SkeletonRenderer.render_preview)
     
     Returns:
     - landmarks_dict: Dictionary with joint coordinates (or None if no person found)
-    - annotated_frame: Frame with skeleton drawn on it
+    - annotated_frame: Frame with skeleton drawn on it (the input frame itself if annotate
+      is False or in_place is True)
     """
     
-    # Convert BGR to RGB (MediaPipe needs RGB)
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    
     # Run the AI model to detect pose
-    results = pose.process(frame_rgb)
+    if detector is None:
+        global pose
+        if pose is None:
+            pose = create_pose_detector()
+        detector = pose
+    exercise = exercise or DEFAULT_EXERCISE
+    image = frame
+    height, width, _ = frame.shape
+    if inference_height and inference_height < height:
+        size = (round(width * inference_height / height), inference_height)
+        image = buffers.get("inference", (size[1], size[0], 3)) if buffers is not None else None
+        image = cv2.resize(frame, size, dst=image, interpolation=cv2.INTER_AREA)
+    # Without a skeleton to draw only the exercise's joints are needed
+    drawing = annotate or preview is not None
+    points = detector.detect(image, None if drawing else exercise.landmark_indices)
+    renderer = renderer or default_renderer
     
     # Make a copy of the frame to draw on
-    annotated_frame = frame.copy()
+    annotated_frame = frame.copy() if annotate and not in_place else frame
     
     # Check if a person was detected
-    if results.pose_landmarks:
+    if points is not None:
         
-        # ✨ NEW: Check if key joints are visible enough
-        landmarks = results.pose_landmarks.landmark
-        left_shoulder_vis = landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER].visibility
-        right_shoulder_vis = landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER].visibility
+        # Landmarks are normalized, so the full frame's size maps them to frame heights
+        landmarks_dict = extract_landmarks(points, width, height, exercise=exercise, out=landmarks_out)
         
-        # Only proceed if at least one shoulder is clearly visible
-        if left_shoulder_vis > 0.5 or right_shoulder_vis > 0.5:
+        if landmarks_dict is not None:
             
             # Draw skeleton on the frame
-            mp_drawing.draw_landmarks(
-                annotated_frame,
-                results.pose_landmarks,
-                mp_pose.POSE_CONNECTIONS,
-                mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                mp_drawing.DrawingSpec(color=(0, 255, 255), thickness=2, circle_radius=1)
-            )
-            
-            # Get frame dimensions for converting coordinates
-            height, width, _ = frame.shape
-            
-            # Extract the joints we need for push-ups
-            landmarks_dict = {
-                'left_shoulder': {
-                    'x': landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER].x * width,
-                    'y': landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER].y * height,
-                    'visibility': landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER].visibility
-                },
-                'right_shoulder': {
-                    'x': landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER].x * width,
-                    'y': landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER].y * height,
-                    'visibility': landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER].visibility
-                },
-                'left_elbow': {
-                    'x': landmarks[mp_pose.PoseLandmark.LEFT_ELBOW].x * width,
-                    'y': landmarks[mp_pose.PoseLandmark.LEFT_ELBOW].y * height,
-                    'visibility': landmarks[mp_pose.PoseLandmark.LEFT_ELBOW].visibility
-                },
-                'right_elbow': {
-                    'x': landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW].x * width,
-                    'y': landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW].y * height,
-                    'visibility': landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW].visibility
-                },
-                'left_wrist': {
-                    'x': landmarks[mp_pose.PoseLandmark.LEFT_WRIST].x * width,
-                    'y': landmarks[mp_pose.PoseLandmark.LEFT_WRIST].y * height,
-                    'visibility': landmarks[mp_pose.PoseLandmark.LEFT_WRIST].visibility
-                },
-                'right_wrist': {
-                    'x': landmarks[mp_pose.PoseLandmark.RIGHT_WRIST].x * width,
-                    'y': landmarks[mp_pose.PoseLandmark.RIGHT_WRIST].y * height,
-                    'visibility': landmarks[mp_pose.PoseLandmark.RIGHT_WRIST].visibility
-                }
-            }
+            if annotate:
+                renderer.draw(annotated_frame, points)
+            if preview is not None:
+                # An annotated frame already has its skeleton: just scale it down
+                renderer.render_preview(annotated_frame, None if annotate else points, preview)
             
             return landmarks_dict, annotated_frame
     
     # No person detected or visibility too low
+    if preview is not None:
+        renderer.render_preview(frame, None, preview)
     return None, annotated_frame
     
 def test_pose_detection():
@@ -123,7 +323,7 @@ def test_pose_detection():
                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
             
             # Print elbow position for debugging
-            print(f"Left elbow Y: {landmarks['left_elbow']['y']:.0f} | "
+            print(f"Left elbow Y: {landmarks['left_elbow']['y']:.3f} | "
                   f"Visibility: {landmarks['left_elbow']['visibility']:.2f}")
         else:
             cv2.putText(annotated_frame, "NO POSE DETECTED", (10, 30),
@@ -137,7 +337,8 @@ def test_pose_detection():
     
     cap.release()
     cv2.destroyAllWindows()
-    pose.close()
+    if pose is not None:
+        pose.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process in MB (None if the platform can't tell).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def host_cpu_times():
+    """
+    Host-wide CPU time counters (all processes, all cores).
+
+    Returns:
+    - (busy seconds, total seconds) since boot, or None if the platform can't tell.
+      Utilization over an interval is the ratio of the two deltas.
+    """
+    try:
+        with open("/proc/stat") as f:
+            fields = [float(value) for value in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0.0)  # idle + iowait
+    total = sum(fields[:8])  # Guest time is already counted in user
+    return (total - idle) / ticks, total / ticks
+
+
+def usable_cores():
+    """CPU cores this process may run on (its affinity mask where the platform has one)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def startup_report(mode, startup_seconds):
+    """
+    Startup metrics for one entry point.
+
+    Parameters:
+    - mode: "gui" or "headless"
+    - startup_seconds: Time from the first line of the entry point until it was ready
+
+    Returns:
+    - Dictionary with mode, startup_s, peak_rss_mb and whether Qt was imported
+    """
+    return {
+        'mode': mode,
+        'startup_s': round(startup_seconds, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1) if resource is not None else None,
+        'qt_loaded': any(name == "PyQt5" or name.startswith("PyQt5.") for name in sys.modules),
+    }
@@ -0,0 +1,144 @@
+import math
+
+import numpy as np
+
+
+class RepAnalytics:
+    """
+    Per-rep form and tempo metrics for RepCounter.
+
+    Every counted frame is written into preallocated NumPy ring buffers, so
+    the per-frame cost is a handful of array writes and nothing grows while
+    the session runs. The buffers are reduced once per rep, when the rep is
+    counted.
+    """
+
+    CAPACITY = 1024          # Samples kept per rep (about 17 seconds at 60 fps)
+    VELOCITY_WINDOW = 0.1    # Seconds used to estimate velocity (smooths jitter)
+
+    def __init__(self, exercise, capacity=CAPACITY):
+        """
+        Initialize the analytics buffers.
+
+        Parameters:
+        - exercise: Exercise whose joint_pairs are measured
+        - capacity: Ring buffer size in samples
+        """
+        self.capacity = capacity
+        self.joint_pairs = list(exercise.joint_pairs)
+        self.pair_names = [f"{a}-{b}" for a, b in self.joint_pairs]
+
+        # Ring buffers
+        self.times = np.zeros(capacity)
+        self.joint_y = np.zeros(capacity)
+        self.left_y = np.zeros(capacity)
+        self.right_y = np.zeros(capacity)
+        self.angles = np.full((capacity, len(self.joint_pairs)), np.nan)
+
+        self.head = 0     # Next slot to write
+        self.count = 0    # Samples written since the last rep
+        self.reps = 0
+
+        # Calibration reference
+        self.calibrated_range = None
+        self.up_threshold = None
+
+    def reset(self, calibrated_range, up_threshold):
+        """
+        Start a new session after calibration.
+
+        Parameters:
+        - calibrated_range: Joint movement range measured during calibration
+        - up_threshold: Y value above which the athlete is at the top
+        """
+        self.calibrated_range = calibrated_range
+        self.up_threshold = up_threshold
+        self.count = 0
+        self.reps = 0
+
+    def add_sample(self, timestamp, joint_y, landmarks):
+        """
+        Record one frame.
+
+        Parameters:
+        - timestamp: Capture time in seconds
+        - joint_y: Y of the joint RepCounter is following
+        - landmarks: Dictionary with joint coordinates
+        """
+        i = self.head
+        self.times[i] = timestamp
+        self.joint_y[i] = joint_y
+        self.left_y[i] = landmarks['left_shoulder']['y']
+        self.right_y[i] = landmarks['right_shoulder']['y']
+
+        row = self.angles[i]
+        for k, (a, b) in enumerate(self.joint_pairs):
+            start = landmarks.get(a)
+            end = landmarks.get(b)
+            if start is None or end is None:
+                row[k] = np.nan
+            else:
+                # Segment angle from vertical, in degrees
+                row[k] = math.degrees(math.atan2(end['x'] - start['x'], end['y'] - start['y']))
+
+        self.head = (i + 1) % self.capacity
+        self.count += 1
+
+    def finish_rep(self):
+        """
+        Reduce the samples since the previous rep into metrics and start
+        collecting the next rep.
+
+        Returns:
+        - Dictionary of metrics for the rep just counted (None if no samples)
+        """
+        n = min(self.count, self.capacity)
+        self.count = 0
+        self.reps += 1
+        if n < 2:
+            return None
+
+        order = np.arange(self.head - n, self.head) % self.capacity
+        times = self.times[order]
+        joint_y = self.joint_y[order]
+
+        # Phases: leave the top -> deepest point -> back at the top
+        bottom = int(np.argmax(joint_y))
+        at_top = joint_y < self.up_threshold
+        before = np.flatnonzero(at_top[:bottom])
+        after = np.flatnonzero(at_top[bottom:])
+        start = before[-1] if before.size else 0
+        end = bottom + after[0] if after.size else n - 1
+
+        # Velocity over a short window to keep jitter from dominating
+        lag = np.searchsorted(times, times - self.VELOCITY_WINDOW, side='right') - 1
+        valid = lag >= 0
+        dt = times[valid] - times[lag[valid]]
+        dy = joint_y[valid] - joint_y[lag[valid]]
+        moving = dt > 0
+        peak_velocity = float(np.max(np.abs(dy[moving] / dt[moving]))) if moving.any() else 0.0
+
+        rom = float(joint_y.max() - joint_y.min())
+        left_rom = float(np.ptp(self.left_y[order]))
+        right_rom = float(np.ptp(self.right_y[order]))
+        larger = max(left_rom, right_rom)
+
+        joint_angles = {}
+        angles = self.angles[order]
+        for k, name in enumerate(self.pair_names):
+            column = angles[:, k]
+            column = column[~np.isnan(column)]
+            if column.size:
+                joint_angles[name] = {'min': float(column.min()), 'max': float(column.max())}
+            else:
+                joint_angles[name] = None
+
+        return {
+            'rep': self.reps,
+            'eccentric_s': float(times[bottom] - times[start]),
+            'concentric_s': float(times[end] - times[bottom]),
+            'rom': rom / self.calibrated_range if self.calibrated_range else None,
+            'peak_velocity': peak_velocity,
+            'asymmetry': abs(left_rom - right_rom) / larger if larger > 0 else 0.0,
+            'joint_angles': joint_angles,
+        }
@@ -1,20 +1,82 @@
+import math
+import statistics
+import time
+
 import cv2
 
+from events import (
+    EventBus, ConsoleLogger, CalibrationStarted, CalibrationProgress, CalibrationFailed, CalibrationComplete,
+    PositionChanged, RepCounted, SetCompleted, WorkoutCompleted
+)
+from exercises import ExerciseType, EXERCISES, MIN_VISIBILITY, TORSO_SIDES
+from rep_analytics import RepAnalytics
+
+
+def torso_length(landmarks, min_visibility=MIN_VISIBILITY):
+    """
+    Shoulder-to-hip distance, averaged over the sides where both joints are
+    clearly visible.
+
+    Parameters:
+    - landmarks: Dictionary with joint coordinates
+    - min_visibility: Both joints of a side must be more visible than this
+
+    Returns:
+    - Length in the landmarks' units, or None if no side is visible
+    """
+    total = 0.0
+    sides = 0
+    for shoulder_name, hip_name in TORSO_SIDES:
+        shoulder = landmarks.get(shoulder_name)
+        hip = landmarks.get(hip_name)
+        if shoulder is None or hip is None:
+            continue
+        if shoulder['visibility'] <= min_visibility or hip['visibility'] <= min_visibility:
+            continue
+        dx = shoulder['x'] - hip['x']
+        dy = shoulder['y'] - hip['y']
+        total += math.sqrt(dx * dx + dy * dy)
+        sides += 1
+    return total / sides if sides else None
+
+
 class RepCounter:
     """
-    Tracks push-up reps and sets based on elbow position.
+    Tracks push-up reps and sets based on shoulder position.
+
+    All durations are in seconds and measured on the capture timestamps
+    passed in with each frame, so counting behaves the same at 60, 30,
+    12 or a variable number of frames per second.
+
+    Progress is reported as events on an optional EventBus instead of
+    being printed from inside the frame loop.
+
+    Landmarks are in frame heights (see extract_landmarks), so thresholds
+    survive a change of capture resolution, inference resolution or crop at
+    the same aspect ratio. A switch between aspect ratios (4:3 <-> 16:9)
+    can crop the camera's sensor differently, which frame heights cannot
+    see; reframe() carries the thresholds over such a switch.
+    The movement calibration needs is measured in torso lengths, so it does
+    not depend on how far the athlete is from the camera either.
     """
 
-    THRESHOLD_BUFFER = 0.35  # Adjusted for better accuracy
-    SMOOTHING_FRAMES = 5     # NEW: Require consistent position for X frames
+    THRESHOLD_BUFFER = 0.35     # Adjusted for better accuracy
+    SMOOTHING_SECONDS = 0.15    # Require consistent position for this long
+    CALIBRATION_SECONDS = 5.0   # Length of the calibration window
+    PROGRESS_INTERVAL = 1.0     # Seconds between calibration progress updates
+    MIN_RANGE = 0.2             # Torso lengths of movement calibration needs to see
+    MIN_RANGE_FRAME = 0.06      # Frame heights needed when no torso was visible during calibration
+    SNAPSHOT_VERSION = 2        # 2: thresholds in frame heights instead of pixels
     
-    def __init__(self, reps_per_set=12, total_sets=3):
+    def __init__(self, reps_per_set=12, total_sets=3, exercise=None, events=None):
         """
         Initialize the rep counter.
         
         Parameters:
         - reps_per_set: How many reps per set (default: 12)
         - total_sets: How many sets total (default: 3)
+        - exercise: Exercise being performed (default: push-ups)
+        - events: EventBus to publish progress on (default: none)
         """
 
         # Configuration
@@ -28,9 +90,10 @@ class RepCounter:
         # State tracking
         self.position_state = "up"  # Can be "up" or "down"
         
-        # NEW: Smoothing to prevent false triggers
-        self.down_counter = 0  # How many frames in "down" position
-        self.up_counter = 0    # How many frames in "up" position
+        # Smoothing to prevent false triggers: timestamp at which the joint
+        # first crossed into the opposite zone (None = not crossing)
+        self.down_since = None
+        self.up_since = None
         
         # Thresholds (we'll calibrate these)
         self.down_threshold = None  # Y value for "down" position
@@ -38,14 +101,122 @@ class RepCounter:
         
         # Calibration data
         self.calibration_frames = []
+        self.calibration_torso = []  # Torso length of every calibration frame that showed one
+        self.torso_length = None
+        self.calibration_start = None
+        self.next_progress_report = None
         self.is_calibrated = False
 
-    def calibrate(self, landmarks):
+        # Per-rep form and tempo metrics
+        self.exercise = exercise or EXERCISES[ExerciseType.PUSHUPS]
+        self.analytics = RepAnalytics(self.exercise)
+        self.last_rep_metrics = None
+
+        self.events = events
+        self.checkpoint = None  # Optional CheckpointWriter (see checkpoint.py)
+
+    def _publish(self, event):
+        """Publish an event if a bus is attached. Never blocks."""
+        if self.events is not None:
+            self.events.publish(event)
+
+    def _save_checkpoint(self, timestamp):
+        """
+        Hand the state to the checkpoint writer, if any. Called once a state
+        change is complete (never mid-way through a set rollover) and never
+        on ordinary frames.
+        """
+        if self.checkpoint is None:
+            return
+        if self.current_set > self.total_sets:
+            self.checkpoint.clear()  # Nothing left to resume
+        else:
+            self.checkpoint.submit(self.snapshot(timestamp))
+
+    def snapshot(self, timestamp=None):
+        """
+        Compact, JSON-serializable copy of the counting state.
+
+        An unfinished calibration is not included (it starts over after a
+        restore); the per-rep analytics buffers are not included either.
+
+        Parameters:
+        - timestamp: Capture time of the current frame; debounce timers are
+          stored relative to it (default: now)
+
+        Returns:
+        - Dictionary for restore()
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        return {
+            'version': self.SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'exercise': self.exercise.type.name,
+            'reps_per_set': self.reps_per_set,
+            'total_sets': self.total_sets,
+            'threshold_buffer': self.THRESHOLD_BUFFER,
+            'smoothing_seconds': self.SMOOTHING_SECONDS,
+            'current_rep': self.current_rep,
+            'current_set': self.current_set,
+            'position_state': self.position_state,
+            'down_for': None if self.down_since is None else timestamp - self.down_since,
+            'up_for': None if self.up_since is None else timestamp - self.up_since,
+            'calibrated': self.is_calibrated,
+            'up_threshold': self.up_threshold,
+            'down_threshold': self.down_threshold,
+            'movement_range': self.analytics.calibrated_range,
+            'torso_length': self.torso_length,
+            'analytics_reps': self.analytics.reps,
+        }
+
+    def restore(self, snapshot, timestamp=None):
+        """
+        Continue from a snapshot() taken by an earlier counter.
+
+        Parameters:
+        - snapshot: Dictionary from snapshot()
+        - timestamp: Capture time counting resumes at; debounce timers
+          carry on from there (default: now)
+
+        Raises:
+        - ValueError if the snapshot is for a different exercise or workout
+        """
+        if snapshot.get('version') != self.SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {snapshot.get('version')}")
+        expected = (self.exercise.type.name, self.reps_per_set, self.total_sets)
+        found = (snapshot['exercise'], snapshot['reps_per_set'], snapshot['total_sets'])
+        if found != expected:
+            raise ValueError(f"Snapshot is for {found[0].lower()} {found[1]}x{found[2]}, "
+                             f"not {expected[0].lower()} {expected[1]}x{expected[2]}")
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        self.THRESHOLD_BUFFER = snapshot['threshold_buffer']
+        self.SMOOTHING_SECONDS = snapshot['smoothing_seconds']
+        self.current_rep = snapshot['current_rep']
+        self.current_set = snapshot['current_set']
+        self.position_state = snapshot['position_state']
+        self.down_since = None if snapshot['down_for'] is None else timestamp - snapshot['down_for']
+        self.up_since = None if snapshot['up_for'] is None else timestamp - snapshot['up_for']
+        self.calibration_frames = []
+        self.calibration_torso = []
+        self.torso_length = snapshot['torso_length']
+        self.is_calibrated = snapshot['calibrated']
+        self.up_threshold = snapshot['up_threshold']
+        self.down_threshold = snapshot['down_threshold']
+        if self.is_calibrated:
+            self.analytics.reset(snapshot['movement_range'], self.up_threshold)
+            self.analytics.reps = snapshot['analytics_reps']
+        self.last_rep_metrics = None
+
+    def calibrate(self, landmarks, timestamp=None):
         """
         Calibrate the up and down thresholds based on initial frames.
         
         Parameters:
         - landmarks: Dictionary with joint coordinates
+        - timestamp: Capture time of the frame in seconds (default: now)
         
         Returns:
         - True if calibration complete, False if still calibrating
@@ -53,14 +224,14 @@ class RepCounter:
         if landmarks is None:
             return False
 
-        # Print instruction on first frame
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        # Announce calibration on first frame
         if len(self.calibration_frames) == 0:
-            print("=" * 50)
-            print("CALIBRATION MODE")
-            print("=" * 50)
-            print("Do 3 SLOW push-ups (take 5-6 seconds total)")
-            print("Go ALL THE WAY down and ALL THE WAY up")
-            print("=" * 50)
+            self._publish(CalibrationStarted(timestamp, self.CALIBRATION_SECONDS))
+            self.calibration_start = timestamp
+            self.next_progress_report = timestamp + self.PROGRESS_INTERVAL
 
         # Choose shoulder with better visibility (MORE STABLE than elbow!)
         left_vis = landmarks['left_shoulder']['visibility']
@@ -73,52 +244,111 @@ class RepCounter:
 
         # Store sample
         self.calibration_frames.append(joint_y)
+        torso = torso_length(landmarks)
+        if torso is not None:
+            self.calibration_torso.append(torso)
 
         # Show progress
-        progress = len(self.calibration_frames)
-        if progress % 30 == 0:  # Every second
-            print(f"Calibration progress: {progress}/150 frames")
+        elapsed = timestamp - self.calibration_start
+        if timestamp >= self.next_progress_report:  # Every second
+            self._publish(CalibrationProgress(timestamp, elapsed, self.CALIBRATION_SECONDS))
+            intervals_done = int(elapsed / self.PROGRESS_INTERVAL) + 1
+            self.next_progress_report = self.calibration_start + intervals_done * self.PROGRESS_INTERVAL
 
-        # Need MORE frames for better calibration
-        if len(self.calibration_frames) < 150:  # 5 seconds instead of 3
+        # Need a full window of movement for better calibration
+        if elapsed < self.CALIBRATION_SECONDS:
             return False  # Still calibrating
         
         # Calculate thresholds with buffer zones
         max_y = max(self.calibration_frames)
         min_y = min(self.calibration_frames)
         range_y = max_y - min_y
+        torso = statistics.median(self.calibration_torso) if self.calibration_torso else None
 
-        # Make sure we have enough range
-        if range_y < 30:  # Less than 30 pixels of movement
-            print("\n⚠️  WARNING: Not enough movement detected!")
-            print("Try doing fuller push-ups during calibration")
+        # Make sure we have enough range (relative to the body when the torso was seen)
+        min_range = self.MIN_RANGE * torso if torso is not None else self.MIN_RANGE_FRAME
+        if range_y < min_range:
+            self._publish(CalibrationFailed(timestamp, "Not enough movement detected!"))
             self.calibration_frames = []  # Reset and try again
+            self.calibration_torso = []
             return False
 
         self.up_threshold = min_y + (range_y * self.THRESHOLD_BUFFER)
         self.down_threshold = max_y - (range_y * self.THRESHOLD_BUFFER)
 
         # Mark as calibrated
+        self.torso_length = torso
         self.is_calibrated = True
         self.position_state = "up"
+        self.analytics.reset(range_y, self.up_threshold)
 
-        print("\n" + "=" * 50)
-        print("✅ CALIBRATION COMPLETE!")
-        print("=" * 50)
-        print(f"  Up threshold: {self.up_threshold:.0f}")
-        print(f"  Down threshold: {self.down_threshold:.0f}")
-        print(f"  Range: {range_y:.0f} pixels")
-        print("=" * 50)
-        print("Starting workout tracking...\n")
+        self._publish(CalibrationComplete(
+            timestamp, self.up_threshold, self.down_threshold, range_y,
+            len(self.calibration_frames), elapsed, torso
+        ))
+        self._save_checkpoint(timestamp)
 
         return True  # Calibration complete
     
-    def count_rep(self, landmarks):
+    def reframe(self, before, after, old_size, new_size, timestamp=None):
+        """
+        Carry calibration over a change of aspect ratio.
+
+        Cameras make their other aspect ratios by cropping the sensor around
+        its centre, keeping either its full height or its full width. When
+        the height is kept, frame heights mean the same thing before and
+        after and nothing changes. When the width is kept (a 4:3 sensor
+        going 16:9), the new frame shows a centred band of the old one,
+        larger, so thresholds, calibration samples and the torso length
+        are mapped into it. Which crop the camera made is decided by which
+        one explains the landmarks of the last frame before the switch and
+        the first frame after it better.
+
+        Parameters:
+        - before: Landmarks of the last frame in the old geometry
+        - after: Landmarks of the first frame in the new geometry
+        - old_size, new_size: (width, height) of the frames before and after
+        - timestamp: Capture time of the first frame after the switch (default: now)
+
+        Returns:
+        - True if the camera kept the width and the calibration was mapped
+        """
+        old_aspect = old_size[0] / old_size[1]
+        new_aspect = new_size[0] / new_size[1]
+        scale = new_aspect / old_aspect
+        offset = (1 - scale) / 2
+        shift = (new_aspect - old_aspect) / 2  # Same height: the sides are cropped or added
+
+        kept_width = kept_height = 0.0
+        for name, joint in after.items():
+            old = before.get(name)
+            if old is None or old['visibility'] <= MIN_VISIBILITY or joint['visibility'] <= MIN_VISIBILITY:
+                continue
+            kept_width += (old['x'] * scale - joint['x']) ** 2 + (old['y'] * scale + offset - joint['y']) ** 2
+            kept_height += (old['x'] + shift - joint['x']) ** 2 + (old['y'] - joint['y']) ** 2
+        if kept_width >= kept_height:
+            return False
+
+        self.calibration_frames = [scale * y + offset for y in self.calibration_frames]
+        self.calibration_torso = [scale * torso for torso in self.calibration_torso]
+        if self.is_calibrated:
+            self.up_threshold = scale * self.up_threshold + offset
+            self.down_threshold = scale * self.down_threshold + offset
+            if self.torso_length is not None:
+                self.torso_length *= scale
+            self.analytics.calibrated_range *= scale
+            self.analytics.up_threshold = self.up_threshold
+            self._save_checkpoint(timestamp)
+        return True
+
+    def count_rep(self, landmarks, timestamp=None, analytics=True):
         """
         Count a rep based on shoulder position with smoothing.
         
         Parameters:
         - landmarks: Dictionary with joint coordinates
+        - timestamp: Capture time of the frame in seconds (default: now)
+        - analytics: Record the frame for per-rep metrics (skip when running late)
         
         Returns:
         - Dictionary with current progress
@@ -130,8 +360,12 @@ class RepCounter:
                 'reps': self.current_rep,
                 'sets': self.current_set,
                 'completed': False,
-                'state': self.position_state
+                'state': self.position_state,
+                'rep_metrics': self.last_rep_metrics
             }
+
+        if timestamp is None:
+            timestamp = time.monotonic()
         
         # Choose shoulder with better visibility
         left_vis = landmarks['left_shoulder']['visibility']
@@ -143,66 +377,143 @@ class RepCounter:
         else:
             joint_y = landmarks['right_shoulder']['y']
             joint_name = "right shoulder"
+
+        if analytics:
+            self.analytics.add_sample(timestamp, joint_y, landmarks)
         
         # STATE MACHINE WITH SMOOTHING
         
         if self.position_state == "up":
             # Check if shoulder went DOWN
             if joint_y > self.down_threshold:
-                self.down_counter += 1
-                self.up_counter = 0
+                if self.down_since is None:
+                    self.down_since = timestamp
+                self.up_since = None
                 
-                if self.down_counter >= self.SMOOTHING_FRAMES:
+                if timestamp - self.down_since >= self.SMOOTHING_SECONDS:
                     self.position_state = "down"
-                    self.down_counter = 0
-                    print(f"  ⬇ DOWN position locked ({joint_name}: {joint_y:.0f})")
+                    self.down_since = None
+                    self._publish(PositionChanged(
+                        timestamp, "down", joint_name, joint_y, self.current_rep, self.current_set
+                    ))
+                    self._save_checkpoint(timestamp)
             else:
-                self.down_counter = 0
+                self.down_since = None
         
         elif self.position_state == "down":
             # Check if shoulder came back UP
             if joint_y < self.up_threshold:
-                self.up_counter += 1
-                self.down_counter = 0
+                if self.up_since is None:
+                    self.up_since = timestamp
+                self.down_since = None
                 
-                if self.up_counter >= self.SMOOTHING_FRAMES:
+                if timestamp - self.up_since >= self.SMOOTHING_SECONDS:
                     self.position_state = "up"
-                    self.up_counter = 0
+                    self.up_since = None
                     
                     # INCREMENT THE REP!
                     self.current_rep += 1
-                    print(f"  ✅ REP {self.current_rep} COUNTED! ({joint_name}: {joint_y:.0f})")
+                    self.last_rep_metrics = self.analytics.finish_rep()
+                    self._publish(RepCounted(
+                        timestamp, self.current_rep, self.current_set, joint_name, joint_y,
+                        self.last_rep_metrics
+                    ))
                     
                     # Check if set is complete
                     if self.current_rep >= self.reps_per_set:
                         self.current_set += 1
                         self.current_rep = 0
-                        print(f"\n🎯 SET {self.current_set - 1} COMPLETE!")
+                        self._publish(SetCompleted(timestamp, self.current_set - 1, self.total_sets))
                         
                         # Check if all sets are done
                         if self.current_set > self.total_sets:
-                            print("\n" + "🏆" * 20)
-                            print("WORKOUT COMPLETE! All sets finished!")
-                            print("🏆" * 20 + "\n")
+                            self._save_checkpoint(timestamp)
+                            self._publish(WorkoutCompleted(timestamp, self.total_sets, self.reps_per_set))
                             return {
                                 'reps': self.reps_per_set,
                                 'sets': self.total_sets,
                                 'completed': True,
-                                'state': self.position_state
+                                'state': self.position_state,
+                                'rep_metrics': self.last_rep_metrics
                             }
-                        else:
-                            print(f"Rest briefly, then start SET {self.current_set}...\n")
-                            # ✅ FIXED: Always return after set completion
+                        # ✅ FIXED: Always return after set completion
+                    self._save_checkpoint(timestamp)
             else:
-                self.up_counter = 0
+                self.up_since = None
         
         # ✅ ALWAYS return current progress (this line must ALWAYS be reached)
         return {
             'reps': self.current_rep,
             'sets': self.current_set,
             'completed': False,
-            'state': self.position_state
+            'state': self.position_state,
+            'rep_metrics': self.last_rep_metrics
         }
+
+
+def test_resolution_change(seed=5):
+    """
+    Calibrate at one capture resolution, then keep switching resolution and
+    cropping to a region of interest while counting: the count must match
+    a run that never changed anything.
+
+    Then switch aspect ratio once and back: a 4:3 sensor at 640x480 going
+    to 1280x720 crops its top and bottom, which frame heights cannot see.
+    reframe() is called on each aspect change, as WorkoutSession does.
+    """
+    import numpy as np
+
+    from exercises import LANDMARK_INDEX
+    from pose_detection import extract_landmarks
+    from synthetic_traces import FRAME_WIDTH, FRAME_HEIGHT, generate_trace
+
+    aspect = FRAME_HEIGHT / FRAME_WIDTH  # The sensor is 4:3
+    # (width, height, crop box in fractions of the frame or None)
+    modes = [(640, 480, None), (1280, 960, None), (320, 240, None), (1280, 960, (0.2, 0.1, 0.9, 0.95))]
+    wide = (1280, 720, None)
+
+    def backend_points(landmarks, width, height, crop):
+        """What a pose backend would return for the (cropped) frame."""
+        points = np.zeros((33, 3), dtype=np.float32)
+        x0, y0, x1, y1 = crop or (0, 0, 1, 1)
+        view = (height / width) / aspect  # Part of the sensor's height a wider mode shows (centred)
+        for name, joint in landmarks.items():
+            x, y = joint['x'] * aspect, (joint['y'] - (1 - view) / 2) / view  # Per-axis normalized frame
+            points[LANDMARK_INDEX[name]] = ((x - x0) / (x1 - x0), (y - y0) / (y1 - y0), joint['visibility'])
+        return points, round(width * x0), round(height * y0), round(width * (x1 - x0)), round(height * (y1 - y0))
+
+    def count(trace, exercise, mode_for, reframing=True):
+        counter = RepCounter(reps_per_set=100, total_sets=1, exercise=exercise)
+        previous, previous_size = None, None
+        for i, (landmarks, timestamp) in enumerate(zip(trace.frames, trace.timestamps)):
+            width, height, crop = mode_for(i, counter) if counter.is_calibrated else modes[0]
+            if landmarks is not None:
+                points, x0, y0, crop_w, crop_h = backend_points(landmarks, width, height, crop)
+                landmarks = extract_landmarks(points, crop_w, crop_h, x0, y0, exercise, frame_height=height)
+                # Aspect ratio changed since the last pose
+                if reframing and previous is not None and previous_size[0] * height != previous_size[1] * width:
+                    counter.reframe(previous, landmarks, previous_size, (width, height))
+                previous, previous_size = landmarks, (width, height)
+            if not counter.is_calibrated:
+                counter.calibrate(landmarks, timestamp)
+            else:
+                counter.count_rep(landmarks, timestamp, analytics=False)
+        return counter.current_rep
+
+    for exercise_type in ExerciseType:
+        trace = generate_trace(exercise_type, n_reps=12, seed=seed)
+        exercise = EXERCISES[exercise_type]
+        third = len(trace.frames) // 3
+        unchanged = count(trace, exercise, lambda i, counter: modes[0])
+        switching = count(trace, exercise, lambda i, counter: modes[(i // 40) % len(modes)])
+        widening = lambda i, counter: wide if third <= i < 2 * third else modes[0]
+        widened = count(trace, exercise, widening)
+        assert switching == unchanged, ("switching", exercise_type, unchanged, switching)
+        assert widened == unchanged, ("widened", exercise_type, unchanged, widened)
+        print(f"✅ {exercise_type.value:15s} {unchanged:2d} reps (true {trace.true_reps}) while switching "
+              f"between {len(modes)} resolutions / crops every 40 frames, and 640x480 -> 1280x720 -> 640x480 "
+              f"({count(trace, exercise, widening, reframing=False)} reps without reframe())")
+
         
 def test_rep_counter():
     """Test the complete rep counter with live camera"""
@@ -215,8 +526,13 @@ def test_rep_counter():
         print("ERROR: Cannot access camera")
         return
     
+    # Print progress from the event bus, off the frame loop
+    events = EventBus()
+    events.subscribe(ConsoleLogger())
+    events.start()
+
     # Create rep counter (3 sets of 5 reps for testing)
-    counter = RepCounter(reps_per_set=5, total_sets=3)
+    counter = RepCounter(reps_per_set=5, total_sets=3, events=events)
         
     print("RepCounter Test Starting!")
     print("Press 'q' to quit\n")
@@ -225,18 +541,19 @@ def test_rep_counter():
         ret, frame = cap.read()
         if not ret:
             break
+        timestamp = time.monotonic()  # Capture time drives all smoothing
         
         # Detect pose
         landmarks, annotated_frame = detect_pose(frame)
         
         # Calibration phase
         if not counter.is_calibrated:
-            counter.calibrate(landmarks)
+            counter.calibrate(landmarks, timestamp)
             cv2.putText(annotated_frame, "CALIBRATING... Do 2 slow push-ups", 
                     (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
         else:
             # Counting phase
-            progress = counter.count_rep(landmarks)
+            progress = counter.count_rep(landmarks, timestamp)
             
             # Display progress on screen
             text = f"SET {progress['sets']}/{counter.total_sets} | REP {progress['reps']}/{counter.reps_per_set}"
@@ -256,6 +573,7 @@ def test_rep_counter():
     
     cap.release()
     cv2.destroyAllWindows()
+    events.stop()
 
 
 if __name__ == "__main__":
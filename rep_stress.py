@@ -0,0 +1,115 @@
+import argparse
+import time
+
+from exercises import EXERCISES, ExerciseType
+from rep_counter import RepCounter
+from synthetic_traces import generate_traces
+
+
+def run_trace(trace, reps_per_set=12, total_sets=3):
+    """
+    Push one trace through a fresh RepCounter.
+
+    Parameters:
+    - trace: SyntheticTrace to replay
+    - reps_per_set, total_sets: RepCounter configuration
+
+    Returns:
+    - Total reps counted over all sets
+    """
+    counter = RepCounter(reps_per_set=reps_per_set, total_sets=total_sets,
+                         exercise=EXERCISES[trace.exercise_type])
+    calibrate = counter.calibrate
+    count_rep = counter.count_rep
+
+    for landmarks, timestamp in zip(trace.frames, trace.timestamps):
+        if not counter.is_calibrated:
+            calibrate(landmarks, timestamp)
+        else:
+            count_rep(landmarks, timestamp)
+
+    return (counter.current_set - 1) * counter.reps_per_set + counter.current_rep
+
+
+def run_stress(total_frames=1_000_000, traces_per_exercise=20, exercise_types=None, seed=0):
+    """
+    Replay synthetic traces through RepCounter until total_frames have been
+    processed and measure throughput and counting accuracy.
+
+    Traces are generated once up front and reused, so the timing only
+    covers calibrate()/count_rep().
+
+    Parameters:
+    - total_frames: Number of frames to push through the counter
+    - traces_per_exercise: Distinct traces generated per exercise
+    - exercise_types: ExerciseTypes to test (default: all)
+    - seed: Seed for reproducible traces
+
+    Returns:
+    - Dictionary of results per exercise name
+    """
+    exercise_types = list(exercise_types or ExerciseType)
+    traces = generate_traces(traces_per_exercise * len(exercise_types), exercise_types, seed=seed)
+
+    stats = {
+        exercise_type: {'frames': 0, 'seconds': 0.0, 'runs': 0, 'exact': 0, 'abs_error': 0}
+        for exercise_type in exercise_types
+    }
+
+    frames_done = 0
+    while frames_done < total_frames:
+        for trace in traces:
+            start = time.perf_counter()
+            counted = run_trace(trace)
+            elapsed = time.perf_counter() - start
+
+            entry = stats[trace.exercise_type]
+            entry['frames'] += len(trace)
+            entry['seconds'] += elapsed
+            entry['runs'] += 1
+            entry['exact'] += counted == trace.true_reps
+            entry['abs_error'] += abs(counted - trace.true_reps)
+
+            frames_done += len(trace)
+            if frames_done >= total_frames:
+                break
+
+    results = {}
+    for exercise_type, entry in stats.items():
+        if entry['runs'] == 0:
+            continue
+        results[exercise_type.value] = {
+            'frames': entry['frames'],
+            'fps': entry['frames'] / entry['seconds'] if entry['seconds'] else 0.0,
+            'exact_rate': entry['exact'] / entry['runs'],
+            'mean_abs_error': entry['abs_error'] / entry['runs'],
+        }
+    return results
+
+
+def print_report(results):
+    """Print a results table from run_stress()."""
+    print("=" * 70)
+    print(f"{'EXERCISE':15s} {'FRAMES':>10s} {'FRAMES/SEC':>12s} {'EXACT':>8s} {'MEAN |ERR|':>11s}")
+    print("=" * 70)
+    for name, result in results.items():
+        print(f"{name:15s} {result['frames']:10d} {result['fps']:12.0f} "
+              f"{result['exact_rate']:8.1%} {result['mean_abs_error']:11.2f}")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RepCounter stress test on synthetic landmark traces")
+    parser.add_argument("--frames", type=int, default=1_000_000, help="Total frames to process")
+    parser.add_argument("--traces", type=int, default=20, help="Distinct traces per exercise")
+    parser.add_argument("--exercise", choices=[e.name.lower() for e in ExerciseType],
+                        action="append", help="Exercise to test (repeatable, default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    exercise_types = [ExerciseType[name.upper()] for name in args.exercise] if args.exercise else None
+    print_report(run_stress(args.frames, args.traces, exercise_types, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import collections
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from events import RepCounted
+from frame_buffers import BufferPool
+
+# Instant replay of the last rep or set. Raw frames would take gigabytes
+# (a 1080p frame is 6 MB), so the session hands every frame to a
+# ReplayBuffer that keeps it as a small JPEG (320x240 by default, ~10-20 kB)
+# together with the tracked joints. Frames live in a FIFO with a fixed byte
+# budget: once it is full the oldest frames are evicted, so memory stays
+# flat however long the session runs. Reps are indexed by the capture
+# timestamps of RepCounted events, so "the last rep" is a time range.
+#
+# Encoding runs on a background thread; the frame loop only scales the
+# frame down into a pooled buffer and queues it.
+
+
+class ReplayFrame:
+    """One stored frame."""
+
+    __slots__ = ("timestamp", "jpeg", "joints")
+
+    def __init__(self, timestamp, jpeg, joints):
+        self.timestamp = timestamp
+        self.jpeg = jpeg      # JPEG bytes as a NumPy array (from cv2.imencode)
+        self.joints = joints  # (n, 3) float16 [x, y, visibility] normalized, or None
+
+    @property
+    def nbytes(self):
+        return self.jpeg.nbytes + (self.joints.nbytes if self.joints is not None else 0) + ReplayBuffer.FRAME_OVERHEAD
+
+
+class ReplayBuffer:
+    """
+    Byte-budgeted rolling store of downscaled JPEG frames, indexed by rep.
+    """
+
+    FRAME_OVERHEAD = 200     # Bytes of Python objects per stored frame, counted against the budget
+    MAX_REP_SECONDS = 8.0    # A rep clip starts at most this long before the rep was counted
+    POST_ROLL = 0.5          # Seconds shown after the rep was counted
+
+    def __init__(self, budget_bytes=32_000_000, size=(320, 240), quality=70, queue_size=8):
+        """
+        Parameters:
+        - budget_bytes: Memory the stored frames may use
+        - size: (width, height) frames are stored at
+        - quality: JPEG quality
+        - queue_size: Frames that may wait for the encoder (more are dropped)
+        """
+        self.budget_bytes = budget_bytes
+        self.size = size
+        self.quality = quality
+
+        self.frames = collections.deque()
+        self.reps = collections.deque()  # (timestamp, set, rep) of every counted rep still in the buffer
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.buffers = BufferPool()
+        self._thread = None
+
+        # Statistics
+        self.added = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    def start(self):
+        """Start the encoder thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._encode_loop, name="ReplayBuffer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Encode what is queued and stop the encoder thread (stored frames stay available)."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def add(self, image, timestamp, landmarks=None, frame_size=None):
+        """
+        Hand a frame to the buffer. Never blocks.
+
+        Parameters:
+        - image: BGR frame or preview (scaled to the buffer's size here)
+        - timestamp: Capture time in seconds
+        - landmarks: Joint dictionary from extract_landmarks (frame heights), or None
+        - frame_size: (width, height) of the frame the landmarks come from (default: the
+          image's size; only the aspect ratio is used)
+        """
+        width, height = self.size
+        small = self.buffers.acquire((height, width, 3))
+        if image.shape[:2] == (height, width):
+            np.copyto(small, image)
+        else:
+            cv2.resize(image, self.size, dst=small)
+
+        joints = None
+        if landmarks:
+            frame_width, frame_height = frame_size or (image.shape[1], image.shape[0])
+            aspect = frame_height / frame_width
+            joints = np.array(
+                [(joint['x'] * aspect, joint['y'], joint['visibility'])
+                 for joint in landmarks.values()],
+                dtype=np.float16
+            )
+
+        self.added += 1
+        try:
+            self._queue.put_nowait((timestamp, small, joints))
+        except queue.Full:
+            self.dropped += 1
+            self.buffers.release(small)
+
+    def _encode_loop(self):
+        params = (cv2.IMWRITE_JPEG_QUALITY, self.quality)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            timestamp, small, joints = item
+            ok, jpeg = cv2.imencode(".jpg", small, params)
+            self.buffers.release(small)
+            if ok:
+                self._store(ReplayFrame(timestamp, jpeg, joints))
+
+    def _store(self, frame):
+        with self._lock:
+            self.frames.append(frame)
+            self.bytes += frame.nbytes
+            # FIFO eviction down to the budget
+            while self.bytes > self.budget_bytes and len(self.frames) > 1:
+                self.bytes -= self.frames.popleft().nbytes
+                self.evicted += 1
+            oldest = self.frames[0].timestamp
+            while self.reps and self.reps[0][0] < oldest:
+                self.reps.popleft()
+
+    def on_event(self, event):
+        """EventBus subscriber: index counted reps by their capture time."""
+        if isinstance(event, RepCounted):
+            with self._lock:
+                self.reps.append((event.timestamp, event.set, event.rep))
+
+    def clip(self, kind="rep"):
+        """
+        Frames of the last rep or set.
+
+        Parameters:
+        - kind: "rep" or "set"
+
+        Returns:
+        - (label, list of ReplayFrame); the list is empty if no rep has been
+          counted yet (or it has been evicted). The start may be cut off if
+          older frames were evicted.
+        """
+        with self._lock:
+            if not self.reps or not self.frames:
+                return None, []
+            reps = list(self.reps)
+            end_time, set_number, rep = reps[-1]
+            first = len(reps) - 1
+            if kind == "set":
+                while first > 0 and reps[first - 1][1] == set_number:
+                    first -= 1
+            # A rep starts where the one before it ended, unless that was long ago (rest between sets)
+            start_time = reps[first][0] - self.MAX_REP_SECONDS
+            if first > 0:
+                start_time = max(start_time, reps[first - 1][0])
+            end_time += self.POST_ROLL
+            frames = [frame for frame in self.frames if start_time <= frame.timestamp <= end_time]
+        if kind == "set":
+            return f"SET {set_number}", frames
+        return f"SET {set_number}, REP {rep}", frames
+
+    def stats(self):
+        """
+        Buffer statistics.
+
+        Returns:
+        - Dictionary with frames stored, bytes used, seconds covered, reps
+          indexed and frames added, dropped and evicted
+        """
+        with self._lock:
+            seconds = self.frames[-1].timestamp - self.frames[0].timestamp if self.frames else 0.0
+            return {
+                'frames': len(self.frames),
+                'bytes': self.bytes,
+                'seconds': round(seconds, 1),
+                'reps': len(self.reps),
+                'added': self.added,
+                'dropped': self.dropped,
+                'evicted': self.evicted,
+            }
+
+
+def render_replay_frame(frames, index):
+    """
+    Decode a stored frame and draw the tracked joints' paths up to it.
+
+    Parameters:
+    - frames: Clip from ReplayBuffer.clip()
+    - index: Frame to render
+
+    Returns:
+    - BGR image
+    """
+    image = cv2.imdecode(frames[index].jpeg, cv2.IMREAD_COLOR)
+    height, width = image.shape[:2]
+    trail = [frame.joints for frame in frames[:index + 1] if frame.joints is not None]
+    if len(trail) > 1:
+        joints = np.stack(trail).astype(np.float32)  # (frames, joints, 3)
+        for joint in range(joints.shape[1]):
+            path = joints[:, joint]
+            path = path[path[:, 2] > 0.5, :2] * (width, height)
+            if len(path) > 1:
+                cv2.polylines(image, [path.astype(np.int32)], False, (255, 0, 255), 1)
+    return image
+
+
+def test_replay_buffer():
+    """
+    Simulate a long session and check that memory stays within the budget,
+    old frames are evicted in order and the last rep / set clips are right.
+    """
+    from synthetic_traces import FRAME_WIDTH, FRAME_HEIGHT
+
+    budget = 4_000_000
+    replay = ReplayBuffer(budget_bytes=budget)
+    replay.start()
+    rng = np.random.default_rng(0)
+    frame = np.empty((FRAME_HEIGHT, FRAME_WIDTH, 3), np.uint8)
+    noise = rng.integers(0, 40, frame.shape, dtype=np.uint8)
+    landmarks = {'left_shoulder': {'x': 0.62, 'y': 0.42, 'visibility': 0.9},
+                 'right_shoulder': {'x': 0.70, 'y': 0.42, 'visibility': 0.9}}
+
+    fps = 30.0
+    rep_seconds = 2.0
+    peak = 0
+    sizes = []
+    for i in range(int(fps * 60 * 5)):  # Five minutes of 2-second reps, 10 per set
+        timestamp = i / fps
+        frame[:] = noise
+        cv2.putText(frame, f"{i}", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 8)
+        landmarks['left_shoulder']['y'] = 0.42 + 0.17 * abs(np.sin(np.pi * timestamp / rep_seconds))
+        replay.add(frame, timestamp, landmarks)
+        if i and i % int(fps * rep_seconds) == 0:
+            rep = i // int(fps * rep_seconds)
+            replay.on_event(RepCounted(timestamp, (rep - 1) % 10 + 1, (rep - 1) // 10 + 1, "left shoulder", 0.0))
+        time.sleep(0)  # Let the encoder keep up, like the frame loop's pacing would
+        if i % 300 == 0:
+            while not replay._queue.empty():
+                time.sleep(0.001)
+            peak = max(peak, replay.bytes)
+            sizes.append(replay.stats()['frames'])
+    replay.stop()
+
+    stats = replay.stats()
+    assert replay.bytes <= budget and peak <= budget, (replay.bytes, peak)
+    assert stats['evicted'] > 0
+    timestamps = [frame.timestamp for frame in replay.frames]
+    assert timestamps == sorted(timestamps)
+
+    label, frames = replay.clip("rep")
+    last_rep = replay.reps[-1][0]
+    assert frames and frames[-1].timestamp <= last_rep + ReplayBuffer.POST_ROLL
+    assert frames[0].timestamp >= replay.reps[-2][0], "rep clip starts before the previous rep ended"
+    label_set, set_frames = replay.clip("set")
+    assert len(set_frames) > len(frames)
+    image = render_replay_frame(frames, len(frames) - 1)
+    assert image.shape == (240, 320, 3)
+
+    print(f"✅ Replay buffer: {stats['frames']} frames / {stats['seconds']}s in "
+          f"{stats['bytes'] / 1e6:.1f} MB (budget {budget / 1e6:.0f} MB), {stats['evicted']} evicted, "
+          f"{stats['dropped']} dropped; stored frames stayed at {min(sizes[3:])}-{max(sizes[3:])}")
+    print(f"   {label}: {len(frames)} frames, {label_set}: {len(set_frames)} frames")
+
+
+if __name__ == "__main__":
+    test_replay_buffer()
@@ -0,0 +1,254 @@
+import os
+import threading
+import time
+
+import cv2
+
+from events import QualityChanged
+from process_stats import host_cpu_times, usable_cores
+
+# CPU resource governor for hosts running several sessions. Left alone,
+# every session's OpenCV thread pool and inference threads assume they own
+# the whole machine, the cores are oversubscribed and every session
+# stutters. The governor gives each session a share of the cores:
+#
+#   - OpenCV's (process-wide) thread pool and each session's inference
+#     threads are sized to one session's share
+#   - optionally each session's thread is pinned to its own cores; threads
+#     it starts afterwards (the pose model's) inherit the pinning
+#   - every INTERVAL it samples each session's CPU time and deadline misses
+#     and the host's CPU use. When the host is saturated, the session that
+#     is struggling most drops one QUALITY_LEVELS step (lower inference rate,
+#     then lower inference resolution); when the host has room again the
+#     most degraded session gets a step back.
+#
+#   python headless.py --source cam1.mp4 --source cam2.mp4 --source 0 --governor --pin-cpus
+
+# Degradation ladder: (run pose on every n-th frame, inference height or None = native)
+QUALITY_LEVELS = (
+    (1, None),
+    (1, 480),
+    (2, 480),
+    (2, 360),
+    (3, 360),
+)
+
+
+class SessionBudget:
+    """One session's share of the host and its measured usage."""
+
+    def __init__(self, index, cores, share, pin=False):
+        """
+        Parameters:
+        - index: Session number
+        - cores: CPU cores assigned to the session
+        - share: Cores' worth of CPU time the session may use (may be fractional)
+        - pin: Pin the session's thread to its cores
+        """
+        self.index = index
+        self.cores = cores
+        self.share = share
+        self.threads = max(1, int(share))  # Inference threads
+        self.pin = pin
+        self.level = 0
+        self.changed_at = None
+        self.session = None  # The WorkoutSession using this budget (it registers itself)
+
+        # Usage over the last governor interval
+        self.cpu_percent = 0.0  # Session thread, % of one core
+        self.miss_rate = 0.0
+        self._last = None
+
+    @property
+    def quality(self):
+        """(inference stride, inference height) at the current level."""
+        return QUALITY_LEVELS[self.level]
+
+    def enter(self):
+        """Call on the session's own thread before it starts any work."""
+        if self.pin and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, self.cores)  # 0 = the calling thread
+
+    def sample(self, now):
+        """Update cpu_percent and miss_rate from the session's counters."""
+        session = self.session
+        if session is None:
+            return
+        scheduler = session.scheduler
+        current = (now, session.cpu_seconds, scheduler.frames, scheduler.deadline_misses)
+        if self._last is not None:
+            elapsed = now - self._last[0]
+            frames = current[2] - self._last[2]
+            self.cpu_percent = (current[1] - self._last[1]) / elapsed * 100 if elapsed > 0 else 0.0
+            self.miss_rate = (current[3] - self._last[3]) / frames if frames else 0.0
+        self._last = current
+
+
+class ResourceGovernor:
+    """
+    Splits the host's cores between sessions and trades quality for CPU
+    when the host is saturated.
+    """
+
+    INTERVAL = 2.0        # Seconds between usage samples
+    SATURATED = 0.90      # Host CPU use at which sessions start giving up quality
+    RECOVERED = 0.70      # Host CPU use at which they get it back
+    MISS_RATE = 0.10      # Share of missed frame deadlines that counts as stuttering
+    HOLD_SECONDS = 10.0   # Let the load settle before changing the same session again
+
+    def __init__(self, sessions, pin=False, cores=None):
+        """
+        Parameters:
+        - sessions: Number of sessions sharing the host
+        - pin: Pin every session to its own cores
+        - cores: Cores to share (default: all this process may use)
+        """
+        self.cores = list(cores) if cores is not None else usable_cores()
+        share = len(self.cores) / sessions
+        per_session = max(1, len(self.cores) // sessions)
+        # More sessions than cores: neighbours share cores round-robin
+        self.budgets = [
+            SessionBudget(index, [self.cores[(index * per_session + k) % len(self.cores)]
+                                  for k in range(per_session)], share, pin)
+            for index in range(sessions)
+        ]
+        self.host_busy = None
+        self.process_cpu_percent = 0.0  # All threads of this process, % of one core
+        self._host_last = host_cpu_times()
+        self._process_last = None
+        self._thread = None
+        self._running = False
+        self._wakeup = threading.Event()
+
+    def configure(self):
+        """Apply the process-wide settings (call once, before the sessions start)."""
+        cv2.setNumThreads(self.budgets[0].threads)
+
+    def budget(self, index):
+        """SessionBudget for the session at the given index."""
+        return self.budgets[index]
+
+    def start(self):
+        """Start sampling on a background thread."""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="ResourceGovernor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        if self._thread is None:
+            return
+        self._running = False
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self):
+        while self._running:
+            self._wakeup.wait(self.INTERVAL)
+            if self._running:
+                self.update()
+
+    def _sample_host(self):
+        """Host CPU use since the last sample (0-1), or None if unknown."""
+        times = host_cpu_times()
+        if times is not None and self._host_last is not None:
+            busy = times[0] - self._host_last[0]
+            total = times[1] - self._host_last[1]
+            self._host_last = times
+            return busy / total if total > 0 else None
+        if hasattr(os, "getloadavg"):
+            # Slower to react, but better than nothing
+            return min(1.0, os.getloadavg()[0] / (os.cpu_count() or 1))
+        return None
+
+    def update(self, now=None):
+        """
+        Sample usage and change at most one session's quality level.
+
+        Returns:
+        - The SessionBudget that changed, or None
+        """
+        now = time.monotonic() if now is None else now
+        for budget in self.budgets:
+            budget.sample(now)
+        # Sessions only see their own thread; the pose model's worker threads show up here
+        times = os.times()
+        process = (now, times.user + times.system)
+        if self._process_last is not None and now > self._process_last[0]:
+            self.process_cpu_percent = (process[1] - self._process_last[1]) / (now - self._process_last[0]) * 100
+        self._process_last = process
+        busy = self.host_busy = self._sample_host()
+        if busy is None:
+            return None
+
+        settled = [
+            budget for budget in self.budgets
+            if budget.session is not None
+            and (budget.changed_at is None or now - budget.changed_at >= self.HOLD_SECONDS)
+        ]
+        if busy >= self.SATURATED:
+            # Stuttering or over-budget sessions step down, the heaviest first
+            struggling = [
+                budget for budget in settled
+                if budget.level < len(QUALITY_LEVELS) - 1
+                and (budget.miss_rate > self.MISS_RATE or budget.cpu_percent > budget.share * 100)
+            ]
+            if struggling:
+                target = max(struggling, key=lambda budget: budget.cpu_percent / budget.share)
+                return self._set_level(target, target.level + 1, now, f"host CPU at {busy:.0%}")
+        elif busy <= self.RECOVERED:
+            degraded = [budget for budget in settled if budget.level > 0]
+            if degraded:
+                target = max(degraded, key=lambda budget: budget.level)
+                return self._set_level(target, target.level - 1, now, f"host CPU down to {busy:.0%}")
+        return None
+
+    def _set_level(self, budget, level, now, reason):
+        budget.level = level
+        budget.changed_at = now
+        stride, height = QUALITY_LEVELS[level]
+        budget.session.events.publish(QualityChanged(now, level, stride, height or 0, reason))
+        return budget
+
+    def usage(self):
+        """
+        Per-session CPU usage and quality.
+
+        Returns:
+        - List of dictionaries with session, cores (None when not pinned),
+          share (cores' worth), threads, cpu_percent (session thread, % of one core),
+          miss_rate, level, stride and height (0 = native)
+        """
+        return [
+            {
+                'session': budget.index,
+                'cores': budget.cores if budget.pin else None,
+                'share': round(budget.share, 2),
+                'threads': budget.threads,
+                'cpu_percent': round(budget.cpu_percent, 1),
+                'miss_rate': round(budget.miss_rate, 3),
+                'level': budget.level,
+                'stride': budget.quality[0],
+                'height': budget.quality[1] or 0,
+            }
+            for budget in self.budgets
+        ]
+
+
+def print_usage(governor):
+    """Print the per-session usage table."""
+    host = f"{governor.host_busy:.0%}" if governor.host_busy is not None else "unknown"
+    print("=" * 72)
+    print(f"CPU GOVERNOR - {len(governor.cores)} cores, host CPU {host}, "
+          f"this process {governor.process_cpu_percent:.0f}% of a core")
+    print(f"{'SESSION':>7s} {'CORES':>10s} {'SHARE':>6s} {'THREADS':>7s} {'CPU %':>7s} "
+          f"{'MISSES':>7s} {'STRIDE':>6s} {'HEIGHT':>7s}")
+    print("=" * 72)
+    for u in governor.usage():
+        cores = ",".join(str(core) for core in u['cores']) if u['cores'] else "any"
+        print(f"{u['session']:7d} {cores:>10s} {u['share']:6.2f} {u['threads']:7d} {u['cpu_percent']:7.1f} "
+              f"{u['miss_rate']:7.1%} {u['stride']:6d} {u['height'] or 'native':>7}")
+    print("=" * 72)
@@ -0,0 +1,214 @@
+import argparse
+import csv
+import itertools
+import time
+
+import numpy as np
+
+from bench_backends import parse_session
+from exercises import EXERCISES, ExerciseType
+from landmark_cache import DEFAULT_DIRECTORY, LandmarkCache, infer_video
+from pose_detection import extract_landmarks
+from rep_counter import RepCounter
+
+# Accuracy vs compute sweep: runs labelled recorded sessions through the
+# pipeline for every combination of
+#   inference resolution x model x inference stride          (pose stage)
+#   THRESHOLD_BUFFER x SMOOTHING_SECONDS x CALIBRATION_SECONDS (counter stage)
+# and reports rep-count error next to CPU time per frame and latency, then
+# prints the Pareto frontier (no other configuration is at least as good on
+# error, CPU and latency and better on one of them).
+#
+# Pose inference is the expensive part, so it runs once per pose
+# configuration; the recorded landmarks are then replayed through a fresh
+# RepCounter for every counter configuration. With --cache it does not run
+# again at all for a session and pose configuration swept before (see
+# landmark_cache.py); CPU and latency columns still report what the
+# inference cost when it ran.
+#
+#   python sweep.py pushups_20.mp4:20 pushups_15.mp4:15 --heights 0 480 360 \
+#       --strides 1 2 3 --buffers 0.25 0.35 --smoothing 0.1 0.15 0.25 --csv sweep.csv --cache
+
+
+def run_pose(path, model, height, stride, exercise, cache=None):
+    """
+    Run pose inference over a recorded session for one pose configuration.
+
+    Parameters:
+    - path: Video file
+    - model: Pose backend spec
+    - height: Inference height in pixels (0 = native resolution)
+    - stride: Run inference on every stride-th frame
+    - exercise: Exercise whose joints are extracted
+    - cache: Optional LandmarkCache (landmarks of a session seen before are read back)
+
+    Returns:
+    - Dictionary with frames (total decoded), samples [(timestamp, landmarks)],
+      cpu_s and wall_s spent on resize + inference (as measured when the
+      inference ran, also for cached sessions), fps of the video and cached
+    """
+    run = infer_video(path, model, height, stride, cache)
+    fps = run['fps']
+    samples = []
+    for index, points in zip(run['frame_index'].tolist(), run['points']):
+        # Landmarks are normalized, so they map to the same frame-height
+        # coordinates at every inference resolution
+        landmarks = None
+        if not np.isnan(points[0, 0]):
+            landmarks = extract_landmarks(points, run['width'], run['height'], exercise=exercise)
+        samples.append((index / fps, landmarks))
+    return {'frames': run['frames'], 'samples': samples, 'cpu_s': run['cpu_s'], 'wall_s': run['wall_s'],
+            'fps': fps, 'cached': run['cached']}
+
+
+def count_reps(samples, exercise, threshold_buffer, smoothing_seconds, calibration_seconds):
+    """
+    Replay recorded landmarks through a RepCounter with the given parameters.
+
+    Returns:
+    - (total reps counted, CPU seconds spent counting)
+    """
+    counter = RepCounter(reps_per_set=10_000, total_sets=1, exercise=exercise)
+    counter.THRESHOLD_BUFFER = threshold_buffer
+    counter.SMOOTHING_SECONDS = smoothing_seconds
+    counter.CALIBRATION_SECONDS = calibration_seconds
+
+    start = time.process_time()
+    for timestamp, landmarks in samples:
+        if not counter.is_calibrated:
+            counter.calibrate(landmarks, timestamp)
+        else:
+            counter.count_rep(landmarks, timestamp, analytics=False)
+    return counter.current_rep, time.process_time() - start
+
+
+def pareto_frontier(results, keys=('abs_error', 'cpu_ms', 'latency_ms')):
+    """
+    Results that no other result beats on every key (lower is better).
+
+    Returns:
+    - Frontier results sorted by the first key
+    """
+    frontier = []
+    for result in results:
+        dominated = any(
+            all(other[k] <= result[k] for k in keys) and any(other[k] < result[k] for k in keys)
+            for other in results
+        )
+        if not dominated:
+            frontier.append(result)
+    return sorted(frontier, key=lambda r: tuple(r[k] for k in keys))
+
+
+def sweep(sessions, exercise, heights, models, strides, buffers, smoothing, calibration, cache=None):
+    """
+    Evaluate every configuration on every session.
+
+    Parameters:
+    - sessions: List of (video path, true reps)
+    - exercise: Exercise performed in the sessions
+    - heights, models, strides: Pose stage grid
+    - buffers, smoothing, calibration: RepCounter grid
+    - cache: Optional LandmarkCache for the pose stage
+
+    Returns:
+    - List of result dictionaries, one per configuration
+    """
+    results = []
+    for height, model, stride in itertools.product(heights, models, strides):
+        runs = [(run_pose(path, model, height, stride, exercise, cache), true_reps) for path, true_reps in sessions]
+        total_frames = sum(run['frames'] for run, _ in runs)
+        processed = sum(len(run['samples']) for run, _ in runs)
+        pose_cpu = sum(run['cpu_s'] for run, _ in runs)
+        infer_ms = sum(run['wall_s'] for run, _ in runs) / max(1, processed) * 1000
+        fps = runs[0][0]['fps'] if runs else 30.0
+        cached = sum(run['cached'] for run, _ in runs)
+        print(f"  pose: height={height or 'native'} model={model} stride={stride} - {infer_ms:.1f} ms/inference"
+              f"{f' ({cached}/{len(runs)} from cache)' if cached else ''}")
+
+        for threshold_buffer, smoothing_seconds, calibration_seconds in itertools.product(
+                buffers, smoothing, calibration):
+            errors = exact = 0
+            count_cpu = 0.0
+            for run, true_reps in runs:
+                reps, cpu = count_reps(run['samples'], exercise, threshold_buffer,
+                                       smoothing_seconds, calibration_seconds)
+                errors += abs(reps - true_reps)
+                exact += reps == true_reps
+                count_cpu += cpu
+            count_ms = count_cpu / max(1, processed) * 1000
+            results.append({
+                'height': height or "native",
+                'model': model,
+                'stride': stride,
+                'threshold_buffer': threshold_buffer,
+                'smoothing_s': smoothing_seconds,
+                'calibration_s': calibration_seconds,
+                'abs_error': errors,
+                'exact': f"{exact}/{len(sessions)}",
+                # CPU per captured frame: skipped frames cost nothing
+                'cpu_ms': (pose_cpu + count_cpu) / max(1, total_frames) * 1000,
+                # Capture -> count: processing time plus, on average, half the
+                # frames a stride skips before the next processed one
+                'latency_ms': infer_ms + count_ms + (stride - 1) / 2 / fps * 1000,
+            })
+    return results
+
+
+COLUMNS = ('height', 'model', 'stride', 'threshold_buffer', 'smoothing_s', 'calibration_s',
+           'abs_error', 'exact', 'cpu_ms', 'latency_ms')
+
+
+def print_table(results, title):
+    print("=" * 104)
+    print(title)
+    print(f"{'HEIGHT':>7s} {'MODEL':>12s} {'STRIDE':>6s} {'BUFFER':>7s} {'SMOOTH':>7s} {'CALIB':>6s} "
+          f"{'ERR':>5s} {'EXACT':>6s} {'CPU ms/fr':>10s} {'LATENCY ms':>11s}")
+    print("=" * 104)
+    for r in results:
+        print(f"{str(r['height']):>7s} {r['model']:>12s} {r['stride']:6d} {r['threshold_buffer']:7.2f} "
+              f"{r['smoothing_s']:7.2f} {r['calibration_s']:6.1f} {r['abs_error']:5d} {r['exact']:>6s} "
+              f"{r['cpu_ms']:10.2f} {r['latency_ms']:11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rep-count accuracy vs compute sweep with Pareto frontier")
+    parser.add_argument("sessions", nargs="+", type=parse_session, help="Labelled session as <video>:<reps>")
+    parser.add_argument("--exercise", choices=[e.name.lower() for e in ExerciseType], default="pushups")
+    parser.add_argument("--heights", type=int, nargs="+", default=[0, 480, 360],
+                        help="Inference heights in pixels (0 = native)")
+    parser.add_argument("--models", nargs="+", default=["mediapipe:0", "mediapipe:1", "mediapipe:2"],
+                        help="Pose backend specs (model complexity)")
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--buffers", type=float, nargs="+", default=[RepCounter.THRESHOLD_BUFFER],
+                        help="THRESHOLD_BUFFER values")
+    parser.add_argument("--smoothing", type=float, nargs="+", default=[RepCounter.SMOOTHING_SECONDS],
+                        help="SMOOTHING_SECONDS values")
+    parser.add_argument("--calibration", type=float, nargs="+", default=[RepCounter.CALIBRATION_SECONDS],
+                        help="CALIBRATION_SECONDS values")
+    parser.add_argument("--csv", help="Also write every result to this CSV file")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_DIRECTORY, metavar="DIR",
+                        help=f"Cache pose landmarks on disk (default directory: {DEFAULT_DIRECTORY})")
+    args = parser.parse_args()
+
+    exercise = EXERCISES[ExerciseType[args.exercise.upper()]]
+    print(f"Sweeping {len(args.sessions)} session(s)...")
+    cache = LandmarkCache(args.cache) if args.cache else None
+    results = sweep(args.sessions, exercise, args.heights, args.models, args.strides,
+                    args.buffers, args.smoothing, args.calibration, cache)
+    if cache:
+        print(f"Landmark cache {args.cache}: {cache.stats()}")
+
+    print_table(sorted(results, key=lambda r: (r['abs_error'], r['cpu_ms'])), f"ALL {len(results)} CONFIGURATIONS")
+    print_table(pareto_frontier(results), "PARETO FRONTIER (error / CPU / latency)")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"Results saved to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import random
+
+import numpy as np
+
+from exercises import ExerciseType, EXERCISES
+
+# Frame size the motion models are laid out in (same as a default DroidCam
+# stream); traces come out in frame heights like extract_landmarks()
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+
+# Joints every trace carries, on top of the exercise's own tracking points
+# (which include the hips for the torso length). RepCounter always follows
+# the shoulders.
+BASE_JOINTS = ('left_shoulder', 'right_shoulder')
+
+# Motion model per exercise: for each left-side joint its rest position
+# (x, y) and how far it moves (dx, dy) at the deepest point of a full rep.
+# Side-view exercises put the right side slightly behind the left one and
+# less visible; front-view exercises mirror the right side around the centre.
+MOTION_MODELS = {
+    ExerciseType.PUSHUPS: {
+        'view': 'side',
+        'joints': {
+            'shoulder': (300, 220, 0, 110),
+            'elbow': (310, 290, 15, 50),
+            'wrist': (320, 360, 0, 0),
+            'hip': (450, 250, 0, 80),
+            'knee': (550, 300, 0, 40),
+            'ankle': (620, 340, 0, 0),
+        }
+    },
+    ExerciseType.SQUATS: {
+        'view': 'side',
+        'joints': {
+            'shoulder': (320, 150, 20, 140),
+            'elbow': (340, 230, 30, 120),
+            'wrist': (360, 290, 40, 100),
+            'hip': (320, 260, -40, 150),
+            'knee': (350, 350, 30, 30),
+            'ankle': (330, 440, 0, 0),
+        }
+    },
+    ExerciseType.SITUPS: {
+        'view': 'side',
+        'joints': {
+            'shoulder': (220, 390, 90, -130),
+            'elbow': (200, 380, 80, -110),
+            'wrist': (180, 370, 70, -100),
+            'hip': (350, 400, 0, 0),
+            'knee': (430, 340, 0, 0),
+            'ankle': (510, 400, 0, 0),
+        }
+    },
+    ExerciseType.JUMPING_JACKS: {
+        'view': 'front',
+        'joints': {
+            'shoulder': (280, 150, 0, -35),
+            'elbow': (250, 220, -40, -140),
+            'wrist': (240, 290, -50, -250),
+            'hip': (295, 260, 0, -35),
+            'knee': (295, 350, -30, -30),
+            'ankle': (295, 440, -60, -25),
+        }
+    },
+    ExerciseType.LUNGES: {
+        'view': 'front',
+        'joints': {
+            'shoulder': (290, 150, 0, 110),
+            'elbow': (280, 220, 0, 110),
+            'wrist': (275, 290, 0, 110),
+            'hip': (300, 260, 0, 110),
+            'knee': (300, 350, 20, 50),
+            'ankle': (300, 440, 0, 0),
+        }
+    },
+}
+
+# Ranges the generator samples each trace's personality from
+TEMPO_RANGE = (1.2, 3.5)         # Seconds per full rep
+ROM_RANGE = (0.7, 1.1)           # Fraction of the model's full range of motion
+JITTER_RANGE = (0.5, 4.0)        # Pixel noise at 640x480 (standard deviation)
+DROPOUT_RANGE = (0.0, 0.04)      # Chance per frame of losing the person
+PARTIAL_REP_CHANCE = 0.1         # Chance a rep only goes part of the way
+PAUSE_CHANCE = 0.15              # Chance of resting between reps
+FPS_CHOICES = (60, 30, 24, 15, 12)
+
+
+class SyntheticTrace:
+    """
+    A labelled stream of landmark frames for one simulated athlete.
+
+    Attributes:
+    - exercise_type: The ExerciseType being performed
+    - timestamps: Capture time of every frame in seconds
+    - frames: Landmark dictionaries in detect_pose() format (None = no person)
+    - true_reps: Number of full reps performed after calibration
+    - params: The randomly chosen personality of this trace
+    """
+
+    def __init__(self, exercise_type, timestamps, frames, true_reps, params):
+        self.exercise_type = exercise_type
+        self.timestamps = timestamps
+        self.frames = frames
+        self.true_reps = true_reps
+        self.params = params
+
+    def __len__(self):
+        return len(self.frames)
+
+
+def _rep_curve(phase, eccentric_fraction):
+    """
+    Depth (0 = rest, 1 = deepest) at a point of a rep.
+
+    Parameters:
+    - phase: Array of positions in the rep from 0 to 1
+    - eccentric_fraction: Share of the rep spent going down
+
+    Returns:
+    - Array of depths
+    """
+    going_down = phase < eccentric_fraction
+    down = 0.5 - 0.5 * np.cos(np.pi * phase / eccentric_fraction)
+    up = 0.5 + 0.5 * np.cos(np.pi * (phase - eccentric_fraction) / (1.0 - eccentric_fraction))
+    return np.where(going_down, down, up)
+
+
+def _sample_times(duration, fps, rng, fps_variation):
+    """Frame timestamps covering [0, duration) with jittered frame intervals."""
+    intervals = np.full(int(duration * fps * 1.5) + 2, 1.0 / fps)
+    if fps_variation:
+        intervals *= rng.uniform(0.7, 1.3, size=intervals.size)
+        # Occasional stalls, like a congested Wi-Fi stream
+        stalls = rng.random(intervals.size) < 0.01
+        intervals[stalls] *= rng.uniform(2.0, 6.0, size=stalls.sum())
+    times = np.concatenate(([0.0], np.cumsum(intervals)))
+    return times[times < duration]
+
+
+def generate_trace(exercise_type, n_reps=10, seed=None, calibration_seconds=5.0,
+                   fps=None, fps_variation=True, width=FRAME_WIDTH, height=FRAME_HEIGHT):
+    """
+    Generate a realistic landmark stream for one exercise.
+
+    The stream starts with three slow calibration reps that finish just
+    inside the calibration window, holds the rest position for a moment,
+    then performs the counted reps with random tempo, range of motion,
+    jitter, visibility dropouts, partial reps and pauses.
+
+    Parameters:
+    - exercise_type: ExerciseType to simulate
+    - n_reps: Number of full reps after calibration (the label)
+    - seed: Seed for reproducible traces
+    - calibration_seconds: Length of RepCounter's calibration window
+    - fps: Base frame rate (default: picked at random)
+    - fps_variation: Jitter frame intervals and add occasional stalls
+    - width, height: Frame size the motion is scaled to (coordinates come
+      out in frame heights, so only the aspect ratio changes them)
+
+    Returns:
+    - SyntheticTrace
+    """
+    rng = np.random.default_rng(seed)
+    model = MOTION_MODELS[exercise_type]
+
+    params = {
+        'fps': fps if fps is not None else int(rng.choice(FPS_CHOICES)),
+        'tempo': rng.uniform(*TEMPO_RANGE),
+        'rom': rng.uniform(*ROM_RANGE),
+        'jitter': rng.uniform(*JITTER_RANGE),
+        'dropout': rng.uniform(*DROPOUT_RANGE),
+        'eccentric_fraction': rng.uniform(0.4, 0.6),
+        'asymmetry': rng.uniform(0.9, 1.1),
+    }
+
+    # Build the depth timeline as a list of (start, end, kind, rom) segments
+    segments = []
+    calibration_tempo = (calibration_seconds - 0.5) / 3
+    t = 0.0
+    for _ in range(3):
+        segments.append((t, t + calibration_tempo, 'rep', 1.0))
+        t += calibration_tempo
+    segments.append((t, t + 1.5, 'rest', 0.0))
+    t += 1.5
+    counted_start = t
+
+    reps_done = 0
+    while reps_done < n_reps:
+        tempo = params['tempo'] * rng.uniform(0.85, 1.15)
+        if rng.random() < PARTIAL_REP_CHANCE:
+            segments.append((t, t + tempo * 0.6, 'rep', rng.uniform(0.2, 0.45)))
+            t += tempo * 0.6
+        else:
+            segments.append((t, t + tempo, 'rep', params['rom']))
+            t += tempo
+            reps_done += 1
+        if rng.random() < PAUSE_CHANCE:
+            pause = rng.uniform(0.5, 3.0)
+            segments.append((t, t + pause, 'rest', 0.0))
+            t += pause
+    segments.append((t, t + 1.0, 'rest', 0.0))
+    duration = t + 1.0
+
+    times = _sample_times(duration, params['fps'], rng, fps_variation)
+
+    # Depth of the movement at every frame
+    starts = np.array([s[0] for s in segments])
+    seg_index = np.searchsorted(starts, times, side='right') - 1
+    depth = np.zeros(times.size)
+    for i, (start, end, kind, rom) in enumerate(segments):
+        if kind != 'rep':
+            continue
+        mask = seg_index == i
+        phase = (times[mask] - start) / (end - start)
+        depth[mask] = rom * _rep_curve(phase, params['eccentric_fraction'])
+
+    # Dropouts only after calibration so the label stays exact
+    dropped = rng.random(times.size) < params['dropout']
+    # Make dropouts come in short bursts
+    dropped |= np.roll(dropped, 1) & (rng.random(times.size) < 0.5)
+    dropped &= times >= counted_start
+    # Sometimes the near side briefly loses visibility
+    vis_flicker = rng.random(times.size) < 0.05
+
+    scale_x = width / FRAME_WIDTH / height
+    scale_y = 1 / FRAME_HEIGHT
+    joint_names = sorted(set(EXERCISES[exercise_type].get_tracking_points()) | set(BASE_JOINTS))
+
+    columns = {}
+    for name in joint_names:
+        side, joint = name.split('_', 1)
+        x, y, dx, dy = model['joints'][joint]
+        amount = depth
+        vis = np.full(times.size, 0.95)
+        if side == 'right':
+            amount = depth * params['asymmetry']
+            if model['view'] == 'side':
+                x, y = x + 8, y - 4
+                vis[:] = 0.6
+            else:
+                x, dx = 2 * (FRAME_WIDTH / 2) - x, -dx
+        elif model['view'] == 'side':
+            vis[vis_flicker] = 0.3
+        xs = (x + dx * amount + rng.normal(0, params['jitter'], times.size)) * scale_x
+        ys = (y + dy * amount + rng.normal(0, params['jitter'], times.size)) * scale_y
+        columns[name] = (xs.tolist(), ys.tolist(), vis.tolist())
+
+    frames = []
+    for i in range(times.size):
+        if dropped[i]:
+            frames.append(None)
+            continue
+        frames.append({
+            name: {'x': xs[i], 'y': ys[i], 'visibility': vis[i]}
+            for name, (xs, ys, vis) in columns.items()
+        })
+
+    return SyntheticTrace(exercise_type, times.tolist(), frames, n_reps, params)
+
+
+def generate_traces(count, exercise_types=None, seed=None, reps_range=(5, 20), **kwargs):
+    """
+    Generate many labelled traces.
+
+    Parameters:
+    - count: How many traces to generate
+    - exercise_types: ExerciseTypes to cycle through (default: all)
+    - seed: Seed for reproducible traces
+    - reps_range: Inclusive range of counted reps per trace
+    - kwargs: Passed through to generate_trace()
+
+    Returns:
+    - List of SyntheticTrace
+    """
+    exercise_types = list(exercise_types or ExerciseType)
+    picker = random.Random(seed)
+    traces = []
+    for i in range(count):
+        traces.append(generate_trace(
+            exercise_types[i % len(exercise_types)],
+            n_reps=picker.randint(*reps_range),
+            seed=picker.getrandbits(32),
+            **kwargs
+        ))
+    return traces
+
+
+def test_synthetic_traces():
+    """Print a summary of one trace per exercise."""
+    for exercise_type in ExerciseType:
+        trace = generate_trace(exercise_type, n_reps=8, seed=1)
+        visible = sum(frame is not None for frame in trace.frames)
+        print(f"{exercise_type.value:15s} frames={len(trace):5d} visible={visible:5d} "
+              f"duration={trace.timestamps[-1]:5.1f}s fps={trace.params['fps']:2d} "
+              f"reps={trace.true_reps}")
+
+
+if __name__ == "__main__":
+    test_synthetic_traces()
@@ -0,0 +1,286 @@
+import time
+
+import numpy as np
+
+from capture_profiles import is_live, mismatches, negotiated, open_capture, parse_profile
+from checkpoint import CheckpointWriter, load_checkpoint
+from events import (
+    CameraRetry, CameraConnected, CameraFailed, CameraLost, CaptureNegotiated, CheckpointRestored, FrameStats,
+    RepCounted
+)
+from exercises import EXERCISES
+from frame_buffers import BufferPool, FrameRing
+from frame_scheduler import FrameScheduler
+from pose_backends import PoseBackend
+from pose_detection import SkeletonRenderer, detect_pose, create_pose_detector
+from rep_counter import RepCounter
+
+
+class WorkoutSession:
+    """
+    The capture -> detect_pose -> RepCounter loop for one camera.
+
+    Has no GUI dependency: the Qt app runs it inside WorkoutThread and the
+    headless entry point runs it on a plain thread. Progress goes out as
+    events on the EventBus; annotated frames go to the optional on_frame
+    callback.
+    """
+
+    TARGET_FPS = 30.0
+    STATS_INTERVAL = 5.0  # Seconds between FrameStats events
+    MAX_ATTEMPTS = 5
+    FRAME_SLOTS = 3       # Capture and preview buffers in rotation
+    PREVIEW_SIZE = (320, 240)  # The HUD's camera area: the preview skeleton is drawn at this size
+
+    def __init__(self, camera_source, events, reps_per_set=12, total_sets=3, exercise_type=None,
+                 recorder=None, on_frame=None, target_fps=TARGET_FPS, backend="mediapipe",
+                 capture_profile="native", budget=None, checkpoint=None, replay=None):
+        """
+        Initialize the session.
+
+        Parameters:
+        - camera_source: DroidCam URL, video file, webcam index or an already opened capture object
+        - events: EventBus to publish progress on
+        - reps_per_set, total_sets: Workout targets
+        - exercise_type: ExerciseType being performed (default: push-ups)
+        - recorder: Optional SessionRecorder
+        - on_frame: Optional callback receiving each preview frame (PREVIEW_SIZE with the skeleton
+          drawn on it, or the full frame when annotation was skipped). The buffer is reused for
+          later frames: a callback that hands it to another thread must copy it (see FrameMailbox)
+        - target_fps: Frame rate the scheduler sets deadlines for (and paces video files at)
+        - backend: Pose backend spec for this camera (see pose_backends.py) or a PoseBackend
+        - capture_profile: Resolution / FPS / codec to request from the camera (see capture_profiles.py)
+        - budget: Optional SessionBudget from a ResourceGovernor (threads, pinning, quality level)
+        - checkpoint: Optional checkpoint file: the counter resumes from it and keeps it up to date
+        - replay: Optional ReplayBuffer that keeps the last reps for instant replay
+        """
+        self.camera_source = camera_source
+        self.capture_profile = parse_profile(capture_profile)
+        self.events = events
+        self.running = True
+        self.exercise = EXERCISES[exercise_type] if exercise_type else None
+        self.counter = RepCounter(reps_per_set=reps_per_set, total_sets=total_sets,
+                                  exercise=self.exercise, events=events)
+        self.resumed = False
+        self.checkpoint = None
+        if checkpoint:
+            self.resumed = self._resume(checkpoint)
+            self.checkpoint = self.counter.checkpoint = CheckpointWriter(checkpoint)
+        self.recorder = recorder
+        self.replay = replay
+        if replay is not None:
+            events.subscribe(replay.on_event, RepCounted)  # Rep boundaries for "last rep"
+        self.on_frame = on_frame
+        # Live cameras already block in read() until the next frame - sleeping as
+        # well would pace the loop twice. Only video files need the scheduler to pace
+        self.scheduler = FrameScheduler(target_fps, pace=not is_live(camera_source))
+        self.budget = budget
+        if budget is not None:
+            budget.session = self
+        # One per session: detectors are not thread-safe. A pinned session
+        # creates its detector on its own thread so the inference threads
+        # inherit the pinning
+        self.backend = backend
+        self.detector = None
+        if isinstance(backend, PoseBackend):
+            self.detector = backend
+        elif budget is None or not budget.pin:
+            self.detector = self._create_detector()
+        # Reused every frame: capture slots and the landmark dictionary. The
+        # previous pose is kept in a second dictionary (the two swap roles) so
+        # poses on both sides of an aspect-ratio switch can be compared
+        self.frames = FrameRing(self.FRAME_SLOTS)
+        self.landmarks = {}
+        self.previous_landmarks = {}
+        self.previous_pose_size = None
+        self.buffers = BufferPool()  # Scaled-down copies when the governor lowers the inference resolution
+        self.previews = FrameRing(self.FRAME_SLOTS)
+        self.renderer = SkeletonRenderer(exercise=self.counter.exercise)  # Highlights the tracked joints
+        self.cpu_seconds = 0.0       # CPU time of the session thread so far
+
+    def _resume(self, path):
+        """Restore the counter from the checkpoint at path. Returns True if it did."""
+        snapshot = load_checkpoint(path)
+        if snapshot is None:
+            return False
+        try:
+            self.counter.restore(snapshot)
+        except (ValueError, KeyError) as error:
+            print(f"⚠️  Not resuming from {path}: {error}")
+            return False
+        return True
+
+    def _next_preview(self):
+        """Next preview image in rotation."""
+        preview = self.previews.next()
+        if preview is None:
+            preview = self.previews.store(np.empty((self.PREVIEW_SIZE[1], self.PREVIEW_SIZE[0], 3), np.uint8))
+        return preview
+
+    def _create_detector(self):
+        return create_pose_detector(self.backend, self.budget.threads if self.budget else None)
+
+    def open_camera(self):
+        """
+        Open the camera, retrying a few times.
+
+        Returns:
+        - Opened cv2.VideoCapture (capture profile applied), or None if the camera could not be reached
+        """
+        if hasattr(self.camera_source, "read"):
+            return self.camera_source  # Capture object supplied by the caller (e.g. a synthetic source)
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            cap = open_capture(self.camera_source, self.capture_profile)
+            if cap.isOpened():
+                return cap
+            self.events.publish(CameraRetry(time.monotonic(), attempt, self.MAX_ATTEMPTS))
+            if not self.running:
+                return None
+            time.sleep(2)  # Wait 2 seconds between attempts
+
+        self.events.publish(CameraFailed(time.monotonic(), self.camera_source))
+        return None
+
+    def run(self):
+        """Main workout tracking loop. Returns when the workout ends or stop() is called."""
+        if self.budget is not None:
+            self.budget.enter()
+        if self.detector is None:
+            self.detector = self._create_detector()
+        cap = self.open_camera()
+        if cap is None:
+            return
+
+        time.sleep(3)  # Extra delay to ensure stable connection
+
+        # Signal that camera is connected
+        self.events.publish(CameraConnected(time.monotonic(), self.camera_source))
+        if self.resumed:
+            self.events.publish(CheckpointRestored(
+                time.monotonic(), self.checkpoint.path, self.counter.current_rep, self.counter.current_set
+            ))
+        if self.checkpoint:
+            self.checkpoint.start()
+
+        if self.recorder:
+            self.recorder.start()
+        if self.replay:
+            self.replay.start()
+        reps_counted = self.counter.analytics.reps  # Non-zero when resumed from a checkpoint
+        verified = False
+        scheduler = self.scheduler
+        wants_annotation = self.on_frame is not None or self.recorder is not None
+        stats_since = time.monotonic()
+        next_stats = stats_since + self.STATS_INTERVAL
+        stats_cpu = time.thread_time()
+        stride, inference_height = 1, None
+        frame_index = 0
+
+        while self.running:
+            # Capture into the next preallocated slot (no per-frame allocation)
+            ret, frame = cap.read(self.frames.next())
+            if not ret:
+                self.events.publish(CameraLost(time.monotonic(), self.camera_source))
+                break
+            self.frames.store(frame)
+            if not verified:
+                # Cameras fall back to the nearest mode they support - report what actually arrived
+                actual = negotiated(cap, frame, self.camera_source)
+                self.events.publish(CaptureNegotiated(
+                    time.monotonic(), self.capture_profile.describe(), actual['width'], actual['height'],
+                    actual['fps'], actual['fourcc'], tuple(mismatches(self.capture_profile, actual, self.camera_source))
+                ))
+                verified = True
+            timestamp = time.monotonic()  # Capture time drives calibration and smoothing
+            scheduler.begin_frame(timestamp)
+
+            # Detect pose (skip drawing the skeleton if nobody looks at it or the frame is late).
+            # The skeleton is drawn straight onto the capture slot - nothing else needs the raw frame
+            if self.budget is not None:
+                stride, inference_height = self.budget.quality
+            frame_index += 1
+            preview = None
+            if frame_index % stride == 0:
+                annotate = wants_annotation and scheduler.should_run("annotation", pending=("inference",))
+                # The recording gets the skeleton at full size; the preview gets it drawn at preview size
+                if annotate and self.on_frame is not None:
+                    preview = self._next_preview()
+                with scheduler.stage("inference"):
+                    landmarks, annotated_frame = detect_pose(
+                        frame, annotate=annotate and self.recorder is not None, detector=self.detector,
+                        exercise=self.exercise, in_place=True, landmarks_out=self.landmarks,
+                        inference_height=inference_height, buffers=self.buffers,
+                        renderer=self.renderer, preview=preview
+                    )
+            else:
+                # The governor lowered this session's inference rate: no pose, nothing to count
+                landmarks, annotated_frame = None, frame
+
+            if landmarks is not None:
+                # The camera switched aspect ratio since the last pose: carry the calibration over
+                size = (frame.shape[1], frame.shape[0])
+                before = self.previous_pose_size
+                if before is not None and before[0] * size[1] != before[1] * size[0]:
+                    self.counter.reframe(self.previous_landmarks, landmarks, before, size, timestamp)
+                self.previous_landmarks, self.landmarks = self.landmarks, self.previous_landmarks
+                self.previous_pose_size = size
+
+            # Hand the frame to the background encoder (never blocks; it copies into its own pool)
+            if self.recorder:
+                self.recorder.submit(annotated_frame, timestamp)
+            if self.replay and scheduler.should_run("replay", pending=("counting",)):
+                with scheduler.stage("replay"):
+                    self.replay.add(preview if preview is not None else annotated_frame, timestamp,
+                                    landmarks, frame_size=(frame.shape[1], frame.shape[0]))
+
+            # Calibration phase
+            if not self.counter.is_calibrated:
+                with scheduler.stage("counting"):
+                    self.counter.calibrate(landmarks, timestamp)
+            else:
+                # Counting phase
+                analytics = scheduler.should_run("analytics", pending=("counting",))
+                with scheduler.stage("counting"):
+                    progress = self.counter.count_rep(landmarks, timestamp, analytics=analytics)
+
+                if self.recorder and self.counter.analytics.reps != reps_counted:
+                    if self.counter.analytics.reps > reps_counted:  # Not a reset by recalibration
+                        self.recorder.mark_rep(timestamp)
+                    reps_counted = self.counter.analytics.reps
+
+                # Check completion
+                if progress['completed']:
+                    self.running = False
+
+            # Send camera frame to the preview
+            if self.on_frame is not None and scheduler.should_run("preview"):
+                with scheduler.stage("preview"):
+                    self.on_frame(preview if preview is not None else annotated_frame)
+
+            scheduler.end_frame()
+            self.cpu_seconds = time.thread_time()
+
+            if timestamp >= next_stats:
+                stats = scheduler.stats()
+                cpu_percent = (self.cpu_seconds - stats_cpu) / (timestamp - stats_since) * 100
+                self.events.publish(FrameStats(
+                    timestamp, stats['frames'], stats['deadline_misses'], stats['skipped'], stats['stage_ms'],
+                    cpu_percent
+                ))
+                stats_cpu, stats_since = self.cpu_seconds, timestamp
+                next_stats = timestamp + self.STATS_INTERVAL
+
+        cap.release()
+        self.detector.close()
+        if self.checkpoint:
+            self.checkpoint.stop()
+        if self.replay:
+            self.replay.stop()  # The stored reps stay available for replay
+
+        if self.recorder:
+            self.recorder.stop()
+            print(f"Recording saved to {self.recorder.path}: {self.recorder.stats()}")
+
+    def stop(self):
+        """Stop the session (the loop exits after the current frame)."""
+        self.running = False